@@ -3,6 +3,7 @@ from __future__ import absolute_import
 from abc import ABCMeta, abstractmethod
 from datetime import timedelta
 import logging
+from multiprocessing.pool import ThreadPool
 import re
 from six import add_metaclass
 
@@ -13,10 +14,12 @@ from django.core.urlresolvers import resolve
 from contentstore.utils import course_image_url
 from contentstore.course_group_config import GroupConfiguration
 from course_modes.models import CourseMode
+import dogstats_wrapper as dog_stats_api
 from eventtracking import tracker
 from search.search_engine_base import SearchEngine
 from xmodule.annotator_mixin import html_to_text
 from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.library_tools import normalize_key_for_search
 
 # REINDEX_AGE is the default amount of time that we look back for changes
@@ -26,6 +29,15 @@ from xmodule.library_tools import normalize_key_for_search
 # how far back from the trigger point to look back in order to index
 REINDEX_AGE = timedelta(0, 60)  # 60 seconds
 
+# MAX_CHANGED_ITEMS is the largest number of changed items for which we
+# update the index incrementally. Beyond it, e.g. after a course import,
+# walking the whole structure is about as cheap and keeps task payloads small
+MAX_CHANGED_ITEMS = 1000
+
+# INDEX_BATCH_SIZE is the number of items submitted to the search engine in
+# one bulk call. Each batch is indexed while the next one is being prepared
+INDEX_BATCH_SIZE = 500
+
 log = logging.getLogger('edx.modulestore')
 
 
@@ -114,7 +126,27 @@ class SearchIndexerBase(object):
         searcher.remove(cls.DOCUMENT_TYPE, result_ids)
 
     @classmethod
-    def index(cls, modulestore, structure_key, triggered_at=None, reindex_age=REINDEX_AGE):
+    def remove_items(cls, searcher, item_keys):
+        """
+        remove the given items from the search index in one call
+        """
+        item_ids = [
+            unicode(cls._id_modifier(item_key.version_agnostic().replace(branch=None))) for item_key in item_keys
+        ]
+        if item_ids:
+            searcher.remove(cls.DOCUMENT_TYPE, item_ids)
+
+    @classmethod
+    def _index_items(cls, searcher, items_index):
+        """
+        submit a batch of item index dictionaries to the search engine in one call
+        """
+        with dog_stats_api.timer('{}.time.submit'.format(cls.INDEX_NAME)):
+            searcher.index(cls.DOCUMENT_TYPE, items_index)
+
+    @classmethod
+    def index(cls, modulestore, structure_key, triggered_at=None, reindex_age=REINDEX_AGE,
+              changed_items=None, deleted_items=None):
         """
         Process course for indexing
 
@@ -130,6 +162,15 @@ class SearchIndexerBase(object):
             which items may need to be removed from the index
             If None, then a full reindex takes place
 
+        changed_items (list of UsageKey) - the items added or changed by the update that
+            triggered indexing; if provided, only these items along with their ancestors
+            and descendants are indexed instead of walking the whole structure
+
+        deleted_items (list of UsageKey) - the items removed by the update that triggered
+            indexing; used along with changed_items and removed from the index in bulk
+
+        triggered_at is not used to skip any items when changed_items are provided
+
         Returns:
         Number of items that have been added to the index
         """
@@ -152,18 +193,43 @@ class SearchIndexerBase(object):
         # list - those are ready to be destroyed
         indexed_items = set()
 
-        # items_index is a list of all the items index dictionaries.
-        # it is used to collect all indexes and index them using bulk API,
+        # items_index is a list of the items index dictionaries not submitted yet.
+        # it is used to collect indexes and index them in batches using bulk API,
         # instead of per item index API call.
         items_index = []
 
+        # the batches are submitted from submit_pool so that the search engine indexes
+        # one batch while the next is prepared; submissions holds their results
+        submit_pool = ThreadPool(1)
+        submissions = []
+
+        def submit_items_index():
+            """
+            Hands the collected item index dictionaries over to the search engine
+            """
+            if items_index:
+                submissions.append(submit_pool.apply_async(cls._index_items, (searcher, list(items_index))))
+                del items_index[:]
+
+        # When only some items changed, changed_ids holds those items and ancestor_ids the
+        # items on their paths from the structure root; nothing else needs to be walked
+        incremental = changed_items is not None
+        changed_ids = set()
+        ancestor_ids = set()
+
         def get_item_location(item):
             """
             Gets the version agnostic item location
             """
             return item.location.version_agnostic().replace(branch=None)
 
-        def prepare_item_index(item, skip_index=False, groups_usage_info=None):
+        def is_changed(item):
+            """
+            Whether the item is one of the changed items
+            """
+            return unicode(get_item_location(item)) in changed_ids
+
+        def prepare_item_index(item, skip_index=False, groups_usage_info=None, in_changed_subtree=True):
             """
             Add this item to the items_index and indexed_items list
 
@@ -175,6 +241,10 @@ class SearchIndexerBase(object):
                 This should really only be passed from the recursive child calls when
                 this method has determined that it is safe to do so
 
+            in_changed_subtree - whether the item is a changed item or one of its descendants;
+                if not, the item is a changed item's ancestor and only the children on the
+                paths to the changed items are walked
+
             Returns:
             item_content_groups - content groups assigned to indexed item
             """
@@ -210,16 +280,24 @@ class SearchIndexerBase(object):
             indexed_items.add(item_id)
             if item.has_children:
                 # determine if it's okay to skip adding the children herein based upon how recently any may have changed
-                skip_child_index = skip_index or \
-                    (triggered_at is not None and (triggered_at - item.subtree_edited_on) > reindex_age)
+                # the changed items tell exactly what to index, whatever their subtree edit times
+                skip_child_index = skip_index or (
+                    not incremental and triggered_at is not None and
+                    (triggered_at - item.subtree_edited_on) > reindex_age
+                )
                 children_groups_usage = []
                 for child_item in item.get_children():
-                    if modulestore.has_published_version(child_item):
+                    child_in_changed_subtree = in_changed_subtree or is_changed(child_item)
+                    if not child_in_changed_subtree and unicode(get_item_location(child_item)) not in ancestor_ids:
+                        # unaffected by the update, treat it as too old to index
+                        children_groups_usage.append(None)
+                    elif modulestore.has_published_version(child_item):
                         children_groups_usage.append(
                             prepare_item_index(
                                 child_item,
                                 skip_index=skip_child_index,
-                                groups_usage_info=groups_usage_info
+                                groups_usage_info=groups_usage_info,
+                                in_changed_subtree=child_in_changed_subtree
                             )
                         )
                 if None in children_groups_usage:
@@ -240,6 +318,8 @@ class SearchIndexerBase(object):
                 item_index.update(cls.supplemental_fields(item))
                 items_index.append(item_index)
                 indexed_count["count"] += 1
+                if len(items_index) >= INDEX_BATCH_SIZE:
+                    submit_items_index()
                 return item_content_groups
             except Exception as err:  # pylint: disable=broad-except
                 # broad exception so that index operation does not fail on one item of many
@@ -248,17 +328,49 @@ class SearchIndexerBase(object):
 
         try:
             with modulestore.branch_setting(ModuleStoreEnum.RevisionOption.published_only):
-                structure = cls._fetch_top_level(modulestore, structure_key)
-                groups_usage_info = cls.fetch_group_usage(modulestore, structure)
+                with dog_stats_api.timer('{}.time.load'.format(cls.INDEX_NAME)):
+                    structure = cls._fetch_top_level(modulestore, structure_key)
+                    groups_usage_info = cls.fetch_group_usage(modulestore, structure)
 
                 # First perform any additional indexing from the structure object
                 cls.supplemental_index_information(modulestore, structure)
 
-                # Now index the content
-                for item in structure.get_children():
-                    prepare_item_index(item, groups_usage_info=groups_usage_info)
-                searcher.index(cls.DOCUMENT_TYPE, items_index)
-                cls.remove_deleted_items(searcher, structure_key, indexed_items)
+                if incremental:
+                    changed_ids.update(
+                        unicode(item_key.version_agnostic().replace(branch=None)) for item_key in changed_items
+                    )
+                    for item_key in changed_items:
+                        try:
+                            parent = modulestore.get_item(item_key).get_parent()
+                        except ItemNotFoundError:
+                            continue
+                        while parent is not None and unicode(get_item_location(parent)) not in ancestor_ids:
+                            ancestor_ids.add(unicode(get_item_location(parent)))
+                            parent = parent.get_parent()
+
+                # Now index the content; a change to the structure object itself,
+                # e.g. its name or start date, can affect any item within it
+                walk_all = not incremental or is_changed(structure)
+                with dog_stats_api.timer('{}.time.prepare'.format(cls.INDEX_NAME)):
+                    for item in structure.get_children():
+                        if walk_all or is_changed(item):
+                            prepare_item_index(item, groups_usage_info=groups_usage_info)
+                        elif unicode(get_item_location(item)) in ancestor_ids:
+                            prepare_item_index(item, groups_usage_info=groups_usage_info, in_changed_subtree=False)
+                submit_items_index()
+                for submission in submissions:
+                    # re-raises any error from the search engine
+                    submission.get()
+
+                with dog_stats_api.timer('{}.time.remove'.format(cls.INDEX_NAME)):
+                    if incremental:
+                        # a later update may have brought a deleted item back already
+                        cls.remove_items(
+                            searcher,
+                            [item_key for item_key in deleted_items or [] if not modulestore.has_item(item_key)]
+                        )
+                    else:
+                        cls.remove_deleted_items(searcher, structure_key, indexed_items)
         except Exception as err:  # pylint: disable=broad-except
             # broad exception so that index operation does not prevent the rest of the application from working
             log.exception(
@@ -267,6 +379,9 @@ class SearchIndexerBase(object):
                 err
             )
             error_list.append(_('General indexing error occurred'))
+        finally:
+            submit_pool.close()
+            submit_pool.join()
 
         if error_list:
             raise SearchIndexingError('Error(s) present during indexing', error_list)
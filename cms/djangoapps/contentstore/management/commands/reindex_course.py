@@ -1,6 +1,8 @@
 """ Management command to update courses' search index """
 import logging
 from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from multiprocessing.pool import ThreadPool
 from optparse import make_option
 from textwrap import dedent
 
@@ -25,6 +27,7 @@ class Command(BaseCommand):
 
         ./manage.py reindex_course <course_id_1> <course_id_2> - reindexes courses with keys course_id_1 and course_id_2
         ./manage.py reindex_course --all - reindexes all available courses
+        ./manage.py reindex_course --all --workers=8 - reindexes all available courses, 8 at a time
         ./manage.py reindex_course --setup - reindexes all courses for devstack setup
     """
     help = dedent(__doc__)
@@ -45,7 +48,12 @@ class Command(BaseCommand):
                                default=False,
                                help='Reindex all courses on developers stack setup')
 
-    option_list = BaseCommand.option_list + (all_option, setup_option)
+    workers_option = make_option('--workers',
+                                 type='int',
+                                 default=1,
+                                 help='Number of threads that reindex courses at the same time')
+
+    option_list = BaseCommand.option_list + (all_option, setup_option, workers_option)
 
     CONFIRMATION_PROMPT = u"Re-indexing all courses might be a time consuming operation. Do you want to continue?"
 
@@ -111,5 +119,25 @@ class Command(BaseCommand):
             # in case course keys are provided as arguments
             course_keys = map(self._parse_course_key, args)
 
-        for course_key in course_keys:
-            CoursewareSearchIndexer.do_course_reindex(store, course_key)
+        workers = options.get('workers', 1)
+        if workers > 1:
+            pool = ThreadPool(workers)
+            try:
+                pool.map(_reindex_course_in_thread, course_keys)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for course_key in course_keys:
+                CoursewareSearchIndexer.do_course_reindex(store, course_key)
+
+
+def _reindex_course_in_thread(course_key):
+    """
+    Reindex the course in a thread of the pool, closing the thread's
+    database connection when done.
+    """
+    try:
+        CoursewareSearchIndexer.do_course_reindex(modulestore(), course_key)
+    finally:
+        connection.close()
@@ -99,6 +99,19 @@ class TestReindexCourse(ModuleStoreTestCase):
             expected_calls = self._build_calls(self.first_course, self.second_course)
             self.assertEqual(patched_index.mock_calls, expected_calls)
 
+    def test_given_workers_indexes_courses_in_threads(self):
+        """ Test that reindexes all given courses when reindexing several at a time """
+        with mock.patch(self.REINDEX_PATH_LOCATION) as patched_index, \
+                mock.patch(self.MODULESTORE_PATCH_LOCATION, mock.Mock(return_value=self.store)):
+            call_command(
+                'reindex_course',
+                unicode(self.first_course.id),
+                unicode(self.second_course.id),
+                workers=2
+            )
+            expected_calls = self._build_calls(self.first_course, self.second_course)
+            self.assertItemsEqual(patched_index.mock_calls, expected_calls)
+
     def test_given_all_key_prompts_and_reindexes_all_courses(self):
         """ Test that reindexes all courses when --all key is given and confirmed """
         with mock.patch(self.YESNO_PATCH_LOCATION) as patched_yes_no:
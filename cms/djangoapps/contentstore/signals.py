@@ -5,7 +5,8 @@ from pytz import UTC
 
 from django.dispatch import receiver
 
-from xmodule.modulestore.django import SignalHandler
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import SignalHandler, modulestore
 from contentstore.courseware_index import CoursewareSearchIndexer, LibrarySearchIndexer
 from contentstore.proctoring import register_proctored_exams
 from openedx.core.djangoapps.credit.signals import on_course_publish
@@ -34,7 +35,15 @@ def listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable=
         # import here, because signal is registered at startup, but items in tasks are not yet able to be loaded
         from .tasks import update_search_index
 
-        update_search_index.delay(unicode(course_key), datetime.now(UTC).isoformat())
+        # pass along the version this publish produced, so that the task only reindexes
+        # the items it changed, without comparing the course structures here
+        version_guid = modulestore().get_course_version(
+            course_key, revision=ModuleStoreEnum.RevisionOption.published_only
+        )
+
+        update_search_index.delay(
+            unicode(course_key), datetime.now(UTC).isoformat(), unicode(version_guid) if version_guid else None
+        )
 
 
 @receiver(SignalHandler.library_updated)
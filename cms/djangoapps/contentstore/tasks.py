@@ -5,16 +5,20 @@ import json
 import logging
 from celery.task import task
 from celery.utils.log import get_task_logger
+from bson.objectid import ObjectId
 from datetime import datetime
 from pytz import UTC
 
 from django.contrib.auth.models import User
 
-from contentstore.courseware_index import CoursewareSearchIndexer, LibrarySearchIndexer, SearchIndexingError
+from contentstore.courseware_index import (
+    CoursewareSearchIndexer, LibrarySearchIndexer, SearchIndexingError, MAX_CHANGED_ITEMS
+)
 from contentstore.utils import initialize_permissions
 from course_action_state.models import CourseRerunState
 from opaque_keys.edx.keys import CourseKey
 from xmodule.course_module import CourseFields
+from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import DuplicateCourseError, ItemNotFoundError
 
@@ -91,12 +95,42 @@ def _parse_time(time_isoformat):
     ).replace(tzinfo=UTC)
 
 
+def _get_published_changes(course_key, version_guid):
+    """
+    Returns the usage keys of the items changed and deleted by the publish which produced
+    the published version `version_guid` of the course, as a (changed, deleted) tuple, or
+    (None, None) if the modulestore can't tell or there are too many to update separately.
+    """
+    block_changes = modulestore().get_block_changes(
+        course_key.for_version(ObjectId(version_guid)), revision=ModuleStoreEnum.RevisionOption.published_only
+    )
+    if block_changes is None or sum(len(usage_keys) for usage_keys in block_changes) > MAX_CHANGED_ITEMS:
+        return None, None
+    changed_items, deleted_items = [
+        [usage_key.for_branch(None) for usage_key in usage_keys] for usage_keys in block_changes
+    ]
+    return changed_items, deleted_items
+
+
 @task()
-def update_search_index(course_id, triggered_time_isoformat):
-    """ Updates course search index. """
+def update_search_index(course_id, triggered_time_isoformat, version_guid=None):
+    """
+    Updates course search index. When the published version of the course is given,
+    only the items changed by the publish that produced it, and the items around them,
+    are updated.
+    """
     try:
         course_key = CourseKey.from_string(course_id)
-        CoursewareSearchIndexer.index(modulestore(), course_key, triggered_at=(_parse_time(triggered_time_isoformat)))
+        changed_items = deleted_items = None
+        if version_guid is not None:
+            changed_items, deleted_items = _get_published_changes(course_key, version_guid)
+        CoursewareSearchIndexer.index(
+            modulestore(),
+            course_key,
+            triggered_at=(_parse_time(triggered_time_isoformat)),
+            changed_items=changed_items,
+            deleted_items=deleted_items
+        )
 
     except SearchIndexingError as exc:
         LOGGER.error('Search indexing error for complete course %s - %s', course_id, unicode(exc))
@@ -288,6 +288,23 @@ class TestCoursewareSearchIndexer(MixedWithOptionsTestCase):
             reindex_age=(trigger_time - since_time)
         )
 
+    def get_published_changes(self, store, version_guid=None):
+        """ get the items changed by the publish which produced version_guid, or the latest one """
+        course_key = self.course.id
+        if version_guid is not None:
+            course_key = course_key.for_version(version_guid)
+        return store.get_block_changes(course_key, revision=ModuleStoreEnum.RevisionOption.published_only)
+
+    def index_published_changes(self, store):
+        """ index course using the items changed by the latest publish """
+        changed_items, deleted_items = self.get_published_changes(store)
+        return CoursewareSearchIndexer.index(
+            store,
+            self.course.id,
+            changed_items=changed_items,
+            deleted_items=deleted_items
+        )
+
     def _get_default_search(self):
         return {"course": unicode(self.course.id)}
 
@@ -452,6 +469,62 @@ class TestCoursewareSearchIndexer(MixedWithOptionsTestCase):
         indexed_count = self.reindex_course(store)
         self.assertEqual(indexed_count, 7)
 
+    def _test_changed_items_index(self, store):
+        """ Make sure that indexing the changed items only indexes their paths and removes deleted items """
+        self.publish_item(store, self.vertical.location)
+        ItemFactory.create(
+            parent_location=self.chapter.location,
+            category='sequential',
+            display_name='Lesson 2',
+            modulestore=store,
+            publish_item=True,
+        )
+        indexed_count = self.reindex_course(store)
+        self.assertEqual(indexed_count, 5)
+
+        self.html_unit.display_name = "Changed Html Content"
+        self.update_item(store, self.html_unit)
+        self.publish_item(store, self.vertical.location)
+        version_guid = store.get_course_version(self.course.id, revision=ModuleStoreEnum.RevisionOption.published_only)
+        changed_items, deleted_items = self.get_published_changes(store)
+        self.assertEqual([unicode(key.for_branch(None)) for key in changed_items], [unicode(self.html_unit.location)])
+        self.assertEqual(deleted_items, [])
+
+        # the html unit along with the chapter, sequential and vertical above it, but not the other sequential
+        indexed_count = self.index_published_changes(store)
+        self.assertEqual(indexed_count, 4)
+        response = self.search(query_string="Changed")
+        self.assertEqual(response["total"], 1)
+
+        self.delete_item(store, self.html_unit.location)
+        self.publish_item(store, self.vertical.location)
+        indexed_count = self.index_published_changes(store)
+        self.assertEqual(indexed_count, 3)
+        response = self.search()
+        self.assertEqual(response["total"], 4)
+
+        # the changes of an earlier publish can still be read from the version it produced
+        changed_items, deleted_items = self.get_published_changes(store, version_guid)
+        self.assertEqual([unicode(key.for_branch(None)) for key in changed_items], [unicode(self.html_unit.location)])
+        self.assertEqual(deleted_items, [])
+
+    @patch('contentstore.courseware_index.INDEX_BATCH_SIZE', 3)
+    def _test_index_in_batches(self, store):
+        """ Make sure that all items get indexed when they are submitted in several batches """
+        self.publish_item(store, self.vertical.location)
+        indexed_count = self.reindex_course(store)
+        self.assertEqual(indexed_count, 4)
+        response = self.search()
+        self.assertEqual(response["total"], 4)
+
+    def _test_block_changes_unsupported(self, store):
+        """ Make sure that modulestores without structure versions provide no changed items """
+        self.publish_item(store, self.vertical.location)
+        self.assertIsNone(self.get_published_changes(store))
+        self.assertIsNone(
+            store.get_course_version(self.course.id, revision=ModuleStoreEnum.RevisionOption.published_only)
+        )
+
     def _test_course_about_property_index(self, store):
         """ Test that informational properties in the course object end up in the course_info index """
         display_name = "Help, I need somebody!"
@@ -580,6 +653,16 @@ class TestCoursewareSearchIndexer(MixedWithOptionsTestCase):
     def test_time_based_index(self, store_type):
         self._perform_test_using_store(store_type, self._test_time_based_index)
 
+    @ddt.data(*WORKS_WITH_STORES)
+    def test_index_in_batches(self, store_type):
+        self._perform_test_using_store(store_type, self._test_index_in_batches)
+
+    def test_changed_items_index(self):
+        self._perform_test_using_store(ModuleStoreEnum.Type.split, self._test_changed_items_index)
+
+    def test_block_changes_unsupported(self):
+        self._perform_test_using_store(ModuleStoreEnum.Type.mongo, self._test_block_changes_unsupported)
+
     @ddt.data(*WORKS_WITH_STORES)
     def test_exception(self, store_type):
         self._perform_test_using_store(store_type, self._test_exception)
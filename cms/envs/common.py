@@ -311,6 +311,9 @@ MIDDLEWARE_CLASSES = (
     # 'django.middleware.locale.LocaleMiddleware',
     'django_locale.middleware.LocaleMiddleware',
 
+    # Must be before TransactionMiddleware, so that cached data is invalidated
+    # again once the request's transaction is committed.
+    'util.middleware.AfterCommitMiddleware',
     'django.middleware.transaction.TransactionMiddleware',
     # needs to run after locale middleware (or anything that modifies the request context)
     'edxmako.middleware.MakoMiddleware',
@@ -34,10 +34,11 @@ def get_course_enrollments(user_id):
         A serializable list of dictionaries of all aggregated enrollment data for a user.
 
     """
-    qset = CourseEnrollment.objects.filter(
+    qset = list(CourseEnrollment.objects.filter(
         user__username=user_id,
         is_active=True
-    ).order_by('created')
+    ).order_by('created'))
+    CourseEnrollment.prefetch_course_overviews(qset)
 
     enrollments = CourseEnrollmentSerializer(qset, many=True).data
 
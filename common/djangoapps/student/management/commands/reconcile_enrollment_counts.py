@@ -0,0 +1,50 @@
+"""
+Recompute the CourseEnrollmentCounts of courses from the enrollment table,
+correcting any drift from enrollments that were changed without saving the
+CourseEnrollment models (e.g. with raw SQL).
+"""
+import logging
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from student.models import CourseEnrollment, CourseEnrollmentCount
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Recompute the CourseEnrollmentCounts of courses.
+    """
+    args = "<course_id course_id ...>"
+    help = "Recompute the enrollment counts of the specified courses from the enrollment table."
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--all',
+            action='store_true',
+            default=False,
+            help="Recompute the enrollment counts of all courses with enrollments.",
+        ),
+    )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            course_keys = CourseEnrollment.objects.values_list('course_id', flat=True).distinct()
+        elif args:
+            course_keys = args
+        else:
+            raise CommandError("Specify course ids or --all.")
+
+        for course_key in course_keys:
+            try:
+                # values_list() returns the serialized key, not a CourseKey.
+                course_key = CourseKey.from_string(unicode(course_key))
+            except InvalidKeyError:
+                raise CommandError("Invalid course id {}".format(course_key))
+
+            counts = CourseEnrollmentCount.reconcile(course_key)
+            log.info("Enrollment counts for %s: %s", course_key, counts)
@@ -10,6 +10,7 @@ file and check it in at the same time as your model changes. To do that,
 2. ./manage.py lms schemamigration student --auto description_of_your_change
 3. Add the migration file created in edx-platform/common/djangoapps/student/migrations/
 """
+import calendar
 from collections import defaultdict, OrderedDict
 from datetime import datetime, timedelta
 from functools import total_ordering
@@ -29,7 +30,7 @@ from django.utils import timezone
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.signals import user_logged_in, user_logged_out
-from django.db import models, IntegrityError, transaction
+from django.db import models, IntegrityError, OperationalError, transaction
 from django.db.models import Count
 from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver, Signal
@@ -40,6 +41,7 @@ from django_countries.fields import CountryField
 import dogstats_wrapper as dog_stats_api
 from eventtracking import tracker
 from opaque_keys.edx.keys import CourseKey
+import request_cache
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from simple_history.models import HistoricalRecords
 from south.modelsinspector import add_introspection_rules
@@ -50,8 +52,8 @@ from certificates.models import GeneratedCertificate
 from course_modes.models import CourseMode
 import lms.lib.comment_client as cc
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+from util.db import run_after_commit
 from util.model_utils import emit_field_changed_events, get_changed_fields_dict
-from util.query import use_read_replica_if_available
 from util.milestones_helpers import is_entrance_exams_enabled
 
 
@@ -823,12 +825,7 @@ class CourseEnrollmentManager(models.Manager):
         'course_id' is the course_id to return enrollments
         """
 
-        enrollment_number = super(CourseEnrollmentManager, self).get_query_set().filter(
-            course_id=course_id,
-            is_active=1
-        ).count()
-
-        return enrollment_number
+        return sum(CourseEnrollmentCount.counts_for_course(course_id).values())
 
     def is_course_full(self, course):
         """
@@ -852,18 +849,26 @@ class CourseEnrollmentManager(models.Manager):
         Returns a dictionary that stores the total enrollment count for a course, as well as the
         enrollment count for each individual mode.
         """
-        # Unfortunately, Django's "group by"-style queries look super-awkward
-        query = use_read_replica_if_available(
-            super(CourseEnrollmentManager, self).get_query_set().filter(course_id=course_id, is_active=True).values(
-                'mode').order_by().annotate(Count('mode')))
         total = 0
         enroll_dict = defaultdict(int)
-        for item in query:
-            enroll_dict[item['mode']] = item['mode__count']
-            total += item['mode__count']
+        for mode, count in CourseEnrollmentCount.counts_for_course(course_id).iteritems():
+            if count:
+                enroll_dict[mode] = count
+                total += count
         enroll_dict['total'] = total
         return enroll_dict
 
+    def count_active_by_mode(self, course_id):
+        """
+        Returns a dictionary mapping each mode to the number of active enrollments
+        in that mode in the course, counted from the enrollment table.
+        """
+        # Unfortunately, Django's "group by"-style queries look super-awkward
+        query = super(CourseEnrollmentManager, self).get_query_set().filter(
+            course_id=course_id, is_active=True
+        ).values('mode').order_by().annotate(Count('mode'))
+        return {item['mode']: item['mode__count'] for item in query}
+
     def enrolled_and_dropped_out_users(self, course_id):
         """Return a queryset of Users in the course."""
         return User.objects.filter(
@@ -905,6 +910,13 @@ class CourseEnrollment(models.Model):
     # cache key format e.g enrollment.<username>.<course_key>.mode = 'honor'
     COURSE_ENROLLMENT_CACHE_KEY = u"enrollment.{}.{}.mode"
 
+    # cache key format e.g enrollment.snapshot.<user_id>.<date_joined timestamp>
+    ENROLLMENT_SNAPSHOT_CACHE_KEY = u"enrollment.snapshot.{}.{}"
+    ENROLLMENT_SNAPSHOT_REQUEST_CACHE = u"student.enrollment_snapshot"
+    # The snapshot is invalidated whenever an enrollment is saved, so this only
+    # bounds how long it can be stale if that save's transaction is rolled back.
+    ENROLLMENT_SNAPSHOT_CACHE_TIMEOUT = 15 * 60
+
     class Meta(object):
         unique_together = (('user', 'course_id'),)
         ordering = ('user', 'course_id')
@@ -1217,6 +1229,120 @@ class CourseEnrollment(models.Model):
                 return None
             raise
 
+    @classmethod
+    def bulk_enroll(cls, users, course_key, mode="honor"):
+        """
+        Enroll many users in a course with a few bulk queries, rather than a
+        few queries per user. This saves immediately.
+
+        Users who are already enrolled keep their mode, while new and
+        inactive enrollments are activated in `mode`.
+
+        Unlike `enroll`, this sends no model signals and emits no events:
+        the enrollment counts, the cached enrollment modes, snapshots and
+        dashboard payloads and the enrollment history are updated here, while
+        the caller is responsible for the other side effects of the new
+        enrollments (see `emit_event`).
+
+        If the bulk insert conflicts with a concurrent enrollment of one of
+        the users, each user is enrolled with `enroll` instead, which has all
+        of its usual side effects. Users who still fail to be enrolled are
+        logged and left out of the result.
+
+        Returns a tuple of a dict mapping the id of each user to their
+        CourseEnrollment, and the list of the enrollments that were
+        activated in bulk.
+
+        It is expected that this method is called from a method which has already
+        verified the user authentication and access.
+        """
+        users = {user.id: user for user in users}
+        if not users:
+            return {}, []
+
+        existing = {
+            enrollment.user_id: enrollment
+            for enrollment in cls.objects.filter(course_id=course_key, user_id__in=users.keys())
+        }
+        created_ids = set(users) - set(existing)
+        reactivated_ids = set(
+            user_id for user_id, enrollment in existing.iteritems() if not enrollment.is_active
+        )
+
+        activated_ids = created_ids | reactivated_ids
+        savepoint = transaction.savepoint()
+        try:
+            cls.objects.bulk_create([
+                cls(user_id=user_id, course_id=course_key, mode=mode, is_active=True) for user_id in created_ids
+            ])
+            if reactivated_ids:
+                cls.objects.filter(course_id=course_key, user_id__in=reactivated_ids).update(is_active=True, mode=mode)
+        except (IntegrityError, OperationalError):
+            # One of the users was enrolled concurrently, so enroll them one at a time.
+            transaction.savepoint_rollback(savepoint)
+            log.warning(u"Bulk enrollment in %s conflicted, enrolling users one at a time", course_key)
+            return cls._enroll_each(users, activated_ids, existing, course_key, mode), []
+        transaction.savepoint_commit(savepoint)
+
+        enrollments = {}
+        activated = []
+        for enrollment in cls.objects.filter(course_id=course_key, user_id__in=users.keys()):
+            enrollment.user = users[enrollment.user_id]
+            enrollments[enrollment.user_id] = enrollment
+            if enrollment.user_id in activated_ids:
+                activated.append(enrollment)
+
+        if activated:
+            CourseEnrollmentCount.apply_deltas_after_commit(course_key, {mode: len(activated)})
+            # The mode of reactivated enrollments may have changed, which
+            # invalidate_enrollment_mode_cache isn't called for here.
+            mode_cache_keys = [cls.cache_key_name(enrollment.user_id, course_key) for enrollment in activated]
+            cache.delete_many(mode_cache_keys)
+            run_after_commit(cache.delete_many, mode_cache_keys)
+            cls.invalidate_enrollment_snapshots([enrollment.user for enrollment in activated])
+            invalidate_dashboard_payloads([enrollment.user for enrollment in activated])
+
+            history_model = cls.history.model
+            now = timezone.now()
+            history_model.objects.bulk_create([
+                history_model(
+                    id=enrollment.id,
+                    user_id=enrollment.user_id,
+                    course_id=enrollment.course_id,
+                    created=enrollment.created,
+                    is_active=enrollment.is_active,
+                    mode=enrollment.mode,
+                    history_date=now,
+                    history_type='+' if enrollment.user_id in created_ids else '~',
+                )
+                for enrollment in activated
+            ])
+
+        return enrollments, activated
+
+    @classmethod
+    def _enroll_each(cls, users, activated_ids, existing, course_key, mode):
+        """
+        Enroll the users with ids `activated_ids` one at a time, for
+        `bulk_enroll`, and return a dict mapping the id of each user who is
+        enrolled to their CourseEnrollment.
+        """
+        enrollments = {
+            user_id: enrollment for user_id, enrollment in existing.iteritems() if user_id not in activated_ids
+        }
+        for user_id in activated_ids:
+            savepoint = transaction.savepoint()
+            try:
+                enrollments[user_id] = cls.enroll(users[user_id], course_key, mode)
+            except Exception:  # pylint: disable=broad-except
+                transaction.savepoint_rollback(savepoint)
+                log.exception(u"Error while enrolling user %s in %s", user_id, course_key)
+            else:
+                transaction.savepoint_commit(savepoint)
+        for enrollment in enrollments.itervalues():
+            enrollment.user = users[enrollment.user_id]
+        return enrollments
+
     @classmethod
     def unenroll(cls, user, course_id, skip_refund=False):
         """
@@ -1277,11 +1403,8 @@ class CourseEnrollment(models.Model):
         if not user.is_authenticated():
             return False
 
-        try:
-            record = CourseEnrollment.objects.get(user=user, course_id=course_key)
-            return record.is_active
-        except cls.DoesNotExist:
-            return False
+        __, is_active = cls.enrollment_snapshot(user).get(unicode(course_key), (None, False))
+        return is_active
 
     @classmethod
     def is_enrolled_by_partial(cls, user, course_id_partial):
@@ -1302,14 +1425,10 @@ class CourseEnrollment(models.Model):
         assert not course_id_partial.run  # None or empty string
         course_key = SlashSeparatedCourseKey(course_id_partial.org, course_id_partial.course, '')
         querystring = unicode(course_key.to_deprecated_string())
-        try:
-            return CourseEnrollment.objects.filter(
-                user=user,
-                course_id__startswith=querystring,
-                is_active=1
-            ).exists()
-        except cls.DoesNotExist:
-            return False
+        return any(
+            course_id.startswith(querystring) and is_active
+            for course_id, (__, is_active) in cls.enrollment_snapshot(user).iteritems()
+        )
 
     @classmethod
     def enrollment_mode_for_user(cls, user, course_id):
@@ -1323,11 +1442,7 @@ class CourseEnrollment(models.Model):
             and is_active is whether the enrollment is active.
         Returns (None, None) if the courseenrollment record does not exist.
         """
-        try:
-            record = CourseEnrollment.objects.get(user=user, course_id=course_id)
-            return (record.mode, record.is_active)
-        except cls.DoesNotExist:
-            return (None, None)
+        return cls.enrollment_snapshot(user).get(unicode(course_id), (None, None))
 
     @classmethod
     def enrollments_for_user(cls, user):
@@ -1409,6 +1524,16 @@ class CourseEnrollment(models.Model):
                 self._course_overview = None
         return self._course_overview
 
+    @classmethod
+    def prefetch_course_overviews(cls, enrollments):
+        """
+        Load the CourseOverviews of all of `enrollments` at once, rather than
+        one at a time as their `course_overview` is accessed.
+        """
+        course_overviews = CourseOverview.get_from_ids(enrollment.course_id for enrollment in enrollments)
+        for enrollment in enrollments:
+            enrollment._course_overview = course_overviews.get(enrollment.course_id)  # pylint: disable=protected-access
+
     def is_verified_enrollment(self):
         """
         Check the course enrollment mode is verified or not
@@ -1427,12 +1552,8 @@ class CourseEnrollment(models.Model):
         Returns: bool
 
         """
-        enrollment = cls.get_enrollment(user, course_key)
-        return (
-            enrollment is not None and
-            enrollment.is_active and
-            enrollment.is_verified_enrollment()
-        )
+        mode, is_active = cls.enrollment_mode_for_user(user, course_key)
+        return bool(is_active and CourseMode.is_verified_slug(mode))
 
     @classmethod
     def cache_key_name(cls, user_id, course_key):
@@ -1446,6 +1567,113 @@ class CourseEnrollment(models.Model):
         """
         return cls.COURSE_ENROLLMENT_CACHE_KEY.format(user_id, unicode(course_key))
 
+    @classmethod
+    def enrollment_snapshot_cache_key(cls, user):
+        """
+        Return the cache key of the enrollment snapshot of `user`.
+        """
+        return user_cache_key(cls.ENROLLMENT_SNAPSHOT_CACHE_KEY, user)
+
+    @classmethod
+    def _enrollment_snapshot_request_cache(cls):
+        """
+        Return the request cache of enrollment snapshots, or None outside of
+        a request (such as in celery tasks, where the request cache is never
+        cleared).
+        """
+        if request_cache.get_request() is None:
+            return None
+        return request_cache.get_cache(cls.ENROLLMENT_SNAPSHOT_REQUEST_CACHE)
+
+    @classmethod
+    def enrollment_snapshot(cls, user):
+        """
+        Return a dict mapping the unicode course id of each of the user's
+        enrollments (active or not) to its (mode, is_active).
+
+        The snapshot is cached for the request and in the shared cache, and
+        is invalidated whenever one of the user's enrollments is saved or
+        deleted, so that enrollment checks don't each query the database.
+        """
+        if user.id is None:
+            return {}
+
+        cache_key = cls.enrollment_snapshot_cache_key(user)
+        snapshots = cls._enrollment_snapshot_request_cache()
+        snapshot = snapshots.get(cache_key) if snapshots is not None else None
+        if snapshot is None:
+            snapshot = cache.get(cache_key)
+        if snapshot is None:
+            snapshot = {
+                unicode(course_id): (mode, is_active)
+                for course_id, mode, is_active in CourseEnrollment.objects.filter(
+                    user_id=user.id
+                ).values_list('course_id', 'mode', 'is_active')
+            }
+            cache.set(cache_key, snapshot, cls.ENROLLMENT_SNAPSHOT_CACHE_TIMEOUT)
+        if snapshots is not None:
+            snapshots[cache_key] = snapshot
+        return snapshot
+
+    @classmethod
+    def invalidate_enrollment_snapshot(cls, user):
+        """
+        Forget the cached enrollment snapshot of `user`.
+        """
+        cls.invalidate_enrollment_snapshots([user])
+
+    @classmethod
+    def invalidate_enrollment_snapshots(cls, users):
+        """
+        Forget the cached enrollment snapshots of all of `users`, both now
+        and once the current transaction is committed.
+        """
+        cache_keys = [cls.enrollment_snapshot_cache_key(user) for user in users]
+        snapshots = cls._enrollment_snapshot_request_cache()
+        if snapshots is not None:
+            for cache_key in cache_keys:
+                snapshots.pop(cache_key, None)
+        cache.delete_many(cache_keys)
+        run_after_commit(cache.delete_many, cache_keys)
+
+
+def user_cache_key(template, user):
+    """
+    Return the cache key of `user` built from `template`, which is formatted
+    with the id of the user and when they joined.
+
+    Including when the user joined means that cached data is never read for a
+    different user that was given the same id (for example after the rows of
+    a test were rolled back).
+    """
+    date_joined = ''
+    if user.date_joined:
+        date_joined = '{}.{}'.format(calendar.timegm(user.date_joined.utctimetuple()), user.date_joined.microsecond)
+    return template.format(user.id, date_joined)
+
+
+# The dashboard of a user is built from a cached payload of their enrollments,
+# certificate statuses and email opt-outs when
+# FEATURES['ENABLE_DASHBOARD_PAYLOAD_CACHE'] is set (see student.views.dashboard).
+DASHBOARD_PAYLOAD_CACHE_KEY = u"dashboard.payload.{}.{}"
+
+
+def dashboard_payload_cache_key(user):
+    """
+    Return the cache key of the dashboard payload of `user`.
+    """
+    return user_cache_key(DASHBOARD_PAYLOAD_CACHE_KEY, user)
+
+
+def invalidate_dashboard_payloads(users):
+    """
+    Forget the cached dashboard payloads of all of `users`, both now and once
+    the current transaction is committed.
+    """
+    cache_keys = [dashboard_payload_cache_key(user) for user in users]
+    cache.delete_many(cache_keys)
+    run_after_commit(cache.delete_many, cache_keys)
+
 
 @receiver(models.signals.post_save, sender=CourseEnrollment)
 @receiver(models.signals.post_delete, sender=CourseEnrollment)
@@ -1457,6 +1685,171 @@ def invalidate_enrollment_mode_cache(sender, instance, **kwargs):  # pylint: dis
         unicode(instance.course_id)
     )
     cache.delete(cache_key)
+    # Concurrent requests may cache the old mode again until the change is
+    # committed (see util.db.run_after_commit).
+    run_after_commit(cache.delete, cache_key)
+    CourseEnrollment.invalidate_enrollment_snapshot(instance.user)
+    invalidate_dashboard_payloads([instance.user])
+
+
+@receiver(models.signals.post_save, sender=GeneratedCertificate)
+@receiver(models.signals.post_delete, sender=GeneratedCertificate)
+def invalidate_dashboard_payload_on_certificate_change(sender, instance, **kwargs):  # pylint: disable=unused-argument, invalid-name
+    """Invalidate the dashboard payload of the user of a changed certificate."""
+    invalidate_dashboard_payloads([instance.user])
+
+
+class CourseEnrollmentCount(models.Model):
+    """
+    The number of active enrollments in each mode of a course.
+
+    The counts are updated after enrollments are saved and deleted, once
+    their transaction is committed, so that the enrollment counts of a course
+    don't have to be computed from the enrollment table. The counts of a course are created from the enrollment
+    table the first time they are read, and are recomputed periodically by
+    the `student.tasks.reconcile_enrollment_counts` task, and on demand by
+    the `reconcile_enrollment_counts` management command.
+    """
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    mode = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+
+    class Meta(object):
+        unique_together = (('course_id', 'mode'),)
+
+    def __unicode__(self):
+        return u"[CourseEnrollmentCount] {}: {} {}".format(self.course_id, self.mode, self.count)
+
+    @classmethod
+    def counts_for_course(cls, course_id):
+        """
+        Returns a dict mapping each mode to the number of active enrollments in
+        that mode in the course.
+        """
+        counts = dict(cls.objects.filter(course_id=course_id).values_list('mode', 'count'))
+        if not counts:
+            counts = cls.reconcile(course_id)
+        return counts
+
+    @classmethod
+    def reconcile(cls, course_id):
+        """
+        Set the counts for the course to counts computed from the enrollment
+        table, and return them.
+
+        The existing counts are locked while the enrollments are counted, so
+        that deltas applied meanwhile wait for the new counts rather than
+        being overwritten. Modes with no active enrollments left are counted
+        as zero, and a course with no enrollments gets a zero count for the
+        honor mode, so that its counts are known to have been computed.
+        """
+        existing = {
+            row.mode: row for row in cls.objects.select_for_update().filter(course_id=course_id)
+        }
+        counts = CourseEnrollment.objects.count_active_by_mode(course_id) or {'honor': 0}
+        for mode, row in existing.iteritems():
+            count = counts.get(mode, 0)
+            if row.count != count:
+                cls.objects.filter(pk=row.pk).update(count=count)
+        for mode in set(counts) - set(existing):
+            row, created = cls.objects.get_or_create(course_id=course_id, mode=mode, defaults={'count': counts[mode]})
+            if not created:
+                cls.objects.filter(pk=row.pk).update(count=counts[mode])
+        return counts
+
+    @classmethod
+    def update_counts(cls, course_id, old_state, new_state):
+        """
+        Update the counts of the course for an enrollment that changed from
+        `old_state` to `new_state`, each a (mode, is_active) tuple or None.
+        """
+        deltas = defaultdict(int)
+        if old_state is not None and old_state[1]:
+            deltas[old_state[0]] -= 1
+        if new_state is not None and new_state[1]:
+            deltas[new_state[0]] += 1
+        cls.apply_deltas_after_commit(course_id, deltas)
+
+    @classmethod
+    def apply_deltas_after_commit(cls, course_id, deltas):
+        """
+        Apply `deltas` to the counts of the course once the current
+        transaction is committed, in a short transaction of their own, so
+        that the count rows aren't locked while the rest of the request runs.
+
+        Deltas that are lost, e.g. when the process dies before applying
+        them, are corrected by `reconcile`.
+        """
+        run_after_commit(cls._apply_deltas_in_transaction, course_id, dict(deltas))
+
+    @classmethod
+    def _apply_deltas_in_transaction(cls, course_id, deltas):
+        """
+        Apply `deltas` in the current transaction if there is one, or else in
+        a new one.
+        """
+        if transaction.is_managed():
+            cls.apply_deltas(course_id, deltas)
+        else:
+            with transaction.commit_on_success():
+                cls.apply_deltas(course_id, deltas)
+
+    @classmethod
+    def apply_deltas(cls, course_id, deltas):
+        """
+        Add `deltas`, a dict mapping modes to changes in the number of active
+        enrollments, to the counts of the course.
+        """
+        for mode, delta in deltas.iteritems():
+            if not delta:
+                continue
+            counts = cls.objects.filter(course_id=course_id, mode=mode)
+            if not counts.update(count=models.F('count') + delta):
+                if not cls.objects.filter(course_id=course_id).exists():
+                    # The counts of the course haven't been computed yet, and
+                    # will be computed from the enrollment table when read.
+                    return
+                # This is the first enrollment in this mode.
+                cls.objects.get_or_create(course_id=course_id, mode=mode)
+                counts.update(count=models.F('count') + delta)
+
+
+def _stored_enrollment_state(enrollment):
+    """
+    Return the (mode, is_active) of the stored row of `enrollment`, or None if
+    it has none.
+
+    The stored row is read rather than the state the instance was loaded
+    with, so that changes saved from stale instances are counted from the
+    state left by the previous change.
+    """
+    if enrollment.pk is None:
+        return None
+    states = list(CourseEnrollment.objects.filter(pk=enrollment.pk).values_list('mode', 'is_active'))
+    return states[0] if states else None
+
+
+@receiver(models.signals.pre_save, sender=CourseEnrollment)
+@receiver(models.signals.pre_delete, sender=CourseEnrollment)
+def read_enrollment_for_counts(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Read the counted state of the enrollment before it's changed."""
+    instance._counted_state = _stored_enrollment_state(instance)  # pylint: disable=protected-access
+
+
+@receiver(models.signals.post_save, sender=CourseEnrollment)
+def update_enrollment_counts_on_save(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Update the CourseEnrollmentCounts of the course for the saved enrollment."""
+    old_state = instance._counted_state  # pylint: disable=protected-access
+    new_state = (instance.mode, instance.is_active)
+    if old_state != new_state:
+        CourseEnrollmentCount.update_counts(instance.course_id, old_state, new_state)
+
+
+@receiver(models.signals.post_delete, sender=CourseEnrollment)
+def update_enrollment_counts_on_delete(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Update the CourseEnrollmentCounts of the course for the deleted enrollment."""
+    old_state = instance._counted_state  # pylint: disable=protected-access
+    CourseEnrollmentCount.update_counts(instance.course_id, old_state, None)
 
 
 class ManualEnrollmentAudit(models.Model):
@@ -0,0 +1,26 @@
+"""
+Celery tasks of the student app
+"""
+import logging
+
+from celery.task import task  # pylint: disable=import-error,no-name-in-module
+from django.db import transaction
+
+from student.models import CourseEnrollmentCount
+
+log = logging.getLogger(__name__)
+
+
+@task(name='student.tasks.reconcile_enrollment_counts')
+def reconcile_enrollment_counts():
+    """
+    Recompute the CourseEnrollmentCounts of each course whose counts have been
+    computed from the enrollment table, correcting any drift.
+
+    Run periodically by celerybeat, every settings.ENROLLMENT_COUNTS_RECONCILE_PERIOD_HOURS.
+    """
+    course_ids = CourseEnrollmentCount.objects.values_list('course_id', flat=True).distinct()
+    for course_id in course_ids:
+        with transaction.commit_on_success():
+            counts = CourseEnrollmentCount.reconcile(course_id)
+        log.info(u"Enrollment counts for %s: %s", course_id, counts)
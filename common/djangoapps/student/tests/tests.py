@@ -17,14 +17,19 @@ from mock import Mock, patch
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
 from student.models import (
-    anonymous_id_for_user, user_by_anonymous_id, CourseEnrollment, unique_id_for_user, LinkedInAddToProfileConfiguration
+    anonymous_id_for_user, user_by_anonymous_id, CourseEnrollment, CourseEnrollmentCount, unique_id_for_user,
+    LinkedInAddToProfileConfiguration
 )
+from student.tasks import reconcile_enrollment_counts
 from student.views import (
     process_survey_link,
     _cert_info,
     complete_course_mode_info,
+    get_dashboard_payload,
 )
 from student.tests.factories import UserFactory, CourseModeFactory
+from request_cache import get_cache
+from util.db import AFTER_COMMIT_CACHE_NAME, run_after_commit_callbacks
 from util.testing import EventTestMixin
 from util.model_utils import USER_SETTINGS_CHANGED_EVENT_NAME
 from xmodule.modulestore.tests.factories import CourseFactory, check_mongo_calls
@@ -537,6 +542,42 @@ class DashboardTest(ModuleStoreTestCase):
         self.assertNotContains(response, "How it Works")
         self.assertNotContains(response, "Schools & Partners")
 
+    @unittest.skipUnless(settings.ROOT_URLCONF == 'lms.urls', 'Test only valid in lms')
+    @patch.dict(settings.FEATURES, {'ENABLE_DASHBOARD_PAYLOAD_CACHE': True})
+    def test_dashboard_payload_cache(self):
+        course_id = unicode(self.course.id)
+        CourseEnrollment.enroll(self.user, self.course.id)
+
+        payload = get_dashboard_payload(self.user)
+        self.assertEqual([enrollment['course_id'] for enrollment in payload['enrollments']], [course_id])
+        self.assertEqual(payload['cert_statuses'][course_id]['status'], CertificateStatuses.unavailable)
+        self.assertEqual(payload['course_optouts'], [])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_dashboard_payload(self.user), payload)
+
+        # The payload is invalidated when the certificates, opt-outs or
+        # enrollments of the user change.
+        GeneratedCertificateFactory.create(
+            user=self.user,
+            course_id=self.course.id,
+            status=CertificateStatuses.downloadable,
+            mode='honor',
+            grade='67',
+            download_url='www.edx.org'
+        )
+        self.assertEqual(
+            get_dashboard_payload(self.user)['cert_statuses'][course_id]['status'], CertificateStatuses.downloadable
+        )
+        Optout.objects.create(user=self.user, course_id=self.course.id)
+        self.assertEqual(get_dashboard_payload(self.user)['course_optouts'], [course_id])
+
+        self.client.login(username="jack", password="test")
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, self.course.display_name)
+
+        CourseEnrollment.unenroll(self.user, self.course.id)
+        self.assertEqual(get_dashboard_payload(self.user)['enrollments'], [])
+
     def test_course_mode_info_with_honor_enrollment(self):
         """It will be true only if enrollment mode is honor and course has verified mode."""
         course_mode_info = self._enrollment_with_complete_course('honor')
@@ -812,6 +853,133 @@ class EnrollInCourseTest(EnrollmentEventTestMixin, TestCase):
         CourseEnrollment.enroll(user, course_id, "honor")
         self.assert_enrollment_mode_change_event_was_emitted(user, course_id, "honor")
 
+    def test_enrollment_checks_use_snapshot(self):
+        user = User.objects.create(username="snapshot", email="snapshot@fake.edx.org")
+        course_id = SlashSeparatedCourseKey("edX", "Test101", "2013")
+        course_id_partial = SlashSeparatedCourseKey("edX", "Test101", None)
+        CourseEnrollment.enroll(user, course_id, "verified")
+
+        # The snapshot is loaded once, and then answers all the checks.
+        with self.assertNumQueries(1):
+            self.assertTrue(CourseEnrollment.is_enrolled(user, course_id))
+            self.assertTrue(CourseEnrollment.is_enrolled_by_partial(user, course_id_partial))
+            self.assertEquals(CourseEnrollment.enrollment_mode_for_user(user, course_id), ("verified", True))
+            self.assertTrue(CourseEnrollment.is_enrolled_as_verified(user, course_id))
+
+        # Changing the enrollment invalidates the snapshot.
+        CourseEnrollment.unenroll(user, course_id)
+        self.assertFalse(CourseEnrollment.is_enrolled(user, course_id))
+        self.assertFalse(CourseEnrollment.is_enrolled_by_partial(user, course_id_partial))
+        self.assertEquals(CourseEnrollment.enrollment_mode_for_user(user, course_id), ("verified", False))
+
+
+class CourseEnrollmentCountTest(TestCase):
+    """Tests for the enrollment counts maintained in CourseEnrollmentCount."""
+
+    def setUp(self):
+        super(CourseEnrollmentCountTest, self).setUp()
+        self.course_id = SlashSeparatedCourseKey("edX", "Test101", "2013")
+        self.users = [UserFactory.create() for __ in xrange(3)]
+
+    def assert_counts(self, expected):
+        """Check the counts, and that they match the enrollment table."""
+        counts = CourseEnrollment.objects.enrollment_counts(self.course_id)
+        self.assertEquals(dict(counts), expected)
+        self.assertEquals(CourseEnrollment.objects.num_enrolled_in(self.course_id), expected['total'])
+
+        self.assertEquals(CourseEnrollment.objects.count_active_by_mode(self.course_id), {
+            mode: count for mode, count in expected.iteritems() if mode != 'total'
+        })
+
+    def test_counts_are_maintained(self):
+        self.assert_counts({'total': 0})
+
+        CourseEnrollment.enroll(self.users[0], self.course_id, "honor")
+        CourseEnrollment.enroll(self.users[1], self.course_id, "honor")
+        self.assert_counts({'honor': 2, 'total': 2})
+
+        # Reading the counts doesn't count the enrollment table.
+        with self.assertNumQueries(1):
+            CourseEnrollment.objects.num_enrolled_in(self.course_id)
+
+        CourseEnrollment.enroll(self.users[2], self.course_id, "verified")
+        self.assert_counts({'honor': 2, 'verified': 1, 'total': 3})
+
+        CourseEnrollment.enroll(self.users[0], self.course_id, "verified")
+        CourseEnrollment.unenroll(self.users[1], self.course_id)
+        self.assert_counts({'verified': 2, 'total': 2})
+
+        CourseEnrollment.objects.get(user=self.users[2], course_id=self.course_id).delete()
+        self.assert_counts({'verified': 1, 'total': 1})
+
+    def test_reconcile(self):
+        CourseEnrollment.enroll(self.users[0], self.course_id, "honor")
+        self.assert_counts({'honor': 1, 'total': 1})
+
+        CourseEnrollmentCount.objects.filter(course_id=self.course_id).update(count=5)
+        CourseEnrollmentCount.reconcile(self.course_id)
+        self.assert_counts({'honor': 1, 'total': 1})
+
+    def test_reconcile_zeroes_modes_without_enrollments(self):
+        CourseEnrollment.enroll(self.users[0], self.course_id, "verified")
+        CourseEnrollmentCount.objects.create(course_id=self.course_id, mode='audit', count=3)
+
+        CourseEnrollmentCount.reconcile(self.course_id)
+        self.assertEquals(
+            dict(CourseEnrollmentCount.objects.filter(course_id=self.course_id).values_list('mode', 'count')),
+            {'verified': 1, 'audit': 0}
+        )
+        self.assert_counts({'verified': 1, 'total': 1})
+
+    def test_deltas_applied_after_commit(self):
+        CourseEnrollment.enroll(self.users[0], self.course_id, "honor")
+        self.assert_counts({'honor': 1, 'total': 1})
+
+        # As during a request handled by AfterCommitMiddleware.
+        get_cache(AFTER_COMMIT_CACHE_NAME)['callbacks'] = []
+        try:
+            CourseEnrollment.enroll(self.users[1], self.course_id, "honor")
+            self.assertEquals(CourseEnrollmentCount.counts_for_course(self.course_id), {'honor': 1})
+            run_after_commit_callbacks()
+        finally:
+            get_cache(AFTER_COMMIT_CACHE_NAME).pop('callbacks', None)
+        self.assert_counts({'honor': 2, 'total': 2})
+
+    def test_reconcile_task(self):
+        CourseEnrollment.enroll(self.users[0], self.course_id, "honor")
+        self.assert_counts({'honor': 1, 'total': 1})
+
+        CourseEnrollmentCount.objects.filter(course_id=self.course_id).update(count=5)
+        reconcile_enrollment_counts()
+        self.assert_counts({'honor': 1, 'total': 1})
+
+    def test_stale_instances_counted_once(self):
+        CourseEnrollment.enroll(self.users[0], self.course_id, "honor")
+        CourseEnrollment.enroll(self.users[1], self.course_id, "honor")
+        self.assert_counts({'honor': 2, 'total': 2})
+
+        # Both instances were read before either was saved, as by concurrent requests.
+        first, second = [CourseEnrollment.objects.get(user=self.users[0], course_id=self.course_id) for __ in xrange(2)]
+        for enrollment in (first, second):
+            enrollment.is_active = False
+            enrollment.save()
+        self.assert_counts({'honor': 1, 'total': 1})
+
+        first.delete()
+        second.delete()
+        self.assert_counts({'honor': 1, 'total': 1})
+
+    def test_first_enrollment_in_mode(self):
+        CourseEnrollment.enroll(self.users[0], self.course_id, "honor")
+        self.assert_counts({'honor': 1, 'total': 1})
+
+        CourseEnrollment.enroll(self.users[1], self.course_id, "verified")
+        self.assertEquals(
+            dict(CourseEnrollmentCount.objects.filter(course_id=self.course_id).values_list('mode', 'count')),
+            {'honor': 1, 'verified': 1}
+        )
+        self.assert_counts({'honor': 1, 'verified': 1, 'total': 2})
+
 
 @unittest.skipUnless(settings.ROOT_URLCONF == 'lms.urls', 'Test only valid in lms')
 class ChangeEnrollmentViewTest(ModuleStoreTestCase):
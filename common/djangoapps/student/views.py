@@ -19,6 +19,7 @@ from django.contrib.auth.views import password_reset_confirm
 from django.contrib import messages
 from django.core.context_processors import csrf
 from django.core import mail
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.core.validators import validate_email, ValidationError
 from django.db import IntegrityError, transaction
@@ -50,11 +51,14 @@ from student.models import (
     PendingEmailChange, CourseEnrollment, CourseEnrollmentAttribute, unique_id_for_user,
     CourseEnrollmentAllowed, UserStanding, LoginFailures,
     create_comments_service_user, PasswordHistory, UserSignupSource,
-    DashboardConfiguration, LinkedInAddToProfileConfiguration, ManualEnrollmentAudit, ALLOWEDTOENROLL_TO_ENROLLED)
+    DashboardConfiguration, LinkedInAddToProfileConfiguration, ManualEnrollmentAudit, ALLOWEDTOENROLL_TO_ENROLLED,
+    dashboard_payload_cache_key)
 from student.forms import AccountCreationForm, PasswordResetFormNoActive
 
 from verify_student.models import SoftwareSecurePhotoVerification  # pylint: disable=import-error
-from certificates.models import CertificateStatuses, certificate_status_for_student
+from certificates.models import (
+    CertificateStatuses, certificate_status_for_student, certificate_statuses_for_student
+)
 from certificates.api import (  # pylint: disable=import-error
     get_certificate_url,
     has_html_certificates_enabled,
@@ -181,7 +185,7 @@ def process_survey_link(survey_link, user):
     return survey_link.format(UNIQUE_ID=unique_id_for_user(user))
 
 
-def cert_info(user, course_overview, course_mode):
+def cert_info(user, course_overview, course_mode, cert_status=None):
     """
     Get the certificate info needed to render the dashboard section for the given
     student and course.
@@ -190,6 +194,8 @@ def cert_info(user, course_overview, course_mode):
         user (User): A user.
         course_overview (CourseOverview): A course.
         course_mode (str): The enrollment mode (honor, verified, audit, etc.)
+        cert_status (dict): The certificate status of the user in the course,
+            if it is already known.
 
     Returns:
         dict: A dictionary with keys:
@@ -203,12 +209,9 @@ def cert_info(user, course_overview, course_mode):
     """
     if not course_overview.may_certify():
         return {}
-    return _cert_info(
-        user,
-        course_overview,
-        certificate_status_for_student(user, course_overview.id),
-        course_mode
-    )
+    if cert_status is None:
+        cert_status = certificate_status_for_student(user, course_overview.id)
+    return _cert_info(user, course_overview, cert_status, course_mode)
 
 
 def reverification_info(statuses):
@@ -234,7 +237,47 @@ def reverification_info(statuses):
     return reverifications
 
 
-def get_course_enrollments(user, org_to_include, orgs_to_exclude):
+def get_dashboard_payload(user):
+    """
+    Return the data of the user's dashboard that only changes when their
+    enrollments, certificates or email opt-outs do.
+
+    The payload is loaded with one query per kind of data, and cached until
+    one of those changes (see student.models.invalidate_dashboard_payloads).
+
+    Returns:
+        dict: with keys:
+            * enrollments (list[dict]): The id, course_id, mode and created
+              date of each active enrollment of the user.
+            * cert_statuses (dict): The certificate status of the user in each
+              of those courses, keyed by course id.
+            * course_optouts (list[unicode]): The courses whose emails the user
+              has opted out of.
+        Course ids are unicode strings.
+    """
+    cache_key = dashboard_payload_cache_key(user)
+    payload = cache.get(cache_key)
+    if payload is None:
+        enrollments = [
+            dict(values, course_id=unicode(values['course_id']))
+            for values in CourseEnrollment.enrollments_for_user(user).values('id', 'course_id', 'mode', 'created')
+        ]
+        course_keys = [CourseKey.from_string(enrollment['course_id']) for enrollment in enrollments]
+        payload = {
+            'enrollments': enrollments,
+            'cert_statuses': {
+                unicode(course_key): cert_status
+                for course_key, cert_status in certificate_statuses_for_student(user, course_keys).iteritems()
+            },
+            'course_optouts': [
+                unicode(course_id) for course_id in Optout.objects.filter(user=user).values_list('course_id', flat=True)
+            ],
+        }
+        cache.set(cache_key, payload, settings.DASHBOARD_PAYLOAD_CACHE_TIMEOUT)
+    return payload
+
+
+def get_course_enrollments(user, org_to_include, orgs_to_exclude, enrollments=None):
     """
     Given a user, return a filtered set of his or her course enrollments.
 
@@ -244,12 +287,18 @@ def get_course_enrollments(user, org_to_include, orgs_to_exclude):
             of this org will be returned.
         orgs_to_exclude (list[str]): If org_to_include is not None, this
             argument is ignored. Else, courses of this org will be excluded.
+        enrollments (list[CourseEnrollment]): the active enrollments of the
+            user, if they are already loaded.
 
     Returns:
         generator[CourseEnrollment]: a sequence of enrollments to be displayed
         on the user's dashboard.
     """
-    for enrollment in CourseEnrollment.enrollments_for_user(user):
+    if enrollments is None:
+        enrollments = list(CourseEnrollment.enrollments_for_user(user))
+    CourseEnrollment.prefetch_course_overviews(enrollments)
+
+    for enrollment in enrollments:
 
         # If the course is missing or broken, log an error and skip it.
         course_overview = enrollment.course_overview
@@ -526,10 +575,27 @@ def dashboard(request):
     if course_org_filter:
         org_filter_out_set.remove(course_org_filter)
 
+    # The user's enrollments, certificate statuses and email opt-outs are
+    # read from a single cached payload, rather than queried on each request.
+    payload = None
+    if settings.FEATURES.get('ENABLE_DASHBOARD_PAYLOAD_CACHE'):
+        payload = get_dashboard_payload(user)
+
+    enrollments = None
+    if payload is not None:
+        enrollments = [
+            CourseEnrollment(
+                user=user,
+                is_active=True,
+                **dict(values, course_id=CourseKey.from_string(values['course_id']))
+            )
+            for values in payload['enrollments']
+        ]
+
     # Build our (course, enrollment) list for the user, but ignore any courses that no
     # longer exist (because the course IDs have changed). Still, we don't delete those
     # enrollments, because it could have been a data push snafu.
-    course_enrollments = list(get_course_enrollments(user, course_org_filter, org_filter_out_set))
+    course_enrollments = list(get_course_enrollments(user, course_org_filter, org_filter_out_set, enrollments))
 
     # sort the enrollment pairs by the enrollment date
     course_enrollments.sort(key=lambda x: x.created, reverse=True)
@@ -551,7 +617,10 @@ def dashboard(request):
         course_enrollments, course_modes_by_course
     )
 
-    course_optouts = Optout.objects.filter(user=user).values_list('course_id', flat=True)
+    if payload is not None:
+        course_optouts = payload['course_optouts']
+    else:
+        course_optouts = Optout.objects.filter(user=user).values_list('course_id', flat=True)
 
     message = ""
     if not user.is_active:
@@ -608,7 +677,10 @@ def dashboard(request):
     # there is no verification messaging to display.
     verify_status_by_course = check_verify_status_by_course(user, course_enrollments)
     cert_statuses = {
-        enrollment.course_id: cert_info(request.user, enrollment.course_overview, enrollment.mode)
+        enrollment.course_id: cert_info(
+            request.user, enrollment.course_overview, enrollment.mode,
+            cert_status=payload['cert_statuses'].get(unicode(enrollment.course_id)) if payload else None
+        )
         for enrollment in course_enrollments
     }
 
@@ -26,3 +26,14 @@ class BaseBackend(object):
     def send(self, event):
         """Send event to tracker."""
         pass
+
+    def send_many(self, events):
+        """
+        Send a batch of events to tracker.
+
+        Backends that can store a batch of events more efficiently than
+        one event at a time should override this.
+
+        """
+        for event in events:
+            self.send(event)
@@ -0,0 +1,251 @@
+"""
+Event tracker backend that queues events in memory and sends them to
+another backend in batches from a background thread, so that storing
+events doesn't add to the latency of the request that emitted them.
+
+The backend wraps another backend, configured the same way as the
+entries of `TRACKING_BACKENDS`::
+
+  TRACKING_BACKENDS = {
+      'sql': {
+          'ENGINE': 'track.backends.buffered.BufferedBackend',
+          'OPTIONS': {
+              'backend': {
+                  'ENGINE': 'track.backends.django.DjangoBackend',
+              },
+              'max_queue_size': 10000,
+              'batch_size': 500,
+              'overflow': 'spill',
+              'spill_path': '/var/tmp/tracking-sql.spill',
+          }
+      }
+  }
+
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import json
+import logging
+import os
+import Queue
+import threading
+import time
+
+from dogapi import dog_stats_api
+
+from track.backends import BaseBackend
+from track.utils import DateTimeJSONEncoder
+
+
+log = logging.getLogger(__name__)
+
+
+# What to do with an event when the queue is full.
+OVERFLOW_DROP = 'drop'
+OVERFLOW_BLOCK = 'block'
+OVERFLOW_SPILL = 'spill'
+OVERFLOW_POLICIES = (OVERFLOW_DROP, OVERFLOW_BLOCK, OVERFLOW_SPILL)
+
+
+class BufferedBackend(BaseBackend):
+    """
+    Event tracker backend that sends events to another backend in batches
+    from a background thread.
+
+    Events that are queued when the process exits are flushed by an
+    `atexit` handler.
+
+    """
+
+    def __init__(
+            self,
+            backend,
+            max_queue_size=10000,
+            batch_size=500,
+            flush_interval=1.0,
+            overflow=OVERFLOW_DROP,
+            block_timeout=1.0,
+            spill_path=None,
+            **kwargs
+    ):
+        """
+        Configure the queue and the backend that events are sent to.
+
+        :Parameters:
+
+          - `backend`: a dict with the `ENGINE` and `OPTIONS` of the
+            backend that batches of events are sent to.
+          - `max_queue_size`: the number of events that can be queued.
+          - `batch_size`: the largest number of events sent in one batch.
+          - `flush_interval`: seconds the background thread waits for
+            an event before checking for spilled events.
+          - `overflow`: what to do with events when the queue is full:
+            'drop' them, 'block' the request for up to `block_timeout`
+            seconds before dropping them, or 'spill' them to the file at
+            `spill_path`, from which they are sent once the queue is empty.
+            Spilled events are stored as JSON, so their dates are sent
+            as ISO 8601 strings.
+
+        """
+        super(BufferedBackend, self).__init__(**kwargs)
+
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('Invalid overflow policy %s' % overflow)
+        if overflow == OVERFLOW_SPILL and not spill_path:
+            raise ValueError('The spill overflow policy requires a spill_path')
+
+        # Imported here because track.tracker imports this package.
+        from track.tracker import _instantiate_backend_from_name
+        self.backend = _instantiate_backend_from_name(backend['ENGINE'], backend.get('OPTIONS', {}))
+
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.spill_path = spill_path
+
+        self.queue = Queue.Queue(max_queue_size)
+        self._spill_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopping = threading.Event()
+
+        atexit.register(self.close)
+
+    def send(self, event):
+        """Queue the event to be sent by the background thread."""
+        self._ensure_thread()
+
+        item = (time.time(), event)
+        try:
+            if self.overflow == OVERFLOW_BLOCK:
+                self.queue.put(item, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(item)
+        except Queue.Full:
+            if self.overflow == OVERFLOW_SPILL:
+                self._spill(event)
+            else:
+                dog_stats_api.increment('track.buffered.dropped')
+
+    def _ensure_thread(self):
+        """
+        Start the background thread, if it isn't running in this process.
+
+        The thread is started on the first event rather than when the
+        backend is created, because server processes may be forked after
+        the backends are initialized, and threads don't survive a fork.
+
+        """
+        if self._pid == os.getpid():
+            return
+
+        with self._thread_lock:
+            if self._pid == os.getpid():
+                return
+
+            # Events queued by the parent process are sent by the parent.
+            self.queue = Queue.Queue(self.max_queue_size)
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='track-buffered-backend')
+            self._thread.daemon = True
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        """Send batches of queued events until the backend is closed."""
+        while not self._stopping.is_set():
+            batch = self._next_batch(self.flush_interval)
+            if batch:
+                self._send_batch(batch)
+            elif self.spill_path:
+                self._replay_spill()
+
+    def _next_batch(self, timeout=None):
+        """
+        Return up to `batch_size` queued `(queued_at, event)` items,
+        waiting up to `timeout` seconds for the first one, or not at all
+        if `timeout` is None.
+
+        """
+        batch = []
+        try:
+            if timeout is None:
+                batch.append(self.queue.get_nowait())
+            else:
+                batch.append(self.queue.get(timeout=timeout))
+            while len(batch) < self.batch_size:
+                batch.append(self.queue.get_nowait())
+        except Queue.Empty:
+            pass
+        return batch
+
+    def _send_batch(self, batch):
+        """Send a batch of `(queued_at, event)` items to the backend."""
+        dog_stats_api.histogram('track.buffered.latency', time.time() - batch[0][0])
+        dog_stats_api.histogram('track.buffered.batch_size', len(batch))
+        dog_stats_api.gauge('track.buffered.queue_depth', self.queue.qsize())
+
+        try:
+            with dog_stats_api.timer('track.buffered.send_many'):
+                self.backend.send_many([event for _, event in batch])
+        except Exception:  # pylint: disable=broad-except
+            log.exception('Error sending a batch of %d tracking events', len(batch))
+
+    def _spill(self, event):
+        """Append the event to the spill file."""
+        event_str = json.dumps(event, cls=DateTimeJSONEncoder)
+        with self._spill_lock:
+            with open(self.spill_path, 'a') as spill_file:
+                spill_file.write(event_str + '\n')
+        dog_stats_api.increment('track.buffered.spilled')
+
+    def _replay_spill(self):
+        """
+        Send the events in the spill file to the backend, and remove it.
+
+        The spill file may be shared by several processes, so it is first
+        renamed to a file that only this process will read.
+
+        """
+        replay_path = '%s.replay.%d' % (self.spill_path, os.getpid())
+        with self._spill_lock:
+            try:
+                os.rename(self.spill_path, replay_path)
+            except OSError:
+                # There are no spilled events, or another process claimed them.
+                return
+
+        with open(replay_path) as replay_file:
+            batch = []
+            for line in replay_file:
+                batch.append((time.time(), json.loads(line)))
+                if len(batch) >= self.batch_size:
+                    self._send_batch(batch)
+                    batch = []
+            if batch:
+                self._send_batch(batch)
+        os.remove(replay_path)
+
+    def flush(self):
+        """Send all the queued events to the backend from the calling thread."""
+        batch = self._next_batch()
+        while batch:
+            self._send_batch(batch)
+            batch = self._next_batch()
+
+    def close(self):
+        """Stop the background thread and send any events left in the queue."""
+        if self._pid != os.getpid():
+            # Events were only queued by the process that forked this one.
+            return
+
+        self._stopping.set()
+        self._thread.join(self.flush_interval + 1)
+        self.flush()
+        if self.spill_path:
+            self._replay_spill()
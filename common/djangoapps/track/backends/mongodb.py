@@ -97,3 +97,13 @@ class MongoBackend(BaseBackend):
             # during the next event.
             msg = 'Error inserting to MongoDB event tracker backend'
             log.exception(msg)
+
+    def send_many(self, events):
+        """Insert a batch of events in to the Mongo collection"""
+        if not events:
+            return
+        try:
+            self.collection.insert(events, manipulate=False)
+        except (PyMongoError, BSONError):
+            msg = 'Error inserting to MongoDB event tracker backend'
+            log.exception(msg)
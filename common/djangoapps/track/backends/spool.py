@@ -0,0 +1,207 @@
+"""
+Event tracker backend that writes compressed batches of events to
+rotating local spool files.
+
+Each spool file starts with `SPOOL_MAGIC`, followed by records made of a
+4 byte big-endian length and a zlib compressed JSON list of events. The
+`replay_tracking_spool` management command sends the events in spool
+files to a configured backend, or prints them as JSON lines.
+
+Every call to `send_many` writes one record, so the backend is meant to
+be wrapped in a `track.backends.buffered.BufferedBackend`::
+
+  TRACKING_BACKENDS = {
+      'spool': {
+          'ENGINE': 'track.backends.buffered.BufferedBackend',
+          'OPTIONS': {
+              'backend': {
+                  'ENGINE': 'track.backends.spool.SpoolBackend',
+                  'OPTIONS': {
+                      'directory': '/edx/var/log/tracking-spool',
+                  }
+              },
+          }
+      }
+  }
+
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+import zlib
+
+from track.backends import BaseBackend
+from track.utils import DateTimeJSONEncoder
+
+
+log = logging.getLogger(__name__)
+
+
+SPOOL_MAGIC = 'EDXSPOOL\x01'
+SPOOL_SUFFIX = '.spool'
+# Suffix of the file being written, which is renamed when it is rotated.
+PARTIAL_SUFFIX = '.part'
+
+RECORD_HEADER = struct.Struct('>I')
+
+# When to fsync spool files.
+FSYNC_ALWAYS = 'always'
+FSYNC_ROTATE = 'rotate'
+FSYNC_NEVER = 'never'
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_ROTATE, FSYNC_NEVER)
+
+
+class SpoolFormatError(Exception):
+    """Raised when a spool file is not in the expected format."""
+    pass
+
+
+def write_record(spool_file, events, compression_level=6):
+    """Write `events` to `spool_file` as one record."""
+    data = zlib.compress(json.dumps(events, cls=DateTimeJSONEncoder), compression_level)
+    spool_file.write(RECORD_HEADER.pack(len(data)) + data)
+
+
+def read_records(spool_file):
+    """
+    Yield the list of events in each record of `spool_file`.
+
+    A truncated final record, left by a process that was killed while
+    writing it, is ignored.
+
+    """
+    name = getattr(spool_file, 'name', spool_file)
+    if spool_file.read(len(SPOOL_MAGIC)) != SPOOL_MAGIC:
+        raise SpoolFormatError('{} is not a tracking log spool file'.format(name))
+
+    while True:
+        header = spool_file.read(RECORD_HEADER.size)
+        if len(header) < RECORD_HEADER.size:
+            return
+        length, = RECORD_HEADER.unpack(header)
+        data = spool_file.read(length)
+        if len(data) < length:
+            log.warning('Ignoring truncated record in %s', name)
+            return
+        yield json.loads(zlib.decompress(data))
+
+
+class SpoolBackend(BaseBackend):
+    """Event tracker backend that writes batches of events to spool files."""
+
+    def __init__(
+            self,
+            directory,
+            prefix='tracking',
+            max_bytes=64 * 1024 * 1024,
+            max_age=60 * 60,
+            fsync=FSYNC_ROTATE,
+            compression_level=6,
+            **kwargs
+    ):
+        """
+        Configure where and how spool files are written.
+
+        :Parameters:
+
+          - `directory`: the directory spool files are written to.
+          - `prefix`: the start of the name of the spool files.
+          - `max_bytes`: the size after which a spool file is rotated.
+          - `max_age`: the number of seconds after which a spool file is
+            rotated.
+          - `fsync`: when to fsync spool files: after every record
+            ('always'), when they are rotated ('rotate'), or 'never'.
+          - `compression_level`: the zlib compression level.
+
+        Each process writes to its own spool file, whose name ends with
+        `.part` until it is rotated.
+
+        """
+        super(SpoolBackend, self).__init__(**kwargs)
+
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError('Invalid fsync policy %s' % fsync)
+
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.fsync = fsync
+        self.compression_level = compression_level
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._opened = None
+        self._pid = None
+        self._sequence = 0
+
+        atexit.register(self.close)
+
+    def send(self, event):
+        self.send_many([event])
+
+    def send_many(self, events):
+        """Write the events to the current spool file as one record."""
+        if not events:
+            return
+
+        with self._lock:
+            if self._pid != os.getpid():
+                # Don't write to the file of the process this one was forked from.
+                self._file = None
+            if self._file is not None and self._should_rotate():
+                self._rotate()
+            if self._file is None:
+                self._open()
+
+            write_record(self._file, events, self.compression_level)
+            self._file.flush()
+            if self.fsync == FSYNC_ALWAYS:
+                os.fsync(self._file.fileno())
+
+    def _should_rotate(self):
+        """Return whether the current spool file is full or too old."""
+        return self._file.tell() >= self.max_bytes or time.time() - self._opened >= self.max_age
+
+    def _open(self):
+        """Start a new spool file."""
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        self._sequence += 1
+        name = '{prefix}-{host}-{pid}-{time}-{sequence}'.format(
+            prefix=self.prefix,
+            host=socket.gethostname(),
+            pid=os.getpid(),
+            time=time.strftime('%Y%m%dT%H%M%S'),
+            sequence=self._sequence,
+        )
+        self._path = os.path.join(self.directory, name)
+        self._file = open(self._path + PARTIAL_SUFFIX, 'wb')
+        self._file.write(SPOOL_MAGIC)
+        self._opened = time.time()
+        self._pid = os.getpid()
+
+    def _rotate(self):
+        """Close the current spool file, making it available for replay."""
+        self._file.flush()
+        if self.fsync != FSYNC_NEVER:
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+        os.rename(self._path + PARTIAL_SUFFIX, self._path + SPOOL_SUFFIX)
+
+    def close(self):
+        """Rotate the current spool file, if there is one."""
+        with self._lock:
+            if self._file is not None and self._pid == os.getpid():
+                self._rotate()
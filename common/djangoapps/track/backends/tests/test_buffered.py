@@ -0,0 +1,88 @@
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+
+from track.backends import BaseBackend
+from track.backends.buffered import BufferedBackend
+
+
+class TestBufferedBackend(TestCase):
+    def setUp(self):
+        super(TestBufferedBackend, self).setUp()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+
+    def create_backend(self, **options):
+        backend = BufferedBackend(
+            backend={'ENGINE': 'track.backends.tests.test_buffered.RecordingBackend'},
+            flush_interval=0.01,
+            **options
+        )
+        self.addCleanup(backend.close)
+        return backend
+
+    def test_events_are_sent_in_batches(self):
+        backend = self.create_backend(batch_size=3)
+        events = [{'test': i} for i in xrange(10)]
+
+        for event in events:
+            backend.send(event)
+        backend.close()
+
+        self.assertEqual(backend.backend.events, events)
+        self.assertTrue(all(len(batch) <= 3 for batch in backend.backend.batches))
+
+    def test_overflow_drop(self):
+        backend = self.create_backend(max_queue_size=2, overflow='drop')
+        # Stop the background thread so that the queue fills up.
+        backend._ensure_thread()  # pylint: disable=protected-access
+        backend.close()
+
+        for i in xrange(4):
+            backend.send({'test': i})
+        backend.flush()
+
+        self.assertEqual(backend.backend.events, [{'test': 0}, {'test': 1}])
+
+    def test_overflow_spill(self):
+        spill_path = os.path.join(self.temp_dir, 'tracking.spill')
+        backend = self.create_backend(max_queue_size=2, overflow='spill', spill_path=spill_path)
+        backend._ensure_thread()  # pylint: disable=protected-access
+        backend.close()
+
+        for i in xrange(4):
+            backend.send({'test': i})
+        self.assertTrue(os.path.exists(spill_path))
+
+        backend.flush()
+        backend._replay_spill()  # pylint: disable=protected-access
+
+        self.assertEqual(backend.backend.events, [{'test': i} for i in xrange(4)])
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_invalid_overflow_policy(self):
+        with self.assertRaises(ValueError):
+            self.create_backend(overflow='explode')
+        with self.assertRaises(ValueError):
+            self.create_backend(overflow='spill')
+
+
+class RecordingBackend(BaseBackend):
+    """Backend that records the batches of events it is sent."""
+    def __init__(self, **options):
+        super(RecordingBackend, self).__init__(**options)
+        self.batches = []
+
+    @property
+    def events(self):
+        return [event for batch in self.batches for event in batch]
+
+    def send(self, event):
+        self.send_many([event])
+
+    def send_many(self, events):
+        self.batches.append(list(events))
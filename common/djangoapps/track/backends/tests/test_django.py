@@ -24,3 +24,14 @@ class TestDjangoBackend(TestCase):
 
         # Check if time is stored in UTC
         self.assertEqual(str(results[0].time), '2013-01-01 17:01:00+00:00')
+
+    def test_django_backend_send_many(self):
+        events = [
+            {'username': 'first', 'time': '2013-01-01T12:01:00-05:00'},
+            {'username': 'second', 'time': '2013-01-01T12:02:00-05:00'},
+        ]
+        with self.assertNumQueries(1):
+            self.backend.send_many(events)
+
+        results = TrackingLog.objects.order_by('time')
+        self.assertEqual([result.username for result in results], ['first', 'second'])
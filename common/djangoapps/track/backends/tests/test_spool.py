@@ -0,0 +1,73 @@
+from __future__ import absolute_import
+
+import datetime
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+
+from django.test import TestCase
+
+from track.backends.spool import SpoolBackend, SpoolFormatError, read_records
+
+
+class TestSpoolBackend(TestCase):
+    def setUp(self):
+        super(TestSpoolBackend, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def read_spool_files(self):
+        """Return the batches of events in the rotated spool files."""
+        batches = []
+        for name in sorted(os.listdir(self.directory)):
+            self.assertTrue(name.endswith('.spool'))
+            with open(os.path.join(self.directory, name), 'rb') as spool_file:
+                batches.extend(read_records(spool_file))
+        return batches
+
+    def test_spool_backend(self):
+        backend = SpoolBackend(directory=self.directory)
+        backend.send_many([{'test': 1}, {'time': datetime.datetime(2012, 05, 01, 07, 27, 01, 200)}])
+        backend.send({'test': 2})
+
+        # The spool file is only replayable once it has been rotated.
+        self.assertTrue(os.listdir(self.directory)[0].endswith('.part'))
+        backend.close()
+
+        self.assertEqual(self.read_spool_files(), [
+            [{'test': 1}, {'time': '2012-05-01T07:27:01.000200+00:00'}],
+            [{'test': 2}],
+        ])
+
+    def test_rotation(self):
+        backend = SpoolBackend(directory=self.directory, max_bytes=1, fsync='always')
+        for i in xrange(3):
+            backend.send({'test': i})
+        backend.close()
+
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+        self.assertEqual(
+            sorted(self.read_spool_files()),
+            [[{'test': 0}], [{'test': 1}], [{'test': 2}]]
+        )
+
+    def test_truncated_record(self):
+        backend = SpoolBackend(directory=self.directory)
+        backend.send({'test': 1})
+        backend.send({'test': 2})
+        backend.close()
+
+        path = os.path.join(self.directory, os.listdir(self.directory)[0])
+        with open(path, 'rb') as spool_file:
+            data = spool_file.read()
+
+        self.assertEqual(list(read_records(StringIO(data[:-1]))), [[{'test': 1}]])
+
+    def test_invalid_spool_file(self):
+        with self.assertRaises(SpoolFormatError):
+            list(read_records(StringIO('{"test": 1}\n')))
+
+    def test_invalid_fsync_policy(self):
+        with self.assertRaises(ValueError):
+            SpoolBackend(directory=self.directory, fsync='sometimes')
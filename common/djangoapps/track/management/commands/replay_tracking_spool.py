@@ -0,0 +1,94 @@
+"""
+Replay the events in tracking log spool files written by
+`track.backends.spool.SpoolBackend`.
+
+To send the events to the backend named `logger` in TRACKING_BACKENDS:
+
+./manage.py lms replay_tracking_spool --backend logger /edx/var/log/tracking-spool
+
+To print the events as JSON lines:
+
+./manage.py lms replay_tracking_spool --json /edx/var/log/tracking-spool/*.spool
+"""
+
+import json
+import os
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from track import tracker
+from track.backends.spool import SPOOL_SUFFIX, SpoolFormatError, read_records
+
+
+class Command(BaseCommand):
+    """Replay tracking log spool files into a backend or as JSON lines."""
+
+    args = "<spool file or directory> ..."
+    help = "Replay the events in tracking log spool files into a tracking backend, or print them as JSON lines."
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--backend',
+            help="Name of the backend in TRACKING_BACKENDS to send the events to.",
+        ),
+        make_option(
+            '--json',
+            action='store_true',
+            default=False,
+            help="Print the events to stdout as JSON lines.",
+        ),
+        make_option(
+            '--delete',
+            action='store_true',
+            default=False,
+            help="Delete each spool file once its events have been replayed.",
+        ),
+    )
+
+    def handle(self, *args, **options):
+        if not args:
+            raise CommandError("At least one spool file or directory must be specified.")
+        if bool(options['backend']) == bool(options['json']):
+            raise CommandError("Specify exactly one of --backend and --json.")
+
+        if options['backend']:
+            try:
+                backend = tracker.backends[options['backend']]
+            except KeyError:
+                raise CommandError("Unknown tracking backend {}".format(options['backend']))
+            send_many = backend.send_many
+        else:
+            send_many = self._write_json_lines
+
+        for path in self._spool_files(args):
+            try:
+                with open(path, 'rb') as spool_file:
+                    for events in read_records(spool_file):
+                        send_many(events)
+            except (IOError, SpoolFormatError) as error:
+                raise CommandError(unicode(error))
+
+            if options['delete']:
+                os.remove(path)
+
+    def _spool_files(self, paths):
+        """
+        Return the spool files in `paths`, expanding directories into the
+        rotated spool files they contain, oldest first.
+        """
+        spool_files = []
+        for path in paths:
+            if os.path.isdir(path):
+                spool_files.extend(sorted(
+                    (os.path.join(path, name) for name in os.listdir(path) if name.endswith(SPOOL_SUFFIX)),
+                    key=os.path.getmtime,
+                ))
+            else:
+                spool_files.append(path)
+        return spool_files
+
+    def _write_json_lines(self, events):
+        """Print each event on its own line."""
+        for event in events:
+            self.stdout.write(json.dumps(event) + '\n')
@@ -0,0 +1,63 @@
+"""Tests for the replay_tracking_spool management command."""
+import json
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from track import tracker
+from track.backends.spool import SpoolBackend
+
+
+RECORDING_SETTINGS = {
+    'recording': {
+        'ENGINE': 'track.backends.tests.test_buffered.RecordingBackend',
+    }
+}
+
+
+class ReplayTrackingSpoolTest(TestCase):
+    """Tests for the replay_tracking_spool management command."""
+
+    def setUp(self):
+        super(ReplayTrackingSpoolTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        backend = SpoolBackend(directory=self.directory)
+        backend.send_many([{'test': 1}, {'test': 2}])
+        backend.close()
+        backend.send({'test': 3})
+        backend.close()
+
+    def test_replay_json(self):
+        out = StringIO()
+        call_command('replay_tracking_spool', self.directory, json=True, stdout=out)
+
+        events = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(sorted(events), [{'test': 1}, {'test': 2}, {'test': 3}])
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+    @override_settings(TRACKING_BACKENDS=RECORDING_SETTINGS)
+    def test_replay_into_backend(self):
+        tracker._initialize_backends_from_django_settings()  # pylint: disable=protected-access
+        self.addCleanup(tracker._initialize_backends_from_django_settings)  # pylint: disable=protected-access
+
+        call_command('replay_tracking_spool', self.directory, backend='recording', delete=True)
+
+        self.assertEqual(
+            sorted(tracker.backends['recording'].batches),
+            [[{'test': 1}, {'test': 2}], [{'test': 3}]]
+        )
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_requires_one_output(self):
+        with self.assertRaises(CommandError):
+            call_command('replay_tracking_spool', self.directory)
+        with self.assertRaises(CommandError):
+            call_command('replay_tracking_spool', self.directory, backend='logger', json=True)
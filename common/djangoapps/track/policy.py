@@ -0,0 +1,164 @@
+"""
+Sampling, rate limiting and aggregation of high-volume tracking events.
+
+Policies are configured per event type in settings.TRACKING_EVENT_POLICIES::
+
+  TRACKING_EVENT_POLICIES = {
+      'seek_video': {
+          # Keep the events of 10% of users.
+          'sample_rate': 0.1,
+      },
+      'speed_change_video': {
+          # Allow a burst of 20 events per user, then one every 5 seconds.
+          'rate': 0.2,
+          'burst': 20,
+      },
+      'problem_graded': {
+          # Drop events identical to one emitted by the same user in the
+          # last 10 seconds, counting them in the next one that is emitted.
+          'aggregate_window': 10,
+      },
+  }
+
+Sampling is done by user, so the events of a sampled user are all kept.
+Rate limits and aggregation are tracked in each process, so they apply
+per process rather than across all servers.
+
+The policies apply to events emitted with `eventtracking` when
+`EventPolicyProcessor` is in EVENT_TRACKING_PROCESSORS, and to events
+sent with `track.tracker.send`.
+"""
+
+import json
+import random
+import threading
+import time
+import zlib
+
+from django.conf import settings
+from dogapi import dog_stats_api
+from eventtracking.processors.exceptions import EventEmissionExit
+
+
+# The number of users and events whose rate limits and aggregation are tracked.
+# The state is reset when there are more, so that memory use is bounded.
+MAX_TRACKED_KEYS = 10000
+
+# The context field of an emitted event holding the number of identical events
+# that were aggregated into it.
+AGGREGATED_COUNT_FIELD = 'aggregated_count'
+
+
+class EventPolicy(object):
+    """
+    Decides whether events should be emitted, according to the policies
+    configured for their event types.
+    """
+
+    def __init__(self, policies=None):
+        self._lock = threading.Lock()
+        self.configure(policies or {})
+
+    def configure(self, policies):
+        """Replace the policies, and forget the state of the old ones."""
+        with self._lock:
+            self.policies = policies
+            self._buckets = {}
+            self._aggregates = {}
+
+    def check(self, event_type, username, data):
+        """
+        Return None if the event should be dropped, or else the number of
+        identical events that were aggregated into it.
+        """
+        policy = self.policies.get(event_type)
+        if not policy:
+            return 0
+
+        tags = [u'event_type:{}'.format(event_type)]
+
+        if not self._is_sampled(policy, event_type, username):
+            dog_stats_api.increment('track.policy.sampled_out', tags=tags)
+            return None
+
+        with self._lock:
+            now = time.time()
+            if 'rate' in policy and not self._take_token(policy, event_type, username, now):
+                dog_stats_api.increment('track.policy.rate_limited', tags=tags)
+                return None
+
+            aggregated = 0
+            if 'aggregate_window' in policy:
+                aggregated = self._aggregate(policy, event_type, username, data, now)
+                if aggregated is None:
+                    dog_stats_api.increment('track.policy.aggregated', tags=tags)
+        return aggregated
+
+    def _is_sampled(self, policy, event_type, username):
+        """
+        Return whether the event falls in the sample of its event type.
+
+        Users are sampled by a hash of their username, so that either all
+        or none of their events of a type are kept.
+        """
+        sample_rate = policy.get('sample_rate', 1.0)
+        if sample_rate >= 1.0:
+            return True
+        if username and username != 'anonymous':
+            bucket = zlib.crc32(u'{}:{}'.format(event_type, username).encode('utf-8')) & 0xffffffff
+            return bucket < sample_rate * 0x100000000
+        return random.random() < sample_rate
+
+    def _take_token(self, policy, event_type, username, now):
+        """Take a token from the user's bucket for the event type, if there is one."""
+        rate = policy['rate']
+        burst = policy.get('burst', 1)
+        key = (event_type, username)
+
+        if key not in self._buckets and len(self._buckets) >= MAX_TRACKED_KEYS:
+            self._buckets.clear()
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return False
+        self._buckets[key] = (tokens - 1, now)
+        return True
+
+    def _aggregate(self, policy, event_type, username, data, now):
+        """
+        Return None if an identical event was emitted within the aggregation
+        window, or else the number of identical events dropped since the
+        last one was emitted.
+        """
+        key = (event_type, username, json.dumps(data, sort_keys=True, default=unicode))
+
+        if key not in self._aggregates and len(self._aggregates) >= MAX_TRACKED_KEYS:
+            self._aggregates.clear()
+        emitted, dropped = self._aggregates.get(key, (None, 0))
+        if emitted is not None and now - emitted < policy['aggregate_window']:
+            self._aggregates[key] = (emitted, dropped + 1)
+            return None
+        self._aggregates[key] = (now, 0)
+        return dropped
+
+
+class EventPolicyProcessor(object):
+    """
+    An `eventtracking` processor that drops events according to
+    settings.TRACKING_EVENT_POLICIES.
+    """
+
+    def __init__(self, policies=None):
+        if policies is None:
+            policies = getattr(settings, 'TRACKING_EVENT_POLICIES', {})
+        self.policy = EventPolicy(policies)
+
+    def __call__(self, event):
+        context = event.get('context', {})
+        aggregated = self.policy.check(event.get('name'), context.get('username'), event.get('data'))
+        if aggregated is None:
+            raise EventEmissionExit()
+        if aggregated:
+            context[AGGREGATED_COUNT_FIELD] = aggregated
+        return event
@@ -0,0 +1,88 @@
+"""Tests for the sampling, rate limiting and aggregation of tracking events."""
+from django.test import TestCase
+from django.test.utils import override_settings
+from eventtracking.processors.exceptions import EventEmissionExit
+from mock import patch
+
+import track.tracker as tracker
+from track.policy import EventPolicy, EventPolicyProcessor
+
+
+class TestEventPolicy(TestCase):
+    """Tests for EventPolicy."""
+
+    def test_no_policy(self):
+        policy = EventPolicy({})
+        for _ in xrange(100):
+            self.assertEqual(policy.check('play_video', 'user', {}), 0)
+
+    def test_sampling_is_by_user(self):
+        policy = EventPolicy({'seek_video': {'sample_rate': 0.5}})
+        results = {
+            username: policy.check('seek_video', username, {}) is not None
+            for username in ('user{}'.format(i) for i in xrange(100))
+        }
+        self.assertTrue(0 < sum(results.values()) < 100)
+
+        # The same users are sampled every time.
+        for username, sampled in results.iteritems():
+            self.assertEqual(policy.check('seek_video', username, {}) is not None, sampled)
+
+    @patch('track.policy.time.time')
+    def test_rate_limit(self, mock_time):
+        mock_time.return_value = 1000
+        policy = EventPolicy({'speed_change_video': {'rate': 1, 'burst': 2}})
+
+        self.assertEqual(policy.check('speed_change_video', 'user', {}), 0)
+        self.assertEqual(policy.check('speed_change_video', 'user', {}), 0)
+        self.assertIsNone(policy.check('speed_change_video', 'user', {}))
+        # Other users have their own limit.
+        self.assertEqual(policy.check('speed_change_video', 'other', {}), 0)
+
+        mock_time.return_value = 1001
+        self.assertEqual(policy.check('speed_change_video', 'user', {}), 0)
+        self.assertIsNone(policy.check('speed_change_video', 'user', {}))
+
+    @patch('track.policy.time.time')
+    def test_aggregation(self, mock_time):
+        mock_time.return_value = 1000
+        policy = EventPolicy({'problem_graded': {'aggregate_window': 10}})
+
+        self.assertEqual(policy.check('problem_graded', 'user', {'id': 1}), 0)
+        self.assertIsNone(policy.check('problem_graded', 'user', {'id': 1}))
+        self.assertIsNone(policy.check('problem_graded', 'user', {'id': 1}))
+        # Different events aren't aggregated.
+        self.assertEqual(policy.check('problem_graded', 'user', {'id': 2}), 0)
+
+        mock_time.return_value = 1010
+        self.assertEqual(policy.check('problem_graded', 'user', {'id': 1}), 2)
+
+
+class TestEventPolicyProcessor(TestCase):
+    """Tests for EventPolicyProcessor."""
+
+    def test_processor(self):
+        processor = EventPolicyProcessor({'problem_graded': {'aggregate_window': 10}})
+        event = {'name': 'problem_graded', 'context': {'username': 'user'}, 'data': {}}
+
+        self.assertEqual(processor(event), event)
+        with self.assertRaises(EventEmissionExit):
+            processor(event)
+
+
+class TestTrackerPolicy(TestCase):
+    """Tests that track.tracker.send applies TRACKING_EVENT_POLICIES."""
+
+    @override_settings(
+        TRACKING_BACKENDS={'default': {'ENGINE': 'track.tests.test_tracker.DummyBackend'}},
+        TRACKING_EVENT_POLICIES={'pause_video': {'rate': 0.001, 'burst': 1}},
+    )
+    def test_send(self):
+        tracker._initialize_backends_from_django_settings()  # pylint: disable=protected-access
+        self.addCleanup(tracker._initialize_backends_from_django_settings)  # pylint: disable=protected-access
+
+        for _ in xrange(3):
+            tracker.send({'event_type': 'pause_video', 'username': 'user'})
+        tracker.send({'event_type': 'play_video', 'username': 'user'})
+
+        self.assertEqual(tracker.backends['default'].count, 2)
@@ -26,12 +26,14 @@ from dogapi import dog_stats_api
 from django.conf import settings
 
 from track.backends import BaseBackend
+from track.policy import AGGREGATED_COUNT_FIELD, EventPolicy
 
 
 __all__ = ['send']
 
 
 backends = {}
+policy = EventPolicy()
 
 
 def _initialize_backends_from_django_settings():
@@ -41,6 +43,7 @@ def _initialize_backends_from_django_settings():
 
     """
     backends.clear()
+    policy.configure(getattr(settings, 'TRACKING_EVENT_POLICIES', {}))
 
     config = getattr(settings, 'TRACKING_BACKENDS', {})
 
@@ -86,11 +89,18 @@ def _instantiate_backend_from_name(name, options):
 @dog_stats_api.timed('track.send')
 def send(event):
     """
-    Send an event object to all the initialized backends.
+    Send an event object to all the initialized backends, unless it is
+    dropped by the policy for its event type.
 
     """
     dog_stats_api.increment('track.send.count')
 
+    aggregated = policy.check(event.get('event_type'), event.get('username'), event.get('event'))
+    if aggregated is None:
+        return
+    if aggregated:
+        event.setdefault('context', {})[AGGREGATED_COUNT_FIELD] = aggregated
+
     for name, backend in backends.iteritems():
         with dog_stats_api.timer('track.send.backend.{0}'.format(name)):
             backend.send(event)
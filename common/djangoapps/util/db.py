@@ -6,9 +6,13 @@ import random
 
 from django.db import connection, transaction
 
+from request_cache import get_cache
+
 
 MYSQL_MAX_INT = (2 ** 31) - 1
 
+AFTER_COMMIT_CACHE_NAME = 'util.db.after_commit'
+
 
 def commit_on_success_with_read_committed(func):  # pylint: disable=invalid-name
     """
@@ -57,3 +61,31 @@ def generate_int_id(minimum=0, maximum=MYSQL_MAX_INT, used_ids=None):
         cid = random.randint(minimum, maximum)
 
     return cid
+
+
+def run_after_commit(func, *args, **kwargs):
+    """
+    Call `func` with `args` and `kwargs` once the transaction of the current
+    request has been committed or rolled back by TransactionMiddleware.
+
+    This is meant for invalidating cached data that's derived from the rows
+    being written: when it's only invalidated before the commit, concurrent
+    requests that still read the old rows may cache the old data again.
+
+    `func` is called right away outside of managed transactions, and outside
+    of requests handled by :class:`util.middleware.AfterCommitMiddleware`.
+    """
+    callbacks = get_cache(AFTER_COMMIT_CACHE_NAME).get('callbacks')
+    if callbacks is None or not transaction.is_managed():
+        func(*args, **kwargs)
+    else:
+        callbacks.append((func, args, kwargs))
+
+
+def run_after_commit_callbacks():
+    """
+    Call the functions passed to `run_after_commit` during the current request.
+    """
+    callbacks = get_cache(AFTER_COMMIT_CACHE_NAME).pop('callbacks', None) or []
+    for func, args, kwargs in callbacks:
+        func(*args, **kwargs)
@@ -0,0 +1,22 @@
+"""
+Middleware for the util app
+"""
+
+from request_cache import get_cache
+from util.db import AFTER_COMMIT_CACHE_NAME, run_after_commit_callbacks
+
+
+class AfterCommitMiddleware(object):
+    """
+    Call the functions passed to :func:`util.db.run_after_commit` during the
+    request once its transaction is done.
+
+    This must come before TransactionMiddleware, so that its response is
+    processed after the transaction is committed.
+    """
+    def process_request(self, _request):
+        get_cache(AFTER_COMMIT_CACHE_NAME)['callbacks'] = []
+
+    def process_response(self, _request, response):
+        run_after_commit_callbacks()
+        return response
@@ -7,3 +7,24 @@ def use_read_replica_if_available(queryset):
     If there is a database called 'read_replica', use that database for the queryset.
     """
     return queryset.using("read_replica") if "read_replica" in settings.DATABASES else queryset
+
+
+def iterate_values_by_pk(queryset, fields, chunk_size):
+    """
+    Yields a dict of the `fields` of each row of `queryset`, in order of primary key.
+
+    Rows are fetched `chunk_size` at a time, each query starting after the last
+    primary key of the previous one.  Unlike an OFFSET, this doesn't scan the
+    rows that were already fetched, and unlike a single query, only one chunk
+    is held in memory at a time.  `fields` must include 'pk'.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk_queryset = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk_queryset.values(*fields)[:chunk_size])
+        for item in chunk:
+            yield item
+        if len(chunk) < chunk_size:
+            return
+        last_pk = chunk[-1]['pk']
@@ -9,8 +9,12 @@ from django.contrib.auth.models import User
 from django.db import connection, IntegrityError
 from django.db.transaction import commit_on_success, TransactionManagementError
 from django.test import TestCase, TransactionTestCase
+from django.test.client import RequestFactory
+from mock import Mock
 
-from util.db import commit_on_success_with_read_committed, generate_int_id
+from request_cache.middleware import RequestCache
+from util.db import commit_on_success_with_read_committed, generate_int_id, run_after_commit
+from util.middleware import AfterCommitMiddleware
 
 
 @ddt.ddt
@@ -127,3 +131,33 @@ class GenerateIntIdTestCase(TestCase):
         for i in range(times):
             int_id = generate_int_id(minimum, maximum, used_ids)
             self.assertIn(int_id, list(set(range(minimum, maximum + 1)) - used_ids))
+
+
+class RunAfterCommitTestCase(TestCase):
+    """Tests for `run_after_commit` and `AfterCommitMiddleware`"""
+    def setUp(self):
+        super(RunAfterCommitTestCase, self).setUp()
+        self.request = RequestFactory().get('/')
+        RequestCache().process_request(self.request)
+        self.addCleanup(RequestCache.clear_request_cache)
+
+    def test_outside_of_request(self):
+        func = Mock()
+        run_after_commit(func, 1, key='value')
+        func.assert_called_once_with(1, key='value')
+
+    def test_deferred_until_response(self):
+        func = Mock()
+        middleware = AfterCommitMiddleware()
+        middleware.process_request(self.request)
+        run_after_commit(func, 1, key='value')
+        run_after_commit(func, 2)
+        self.assertFalse(func.called)
+
+        response = Mock()
+        self.assertIs(middleware.process_response(self.request, response), response)
+        self.assertEqual(func.call_args_list, [((1,), {'key': 'value'}), ((2,), {})])
+
+        # The functions only run once.
+        middleware.process_response(self.request, response)
+        self.assertEqual(func.call_count, 2)
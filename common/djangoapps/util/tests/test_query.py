@@ -0,0 +1,30 @@
+"""Tests for util.query module."""
+
+import ddt
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from student.tests.factories import UserFactory
+from util.query import iterate_values_by_pk
+
+
+@ddt.ddt
+class IterateValuesByPkTestCase(TestCase):
+    """Tests for iterate_values_by_pk."""
+
+    def setUp(self):
+        super(IterateValuesByPkTestCase, self).setUp()
+        self.users = [UserFactory.create() for __ in range(7)]
+
+    @ddt.data((3, 3), (7, 2), (10, 1))
+    @ddt.unpack
+    def test_iterate_in_chunks(self, chunk_size, num_queries):
+        queryset = User.objects.filter(id__in=[user.id for user in self.users]).order_by('-email')
+        with self.assertNumQueries(num_queries):
+            items = list(iterate_values_by_pk(queryset, ['pk', 'email'], chunk_size))
+        self.assertEqual(items, [{'pk': user.id, 'email': user.email} for user in self.users])
+
+    def test_empty_queryset(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(list(iterate_values_by_pk(User.objects.filter(username='nobody'), ['pk'], 3)), [])
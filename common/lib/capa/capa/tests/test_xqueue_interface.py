@@ -0,0 +1,82 @@
+"""
+Tests for the xqueue interface
+"""
+import json
+import unittest
+
+from mock import Mock, patch
+import requests
+from requests.packages.urllib3.exceptions import ReadTimeoutError
+
+from capa.xqueue_interface import XQueueInterface, XQueueSession, make_xheader
+
+
+def _response(return_code, content):
+    """Return a mock xqueue response."""
+    return Mock(status_code=200, text=json.dumps({'return_code': return_code, 'content': content}))
+
+
+class XQueueInterfaceTest(unittest.TestCase):
+    """Tests for XQueueInterface"""
+
+    def setUp(self):
+        super(XQueueInterfaceTest, self).setUp()
+        XQueueSession.clear()
+        self.addCleanup(XQueueSession.clear)
+        self.django_auth = {'username': 'lms', 'password': 'secret'}
+        self.header = make_xheader('http://example.com/callback', 'key', 'test-queue')
+
+    def test_shared_session(self):
+        first = XQueueInterface('http://example.com/xqueue', self.django_auth)
+        second = XQueueInterface('http://example.com/xqueue', self.django_auth)
+        other = XQueueInterface('http://example.com/xqueue', {'username': 'other', 'password': 'secret'})
+        self.assertIs(first.session, second.session)
+        self.assertIsNot(first.session, other.session)
+
+    def test_login_once(self):
+        first = XQueueInterface('http://example.com/xqueue', self.django_auth)
+        second = XQueueInterface('http://example.com/xqueue', self.django_auth)
+        with patch.object(first.session, 'post') as mock_post:
+            mock_post.side_effect = [
+                _response(1, 'login_required'),
+                _response(0, 'logged in'),
+                _response(0, 'queued'),
+                _response(0, 'queued'),
+            ]
+            self.assertEqual(first.send_to_queue(self.header, 'body'), (0, 'queued'))
+            self.assertEqual(second.send_to_queue(self.header, 'body'), (0, 'queued'))
+
+        urls = [args[0] for args, __ in mock_post.call_args_list]
+        self.assertEqual(urls, [
+            'http://example.com/xqueue/xqueue/submit/',
+            'http://example.com/xqueue/xqueue/login/',
+            'http://example.com/xqueue/xqueue/submit/',
+            'http://example.com/xqueue/xqueue/submit/',
+        ])
+
+    def test_skip_login_after_other_login(self):
+        xqueue = XQueueInterface('http://example.com/xqueue', self.django_auth)
+        login_count = xqueue.xqueue_session.login_count
+        # Another request logs the session in first
+        xqueue.xqueue_session.login_count += 1
+        with patch.object(xqueue.session, 'post') as mock_post:
+            self.assertEqual(
+                xqueue._login(login_count),  # pylint: disable=protected-access
+                (0, 'logged in by another request')
+            )
+        self.assertFalse(mock_post.called)
+
+    def test_timeout(self):
+        xqueue = XQueueInterface('http://example.com/xqueue', self.django_auth)
+        with patch.object(xqueue.session, 'post') as mock_post:
+            mock_post.side_effect = requests.exceptions.ReadTimeout()
+            error, __ = xqueue.send_to_queue(self.header, 'body')
+        self.assertEqual(error, 1)
+
+    def test_read_timeout_not_retried(self):
+        xqueue = XQueueInterface('http://example.com/xqueue', self.django_auth, connect_retries=2)
+        with patch('requests.packages.urllib3.connectionpool.HTTPConnectionPool._make_request') as mock_request:
+            mock_request.side_effect = ReadTimeoutError(None, '/xqueue/submit/', 'Read timed out.')
+            self.assertEqual(xqueue.send_to_queue(self.header, 'body'), (1, 'timed out waiting for server'))
+        # The submission may have reached the server, so it is sent only once.
+        self.assertEqual(mock_request.call_count, 1)
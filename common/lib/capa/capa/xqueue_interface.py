@@ -4,7 +4,13 @@
 import hashlib
 import json
 import logging
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from requests.packages.urllib3.util.retry import Retry
 import dogstats_wrapper as dog_stats_api
 
 
@@ -16,6 +22,15 @@ XQUEUE_METRIC_NAME = 'edxapp.xqueue'
 # Wait time for response from Xqueue.
 XQUEUE_TIMEOUT = 35  # seconds
 
+# The number of keep-alive connections a process keeps open to an xqueue server.
+XQUEUE_POOL_SIZE = 10
+# The number of requests a process sends to an xqueue server at the same time.
+XQUEUE_MAX_IN_FLIGHT = 10
+# The number of times a request is retried when it cannot connect to the server.
+# Requests are not retried once they have been sent, since a submission
+# may have been queued even if its response was lost.
+XQUEUE_CONNECT_RETRIES = 2
+
 
 def make_hashkey(seed):
     """
@@ -62,16 +77,82 @@ def parse_xreply(xreply):
     return (return_code, content)
 
 
+class XQueueSession(object):
+    """
+    A requests session, with a pool of keep-alive connections, that is
+    shared by all the XQueueInterfaces of a process that use the same
+    xqueue server and credentials.
+
+    It bounds the number of requests in flight to the server, and makes
+    sure that threads which find the session logged out log in only once.
+    """
+
+    _sessions = {}
+    _sessions_lock = threading.Lock()
+
+    def __init__(self, requests_auth, pool_size, max_in_flight, connect_retries):
+        self.session = requests.Session()
+        self.session.auth = requests_auth
+        # Only failures to connect are retried: an int max_retries would also retry
+        # read timeouts, which would send a submission that was already sent again.
+        max_retries = Retry(total=connect_retries, connect=connect_retries, read=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=max_retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.login_lock = threading.Lock()
+        # Incremented on each login, so that threads can tell whether another
+        # thread has logged in since their request was refused.
+        self.login_count = 0
+
+    @classmethod
+    def get(cls, url, django_auth, requests_auth=None, pool_size=None, max_in_flight=None, connect_retries=None):
+        """
+        Return the session for `url` and the given credentials, creating it if needed.
+
+        The pool options only apply when the session is created.
+        """
+        if isinstance(requests_auth, HTTPBasicAuth):
+            auth_key = (requests_auth.username, requests_auth.password)
+        else:
+            auth_key = requests_auth
+        key = (url, django_auth.get('username'), django_auth.get('password'), auth_key)
+
+        with cls._sessions_lock:
+            if key not in cls._sessions:
+                cls._sessions[key] = cls(
+                    requests_auth,
+                    pool_size or XQUEUE_POOL_SIZE,
+                    max_in_flight or XQUEUE_MAX_IN_FLIGHT,
+                    XQUEUE_CONNECT_RETRIES if connect_retries is None else connect_retries,
+                )
+            return cls._sessions[key]
+
+    @classmethod
+    def clear(cls):
+        """Forget all the sessions, so that new ones are created."""
+        with cls._sessions_lock:
+            cls._sessions = {}
+
+
 class XQueueInterface(object):
     """
     Interface to the external grading system
+
+    XQueueInterfaces are safe to use from several threads, and share their
+    connections and login with the other XQueueInterfaces of the process
+    that use the same server and credentials.
     """
 
-    def __init__(self, url, django_auth, requests_auth=None):
+    def __init__(self, url, django_auth, requests_auth=None, **pool_options):
+        """
+        `pool_options` are passed to XQueueSession.get: `pool_size`,
+        `max_in_flight` and `connect_retries`.
+        """
         self.url = unicode(url)
         self.auth = django_auth
-        self.session = requests.Session()
-        self.session.auth = requests_auth
+        self.xqueue_session = XQueueSession.get(self.url, django_auth, requests_auth, **pool_options)
+        self.session = self.xqueue_session.session
 
     def send_to_queue(self, header, body, files_to_upload=None):
         """
@@ -90,20 +171,24 @@ class XQueueInterface(object):
         # log the send to xqueue
         header_info = json.loads(header)
         queue_name = header_info.get('queue_name', u'')
-        dog_stats_api.increment(XQUEUE_METRIC_NAME, tags=[
+        tags = [
             u'action:send_to_queue',
             u'queue:{}'.format(queue_name)
-        ])
+        ]
+        dog_stats_api.increment(XQUEUE_METRIC_NAME, tags=tags)
+        start_time = time.time()
 
         # Attempt to send to queue
+        login_count = self.xqueue_session.login_count
         (error, msg) = self._send_to_queue(header, body, files_to_upload)
 
         # Log in, then try again
         if error and (msg == 'login_required'):
-            (error, content) = self._login()
+            (error, content) = self._login(login_count)
             if error != 0:
                 # when the login fails
                 log.debug("Failed to login to queue: %s", content)
+                dog_stats_api.increment(XQUEUE_METRIC_NAME + '.error', tags=tags)
                 return (error, content)
             if files_to_upload is not None:
                 # Need to rewind file pointers
@@ -111,14 +196,28 @@ class XQueueInterface(object):
                     f.seek(0)
             (error, msg) = self._send_to_queue(header, body, files_to_upload)
 
+        dog_stats_api.histogram(XQUEUE_METRIC_NAME + '.latency', time.time() - start_time, tags=tags)
+        if error:
+            dog_stats_api.increment(XQUEUE_METRIC_NAME + '.error', tags=tags)
         return (error, msg)
 
-    def _login(self):
-        payload = {
-            'username': self.auth['username'],
-            'password': self.auth['password']
-        }
-        return self._http_post(self.url + '/xqueue/login/', payload)
+    def _login(self, login_count=None):
+        """
+        Log the session in, unless another thread has logged it in since
+        `login_count` was read from it.
+        """
+        with self.xqueue_session.login_lock:
+            if login_count is not None and login_count != self.xqueue_session.login_count:
+                return (0, 'logged in by another request')
+
+            payload = {
+                'username': self.auth['username'],
+                'password': self.auth['password']
+            }
+            (error, content) = self._http_post(self.url + '/xqueue/login/', payload)
+            if not error:
+                self.xqueue_session.login_count += 1
+            return (error, content)
 
     def _send_to_queue(self, header, body, files_to_upload):
         payload = {
@@ -134,10 +233,14 @@ class XQueueInterface(object):
 
     def _http_post(self, url, data, files=None):
         try:
-            r = self.session.post(url, data=data, files=files)
+            with self.xqueue_session.in_flight:
+                r = self.session.post(url, data=data, files=files, timeout=XQUEUE_TIMEOUT)
         except requests.exceptions.ConnectionError, err:
             log.error(err)
             return (1, 'cannot connect to server')
+        except requests.exceptions.Timeout, err:
+            log.error(err)
+            return (1, 'timed out waiting for server')
 
         if r.status_code not in [200]:
             return (1, 'unexpected HTTP status code [%d]' % r.status_code)
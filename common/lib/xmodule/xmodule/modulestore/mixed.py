@@ -548,6 +548,28 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
         except NotImplementedError:
             return None, None
 
+    def get_course_version(self, course_key, **kwargs):
+        """
+        Returns the version guid of the latest version of the given course, or None if its
+        modulestore doesn't keep versions.
+        """
+        try:
+            store = self._verify_modulestore_support(course_key, 'get_course_version')
+            return store.get_course_version(course_key, **kwargs)
+        except NotImplementedError:
+            return None
+
+    def get_block_changes(self, course_key, **kwargs):
+        """
+        Returns the usage keys of the blocks changed and deleted by the latest update of the
+        given course as a (changed, deleted) tuple, or None if its modulestore cannot tell.
+        """
+        try:
+            store = self._verify_modulestore_support(course_key, 'get_block_changes')
+            return store.get_block_changes(course_key, **kwargs)
+        except NotImplementedError:
+            return None
+
     def get_modulestore_type(self, course_id):
         """
         Returns a type which identifies which modulestore is servicing the given course_id.
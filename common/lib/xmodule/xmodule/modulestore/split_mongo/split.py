@@ -1250,6 +1250,66 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             'edited_on': course['edited_on']
         }
 
+    def get_course_version(self, course_key):
+        """
+        Return the version guid of the head structure of the given course branch, or None if the
+        course has no such branch.
+
+        :param course_key: must have a org, course, run and branch set
+        """
+        if not isinstance(course_key, CourseLocator) or course_key.deprecated:
+            # The supplied CourseKey is of the wrong type, so it can't possibly be stored in this modulestore.
+            raise ItemNotFoundError(course_key)
+
+        index = self.get_course_index(course_key)
+        if index is None:
+            return None
+        return index['versions'].get(course_key.branch)
+
+    def get_block_changes(self, course_key):
+        """
+        Compare the head structure of the given course branch, or the structure of the given version,
+        with the structure it was derived from.
+
+        :param course_key: must have a org, course, run and branch set, and may have a version_guid to
+            compare that version instead of the head of the branch
+        :return a (changed, deleted) tuple of lists of usage keys where changed holds the blocks which
+            were added or whose definition, settings or children differ and deleted holds the blocks
+            which are no longer in the structure; or None if there is no previous structure to compare to
+        """
+        if not isinstance(course_key, CourseLocator) or course_key.deprecated:
+            # The supplied CourseKey is of the wrong type, so it can't possibly be stored in this modulestore.
+            raise ItemNotFoundError(course_key)
+
+        structure = self._lookup_course(course_key, head_validation=False).structure
+        course_key = course_key.version_agnostic()
+        previous_structure = None
+        if structure['previous_version'] is not None:
+            previous_structure = self.get_structure(course_key, structure['previous_version'])
+        if previous_structure is None:
+            return None
+
+        def block_content(block_data):
+            """
+            The parts of the block which make up its content, ignoring its edit info
+            """
+            return block_data.block_type, block_data.definition, block_data.fields, block_data.defaults
+
+        blocks = structure['blocks']
+        previous_blocks = previous_structure['blocks']
+        changed = [
+            course_key.make_usage_key(block_type=block_key.type, block_id=block_key.id)
+            for block_key, block_data in blocks.iteritems()
+            if block_key not in previous_blocks or
+            block_content(previous_blocks[block_key]) != block_content(block_data)
+        ]
+        deleted = [
+            course_key.make_usage_key(block_type=block_key.type, block_id=block_key.id)
+            for block_key in previous_blocks
+            if block_key not in blocks
+        ]
+        return changed, deleted
+
     def get_definition_history_info(self, definition_locator, course_context=None):
         """
         Because xblocks doesn't give a means to separate the definition's meta information from
@@ -469,6 +469,20 @@ class DraftVersioningModuleStore(SplitMongoModuleStore, ModuleStoreDraftAndPubli
         course_locator = self._map_revision_to_branch(course_locator)
         return super(DraftVersioningModuleStore, self).get_course_history_info(course_locator)
 
+    def get_course_version(self, course_locator, revision=None):
+        """
+        See :py:meth `xmodule.modulestore.split_mongo.split.SplitMongoModuleStore.get_course_version`
+        """
+        course_locator = self._map_revision_to_branch(course_locator, revision)
+        return super(DraftVersioningModuleStore, self).get_course_version(course_locator)
+
+    def get_block_changes(self, course_locator, revision=None):
+        """
+        See :py:meth `xmodule.modulestore.split_mongo.split.SplitMongoModuleStore.get_block_changes`
+        """
+        course_locator = self._map_revision_to_branch(course_locator, revision)
+        return super(DraftVersioningModuleStore, self).get_block_changes(course_locator)
+
     def get_course_successors(self, course_locator, version_history_depth=1):
         """
         See :py:meth `xmodule.modulestore.split_mongo.split.SplitMongoModuleStore.get_course_successors`
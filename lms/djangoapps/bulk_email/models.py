@@ -12,15 +12,21 @@ file and check it in at the same time as your model changes. To do that,
 
 """
 import logging
+import re
+from string import Formatter
+
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 from openedx.core.lib.html_to_text import html_to_text
 from openedx.core.lib.mail_utils import wrap_message
 
+from student.models import invalidate_dashboard_payloads
 from xmodule_django.models import CourseKeyField
-from util.keyword_substitution import substitute_keywords_with_data
+from util.keyword_substitution import anonymous_id_from_user_id, substitute_keywords_with_data
 
 log = logging.getLogger(__name__)
 
@@ -148,10 +154,22 @@ class Optout(models.Model):
         unique_together = ('user', 'course_id')
 
 
+@receiver(post_save, sender=Optout)
+@receiver(post_delete, sender=Optout)
+def invalidate_dashboard_payload_on_optout(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate the dashboard payload of a user who opted in or out of a course's emails."""
+    if instance.user is not None:
+        invalidate_dashboard_payloads([instance.user])
+
+
 # Defines the tag that must appear in a template, to indicate
 # the location where the email message body is to be inserted.
 COURSE_EMAIL_MESSAGE_BODY_TAG = '{{message_body}}'
 
+# Defines the context values that differ between the recipients of an email.
+# Compiled templates leave slots for these, which are filled in for each recipient.
+COURSE_EMAIL_RECIPIENT_KEYS = ('name', 'email', 'user_id')
+
 
 class CourseEmailTemplate(models.Model):
     """
@@ -230,6 +248,128 @@ class CourseEmailTemplate(models.Model):
         """
         return CourseEmailTemplate._render(self.html_template, htmltext, context)
 
+    def compile_plaintext(self, plaintext, context):
+        """
+        Create plain text messages for all recipients of an email.
+
+        Returns a CompiledEmailTemplate, whose `render` method creates the same
+        message as `render_plaintext` for each recipient's context.  `context`
+        holds the values shared by all recipients.
+        """
+        return CompiledEmailTemplate(self.plain_template, plaintext, context)
+
+    def compile_htmltext(self, htmltext, context):
+        """
+        Create HTML text messages for all recipients of an email.
+
+        Returns a CompiledEmailTemplate, whose `render` method creates the same
+        message as `render_htmltext` for each recipient's context.  `context`
+        holds the values shared by all recipients.
+        """
+        return CompiledEmailTemplate(self.html_template, htmltext, context)
+
+
+class CompiledEmailTemplate(object):
+    """
+    A message created from a template and message body once for all recipients
+    of an email, with slots for the values in COURSE_EMAIL_RECIPIENT_KEYS.
+
+    Rendering a message for a recipient only joins the static text with the
+    recipient's values, and wraps the lines that contain them.  The result
+    is the same as that of CourseEmailTemplate._render.
+    """
+    SLOT_PATTERN = re.compile(u'\ue000(\\w+)\ue001')
+
+    def __init__(self, format_string, message_body, context):
+        self.format_string = format_string
+        self.message_body = message_body
+        self.slot_keys = set()
+        self.parts = None
+        if self._can_compile(format_string, message_body):
+            self.parts = self._compile(format_string, message_body, context)
+
+    @staticmethod
+    def _slot(key):
+        """Returns the slot for the recipient value `key`."""
+        return u'\ue000{}\ue001'.format(key)
+
+    @staticmethod
+    def _can_compile(format_string, message_body):
+        """
+        Returns whether the template only inserts the recipient values as they
+        are.  Templates that format them or access their attributes are
+        rendered in full for each recipient instead.
+        """
+        if u'\ue000' in format_string or u'\ue000' in message_body:
+            return False
+        for __, field_name, format_spec, conversion in Formatter().parse(format_string):
+            if not field_name:
+                continue
+            key = re.split(r'[.\[]', field_name, 1)[0]
+            if key in COURSE_EMAIL_RECIPIENT_KEYS and (field_name != key or format_spec or conversion):
+                return False
+        return True
+
+    def _compile(self, format_string, message_body, context):
+        """
+        Render the message with slots in place of the recipient values, and
+        return it as a list of parts.  Each part is either static text, already
+        wrapped, or a line split into static text and slot keys.
+        """
+        slot_context = dict(context)
+        slot_context.update((key, self._slot(key)) for key in COURSE_EMAIL_RECIPIENT_KEYS)
+
+        # Substitute all %%-encoded keywords in the message body, leaving a
+        # slot for the anonymous user id, which is looked up for each recipient.
+        if 'user_id' in context and 'course_id' in context:
+            message_body = message_body.replace('%%USER_ID%%', self._slot('anonymous_user_id'))
+            message_body = substitute_keywords_with_data(message_body, slot_context)
+
+        result = format_string.format(**slot_context)
+        result = result.replace(COURSE_EMAIL_MESSAGE_BODY_TAG.format(), message_body, 1)
+
+        parts = []
+        static_lines = []
+        for line in result.split('\n'):
+            segments = self.SLOT_PATTERN.split(line)
+            if len(segments) == 1:
+                static_lines.append(line)
+                continue
+            if static_lines:
+                parts.append(wrap_message(u'\n'.join(static_lines)))
+                static_lines = []
+            parts.append(segments)
+            self.slot_keys.update(segments[1::2])
+        if static_lines:
+            parts.append(wrap_message(u'\n'.join(static_lines)))
+        return parts
+
+    def render(self, context):
+        """
+        Create the message for the recipient whose values are in `context`.
+        """
+        if self.parts is None:
+            return CourseEmailTemplate._render(  # pylint: disable=protected-access
+                self.format_string, self.message_body, context
+            )
+
+        values = {}
+        for key in self.slot_keys:
+            if key == 'anonymous_user_id':
+                values[key] = anonymous_id_from_user_id(context['user_id'])
+            else:
+                values[key] = u'{}'.format(context[key])
+
+        rendered = []
+        for part in self.parts:
+            if isinstance(part, list):
+                # Slot keys are at the odd indices of a split line.
+                part = wrap_message(u''.join(
+                    values[segment] if index % 2 else segment for index, segment in enumerate(part)
+                ))
+            rendered.append(part)
+        return u'\n'.join(rendered)
+
 
 class CourseAuthorization(models.Model):
     """
@@ -6,12 +6,15 @@ to a course.
 import re
 import random
 import json
-from time import sleep
-from collections import Counter
+import Queue
+import threading
+from time import sleep, time
+from collections import Counter, deque
 import logging
 
 import dogstats_wrapper as dog_stats_api
-from smtplib import SMTPServerDisconnected, SMTPDataError, SMTPConnectError, SMTPException
+import socket
+from smtplib import SMTP, SMTPServerDisconnected, SMTPDataError, SMTPConnectError, SMTPException
 from boto.ses.exceptions import (
     SESAddressNotVerifiedError,
     SESIdentityNotVerifiedError,
@@ -95,6 +98,293 @@ BULK_EMAIL_FAILURE_ERRORS = (
 )
 
 
+def _is_throttling_error(exc):
+    """
+    Returns whether `exc` is the email service refusing a message because
+    email is being sent too quickly.  These are the INFINITE_RETRY_ERRORS,
+    where only the SMTPDataErrors in the 4xx range count.
+    """
+    if isinstance(exc, SMTPDataError):
+        return 400 <= exc.smtp_code < 500
+    return isinstance(exc, SESMaxSendingRateExceededError)
+
+
+def _is_connection_usable(exc):
+    """
+    Returns whether a connection can still be used to send messages after
+    sending one failed with `exc`, which only concerned that message.
+    """
+    return isinstance(exc, SINGLE_EMAIL_FAILURE_ERRORS + (SMTPDataError, SESMaxSendingRateExceededError))
+
+
+class SendRateLimiter(object):
+    """
+    Limits the rate at which the subtasks of a worker process send email,
+    adapting it to the throttling responses of the email service.
+
+    Sending is not limited until a message is throttled.  From then on, the rate
+    is halved each time a message is throttled, down to
+    settings.BULK_EMAIL_MIN_SEND_RATE, and is raised by
+    settings.BULK_EMAIL_SEND_RATE_INCREASE for each message that is sent.  Once
+    it reaches settings.BULK_EMAIL_MAX_SEND_RATE, sending is no longer limited.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rate = None
+        self._next_send_time = 0
+
+    def reset(self):
+        """Stops limiting the rate."""
+        with self._lock:
+            self.rate = None
+            self._next_send_time = 0
+
+    def wait(self):
+        """Waits until the next message can be sent."""
+        with self._lock:
+            if self.rate is None:
+                return
+            now = time()
+            send_time = max(now, self._next_send_time)
+            self._next_send_time = send_time + 1.0 / self.rate
+        if send_time > now:
+            sleep(send_time - now)
+
+    def throttled(self, current_rate):
+        """Lowers the rate after a message was throttled while sending at `current_rate`."""
+        with self._lock:
+            rate = current_rate if self.rate is None else min(self.rate, current_rate)
+            self.rate = max(rate / 2.0, settings.BULK_EMAIL_MIN_SEND_RATE)
+
+    def sent(self):
+        """Raises the rate after a message was sent."""
+        with self._lock:
+            if self.rate is None:
+                return
+            self.rate += settings.BULK_EMAIL_SEND_RATE_INCREASE
+            if self.rate >= settings.BULK_EMAIL_MAX_SEND_RATE:
+                self.rate = None
+
+
+class EmailConnectionPool(object):
+    """
+    Open email connections of a worker process.
+
+    Connections released by a subtask are kept open for up to
+    settings.BULK_EMAIL_CONNECTION_MAX_IDLE_TIME seconds, so that the next
+    subtask doesn't have to connect and authenticate again.  SMTP connections
+    are checked before they are reused, since the server may have closed them
+    while they were idle.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = []
+
+    def acquire(self):
+        """Returns an open connection, reusing an idle one if there is one."""
+        while True:
+            connection = self._pop_idle()
+            if connection is None:
+                connection = get_connection()
+                connection.open()
+                return connection
+            if self._is_open(connection):
+                return connection
+            log.info("BulkEmail ==> Discarding an idle email connection that was closed")
+            self.discard(connection)
+
+    def _pop_idle(self):
+        """Returns the most recently released idle connection that hasn't expired, if any."""
+        connection = None
+        expired = []
+        with self._lock:
+            while self._idle and connection is None:
+                idle_connection, released_at = self._idle.pop()
+                if time() - released_at < settings.BULK_EMAIL_CONNECTION_MAX_IDLE_TIME:
+                    connection = idle_connection
+                else:
+                    expired.append(idle_connection)
+        for expired_connection in expired:
+            self.discard(expired_connection)
+        return connection
+
+    def _is_open(self, connection):
+        """
+        Returns whether an idle connection is still open.  Only the connections
+        of the SMTP backend can be checked; others are assumed to be open.
+        """
+        smtp_connection = getattr(connection, 'connection', None)
+        if not isinstance(smtp_connection, SMTP):
+            return True
+        try:
+            status, __ = smtp_connection.noop()
+        except (SMTPException, socket.error):
+            return False
+        return status == 250
+
+    def release(self, connection):
+        """Keeps a connection that is no longer used open for reuse."""
+        if settings.BULK_EMAIL_CONNECTION_MAX_IDLE_TIME > 0:
+            with self._lock:
+                self._idle.append((connection, time()))
+        else:
+            self.discard(connection)
+
+    def clear(self):
+        """Closes the idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, __ in idle:
+            self.discard(connection)
+
+    def discard(self, connection):
+        """Closes a connection, which may be broken."""
+        try:
+            connection.close()
+        except Exception:  # pylint: disable=broad-except
+            log.warning("BulkEmail ==> Failed to close an email connection", exc_info=True)
+
+
+SEND_RATE_LIMITER = SendRateLimiter()
+CONNECTION_POOL = EmailConnectionPool()
+
+
+class EmailSender(object):
+    """
+    Sends the messages of a subtask, with up to `max_in_flight` of them being
+    sent at the same time, each over its own connection from CONNECTION_POOL,
+    at the rate allowed by SEND_RATE_LIMITER.
+
+    A message that is throttled is sent again, up to
+    settings.BULK_EMAIL_MAX_THROTTLE_RETRIES times, before the error is
+    returned in its result.  When `max_in_flight` is 1, messages are sent
+    from the calling thread.
+    """
+    def __init__(self, max_in_flight, course_title):
+        self.max_in_flight = max(1, max_in_flight)
+        self.course_title = course_title
+        self.num_sent = 0
+        self.start_time = time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._threads = []
+        self._jobs = Queue.Queue()
+        self._results = Queue.Queue()
+        self._num_in_flight = 0
+        self._completed = deque()
+
+    def current_rate(self):
+        """Returns the number of messages per second that have been sent."""
+        return self.num_sent / max(time() - self.start_time, 0.001)
+
+    def send(self, email_msg, recipient):
+        """
+        Sends `email_msg`, waiting first for a message in flight to be sent if
+        there are already `max_in_flight` of them.  `recipient` identifies the
+        message in its result.
+        """
+        if self.max_in_flight == 1:
+            self._completed.append((recipient, self._send_with_connection(email_msg)))
+            return
+
+        if len(self._threads) < self.max_in_flight:
+            thread = threading.Thread(target=self._run)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        if self._num_in_flight >= self.max_in_flight:
+            self._completed.append(self._results.get())
+            self._num_in_flight -= 1
+        self._jobs.put((email_msg, recipient))
+        self._num_in_flight += 1
+
+    def results(self, wait=False):
+        """
+        Yields a (recipient, exception) tuple for each message that has been
+        sent, where `exception` is None if the message was sent successfully.
+        If `wait` is True, waits for all the messages in flight to be sent.
+        """
+        while self._num_in_flight:
+            try:
+                self._completed.append(self._results.get(block=wait))
+            except Queue.Empty:
+                break
+            self._num_in_flight -= 1
+        while self._completed:
+            yield self._completed.popleft()
+
+    def close(self):
+        """Stops the sending threads, and releases their connections."""
+        for __ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._release_connection()
+
+    def _run(self):
+        """Sends the messages queued by `send` until `close` is called."""
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            email_msg, recipient = job
+            self._results.put((recipient, self._send_with_connection(email_msg)))
+        self._release_connection()
+
+    @property
+    def _connection(self):
+        """The connection of the current thread."""
+        return getattr(self._local, 'connection', None)
+
+    def _release_connection(self):
+        """Returns the connection of the current thread to CONNECTION_POOL."""
+        if self._connection is not None:
+            CONNECTION_POOL.release(self._connection)
+            self._local.connection = None
+
+    def _send_with_connection(self, email_msg):
+        """
+        Sends `email_msg` over the connection of the current thread, opening it
+        if needed, and returns the exception that prevented it from being sent,
+        or None.
+        """
+        if self._connection is None:
+            try:
+                self._local.connection = CONNECTION_POOL.acquire()
+            except Exception as exc:  # pylint: disable=broad-except
+                return exc
+
+        exc = self._send(self._connection, email_msg)
+        if exc is not None and not _is_connection_usable(exc):
+            CONNECTION_POOL.discard(self._connection)
+            self._local.connection = None
+        return exc
+
+    def _send(self, connection, email_msg):
+        """Sends `email_msg`, sending it again if it is throttled."""
+        tags = [_statsd_tag(self.course_title)]
+        num_throttled = 0
+        while True:
+            SEND_RATE_LIMITER.wait()
+            try:
+                with dog_stats_api.timer('course_email.single_send.time.overall', tags=tags):
+                    connection.send_messages([email_msg])
+            except Exception as exc:  # pylint: disable=broad-except
+                if not _is_throttling_error(exc):
+                    return exc
+                dog_stats_api.increment('course_email.throttled', tags=tags)
+                if num_throttled >= settings.BULK_EMAIL_MAX_THROTTLE_RETRIES:
+                    return exc
+                num_throttled += 1
+                SEND_RATE_LIMITER.throttled(self.current_rate())
+            else:
+                SEND_RATE_LIMITER.sent()
+                with self._lock:
+                    self.num_sent += 1
+                return None
+
+
 def _get_recipient_querysets(user_id, to_option, course_id):
     """
     Returns a list of query sets of email recipients corresponding to the
@@ -103,19 +393,20 @@ def _get_recipient_querysets(user_id, to_option, course_id):
     `to_option` is either SEND_TO_MYSELF, SEND_TO_STAFF, or SEND_TO_ALL.
 
     Recipients who are in more than one category (e.g. enrolled in the course
-    and are staff or self) will be properly deduped.
+    and are staff or self) will be properly deduped.  Recipients who have opted
+    out of email from the course are excluded.
     """
     if to_option not in TO_OPTIONS:
         log.error("Unexpected bulk email TO_OPTION found: %s", to_option)
         raise Exception("Unexpected bulk email TO_OPTION found: {0}".format(to_option))
 
     if to_option == SEND_TO_MYSELF:
-        user = User.objects.filter(id=user_id)
+        user = User.objects.filter(id=user_id).exclude(optout__course_id=course_id)
         return [use_read_replica_if_available(user)]
     else:
         staff_qset = CourseStaffRole(course_id).users_with_role()
         instructor_qset = CourseInstructorRole(course_id).users_with_role()
-        staff_instructor_qset = (staff_qset | instructor_qset).distinct()
+        staff_instructor_qset = (staff_qset | instructor_qset).distinct().exclude(optout__course_id=course_id)
         if to_option == SEND_TO_STAFF:
             return [use_read_replica_if_available(staff_instructor_qset)]
 
@@ -126,7 +417,7 @@ def _get_recipient_querysets(user_id, to_option, course_id):
                 is_active=True,
                 courseenrollment__course_id=course_id,
                 courseenrollment__is_active=True
-            )
+            ).exclude(optout__course_id=course_id)
 
             # to avoid duplicates, we only want to email unenrolled course staff
             # members here
@@ -442,9 +733,7 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
     parent_task_id = InstructorTask.objects.get(pk=entry_id).task_id
     task_id = subtask_status.task_id
     total_recipients = len(to_list)
-    recipient_num = 0
-    total_recipients_successful = 0
-    total_recipients_failed = 0
+    totals = Counter()
     recipients_info = Counter()
 
     log.info(
@@ -467,6 +756,8 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
         raise
 
     # Exclude optouts (if not a retry):
+    # Recipients who had opted out when the subtasks were queued were already left out
+    # by _get_recipient_querysets(); this excludes those who have opted out since.
     # Note that we don't have to do the optout logic at all if this is a retry,
     # because we have presumably already performed the optout logic on the first
     # attempt.  Anyone on the to_list on a retry has already passed the filter
@@ -484,68 +775,45 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
 
     # use the CourseEmailTemplate that was associated with the CourseEmail
     course_email_template = course_email.get_template()
+    sender = EmailSender(settings.BULK_EMAIL_MAX_IN_FLIGHT, course_title)
     try:
-        connection = get_connection()
-        connection.open()
-
         # Define context values to use in all course emails:
-        email_context = {'name': '', 'email': ''}
+        email_context = {'name': '', 'email': '', 'user_id': None, 'course_id': course_email.course_id}
         email_context.update(global_email_context)
 
-        while to_list:
-            # Update context with user-specific values from the user at the end of the list.
-            # At the end of processing this user, they will be popped off of the to_list.
-            # That way, the to_list will always contain the recipients remaining to be emailed.
-            # This is convenient for retries, which will need to send to those who haven't
-            # yet been emailed, but not send to those who have already been sent to.
-            recipient_num += 1
-            current_recipient = to_list[-1]
-            email = current_recipient['email']
-            email_context['email'] = email
-            email_context['name'] = current_recipient['profile__name']
-            email_context['user_id'] = current_recipient['pk']
-            email_context['course_id'] = course_email.course_id
-
-            # Construct message content using templates and context:
-            plaintext_msg = course_email_template.render_plaintext(course_email.text_message, email_context)
-            html_msg = course_email_template.render_htmltext(course_email.html_message, email_context)
-
-            # Create email:
-            email_msg = EmailMultiAlternatives(
-                course_email.subject,
-                plaintext_msg,
-                from_addr,
-                [email],
-                connection=connection
-            )
-            email_msg.attach_alternative(html_msg, 'text/html')
-
-            # Throttle if we have gotten the rate limiter.  This is not very high-tech,
-            # but if a task has been retried for rate-limiting reasons, then we sleep
-            # for a period of time between all emails within this task.  Choice of
-            # the value depends on the number of workers that might be sending email in
-            # parallel, and what the SES throttle rate is.
-            if subtask_status.retried_nomax > 0:
-                sleep(settings.BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS)
+        # Messages differ between recipients only in the recipient's own values, so
+        # render the templates once, leaving slots to fill in for each recipient.
+        plaintext_template = course_email_template.compile_plaintext(course_email.text_message, email_context)
+        html_template = course_email_template.compile_htmltext(course_email.html_message, email_context)
 
-            try:
+        def record_result(recipient_num, current_recipient, exc):
+            """
+            Records the result of sending to `current_recipient`, and removes
+            them from the to_list.  Raises `exc` if it needs the task to be retried.
+            """
+            email = current_recipient['email']
+            if exc is None:
+                totals['successful'] += 1
                 log.info(
-                    "BulkEmail ==> Task: %s, SubTask: %s, EmailId: %s, Recipient num: %s/%s, \
-                    Recipient name: %s, Email address: %s",
+                    "BulkEmail ==> Status: Success, Task: %s, SubTask: %s, EmailId: %s, \
+                    Recipient num: %s/%s, Email address: %s,",
                     parent_task_id,
                     task_id,
                     email_id,
                     recipient_num,
                     total_recipients,
-                    current_recipient['profile__name'],
                     email
                 )
-                with dog_stats_api.timer('course_email.single_send.time.overall', tags=[_statsd_tag(course_title)]):
-                    connection.send_messages([email_msg])
+                dog_stats_api.increment('course_email.sent', tags=[_statsd_tag(course_title)])
+                if settings.BULK_EMAIL_LOG_SENT_EMAILS:
+                    log.info('Email with id %s sent to %s', email_id, email)
+                else:
+                    log.debug('Email with id %s sent to %s', email_id, email)
+                subtask_status.increment(succeeded=1)
 
-            except SMTPDataError as exc:
+            elif isinstance(exc, SMTPDataError):
                 # According to SMTP spec, we'll retry error codes in the 4xx range.  5xx range indicates hard failure.
-                total_recipients_failed += 1
+                totals['failed'] += 1
                 log.error(
                     "BulkEmail ==> Status: Failed(SMTPDataError), Task: %s, SubTask: %s, EmailId: %s, \
                     Recipient num: %s/%s, Email address: %s",
@@ -575,9 +843,9 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
                     dog_stats_api.increment('course_email.error', tags=[_statsd_tag(course_title)])
                     subtask_status.increment(failed=1)
 
-            except SINGLE_EMAIL_FAILURE_ERRORS as exc:
+            elif isinstance(exc, SINGLE_EMAIL_FAILURE_ERRORS):
                 # This will fall through and not retry the message.
-                total_recipients_failed += 1
+                totals['failed'] += 1
                 log.error(
                     "BulkEmail ==> Status: Failed(SINGLE_EMAIL_FAILURE_ERRORS), Task: %s, SubTask: %s, \
                     EmailId: %s, Recipient num: %s/%s, Email address: %s, Exception: %s",
@@ -593,29 +861,66 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
                 subtask_status.increment(failed=1)
 
             else:
-                total_recipients_successful += 1
+                # This will cause the outer handlers to catch the exception.
+                raise exc
+
+            # Remove the user that was emailed from the list only once they have
+            # successfully been processed.  (That way, if there were a failure that
+            # needed to be retried, the user is still on the list.)
+            recipients_info[email] += 1
+            to_list.remove(current_recipient)
+
+        try:
+            # Send to the users from the end of the list first.  Each user is removed
+            # from the to_list once the result of sending to them has been recorded.
+            # That way, the to_list will always contain the recipients remaining to be emailed.
+            # This is convenient for retries, which will need to send to those who haven't
+            # yet been emailed, but not send to those who have already been sent to.
+            for recipient_num, current_recipient in enumerate(reversed(to_list[:]), 1):
+                # Update context with user-specific values from the user:
+                email = current_recipient['email']
+                email_context['email'] = email
+                email_context['name'] = current_recipient['profile__name']
+                email_context['user_id'] = current_recipient['pk']
+
+                # Construct message content using templates and context:
+                plaintext_msg = plaintext_template.render(email_context)
+                html_msg = html_template.render(email_context)
+
+                # Create email:
+                email_msg = EmailMultiAlternatives(
+                    course_email.subject,
+                    plaintext_msg,
+                    from_addr,
+                    [email],
+                )
+                email_msg.attach_alternative(html_msg, 'text/html')
+
                 log.info(
-                    "BulkEmail ==> Status: Success, Task: %s, SubTask: %s, EmailId: %s, \
-                    Recipient num: %s/%s, Email address: %s,",
+                    "BulkEmail ==> Task: %s, SubTask: %s, EmailId: %s, Recipient num: %s/%s, \
+                    Recipient name: %s, Email address: %s",
                     parent_task_id,
                     task_id,
                     email_id,
                     recipient_num,
                     total_recipients,
+                    current_recipient['profile__name'],
                     email
                 )
-                dog_stats_api.increment('course_email.sent', tags=[_statsd_tag(course_title)])
-                if settings.BULK_EMAIL_LOG_SENT_EMAILS:
-                    log.info('Email with id %s sent to %s', email_id, email)
-                else:
-                    log.debug('Email with id %s sent to %s', email_id, email)
-                subtask_status.increment(succeeded=1)
+                sender.send(email_msg, (recipient_num, current_recipient))
+                for (sent_num, sent_recipient), exc in sender.results():
+                    record_result(sent_num, sent_recipient, exc)
 
-            # Pop the user that was emailed off the end of the list only once they have
-            # successfully been processed.  (That way, if there were a failure that
-            # needed to be retried, the user is still on the list.)
-            recipients_info[email] += 1
-            to_list.pop()
+            for (sent_num, sent_recipient), exc in sender.results(wait=True):
+                record_result(sent_num, sent_recipient, exc)
+
+        except Exception:
+            # Record the messages that were still in flight and have been sent,
+            # so that they aren't sent again when the task is retried.
+            for (sent_num, sent_recipient), exc in sender.results(wait=True):
+                if exc is None:
+                    record_result(sent_num, sent_recipient, exc)
+            raise
 
         log.info(
             "BulkEmail ==> Task: %s, SubTask: %s, EmailId: %s, Total Successful Recipients: %s/%s, \
@@ -623,9 +928,9 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
             parent_task_id,
             task_id,
             email_id,
-            total_recipients_successful,
+            totals['successful'],
             total_recipients,
-            total_recipients_failed,
+            totals['failed'],
             total_recipients
         )
         duplicate_recipients = ["{0} ({1})".format(email, repetition)
@@ -695,8 +1000,12 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
         # Successful completion is marked by an exception value of None.
         return subtask_status, None
     finally:
-        # Clean up at the end.
-        connection.close()
+        # Clean up at the end, keeping the connections open for the next task.
+        sender.close()
+        if sender.num_sent:
+            dog_stats_api.histogram(
+                'course_email.send_rate', sender.current_rate(), tags=[_statsd_tag(course_title)]
+            )
 
 
 def _get_current_task():
@@ -1,6 +1,11 @@
 """
 Unit tests for bulk-email-related models.
 """
+import logging
+import os
+from time import time
+from unittest import skipUnless
+
 from django.test import TestCase
 from django.core.management import call_command
 from django.conf import settings
@@ -13,6 +18,8 @@ from nose.plugins.attrib import attr
 from bulk_email.models import CourseEmail, SEND_TO_STAFF, CourseEmailTemplate, CourseAuthorization
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
+log = logging.getLogger(__name__)
+
 
 @attr('shard_1')
 @patch('bulk_email.models.html_to_text', Mock(return_value='Mocking CourseEmail.text_message'))
@@ -139,6 +146,80 @@ class CourseEmailTemplateTest(TestCase):
         context = self._get_sample_plain_context()
         template.render_plaintext("My new plain text.", context)
 
+    def _get_recipient_contexts(self, base_context):
+        """Provide contexts for several recipients of an email with the given shared context"""
+        contexts = []
+        for name in [u"Jöhn Doe", u"A very long name " * 100, u"Line\nbreak"]:
+            user = UserFactory.create()
+            contexts.append(dict(
+                base_context,
+                name=name,
+                email=user.email,
+                user_id=user.id,
+                course_id=SlashSeparatedCourseKey('edX', '1.23x', 'test_course'),
+            ))
+        return contexts
+
+    def test_compiled_render(self):
+        template = CourseEmailTemplate.get_template()
+        message = (
+            u"Dear %%USER_FULLNAME%% (%%USER_ID%%),\n"
+            u"Welcome to %%COURSE_DISPLAY_NAME%%.\n" + u"Some long text. " * 100
+        )
+        for context in self._get_recipient_contexts(self._get_sample_html_context()):
+            self.assertEquals(
+                template.compile_plaintext(message, dict(context, name='', email='')).render(context),
+                template.render_plaintext(message, context)
+            )
+            self.assertEquals(
+                template.compile_htmltext(message, dict(context, name='', email='')).render(context),
+                template.render_htmltext(message, context)
+            )
+
+    def test_compiled_render_with_formatted_recipient_values(self):
+        template = CourseEmailTemplate(plain_template=u"{name!r:>40} {email}\n{{message_body}}")
+        context = self._get_recipient_contexts(self._get_sample_plain_context())[0]
+        compiled = template.compile_plaintext(u"Hello", context)
+        self.assertIsNone(compiled.parts)
+        self.assertEquals(compiled.render(context), template.render_plaintext(u"Hello", context))
+
+    def test_compiled_render_many_recipients(self):
+        # A template compiled once renders the same message as the full
+        # template for each recipient of a long message.
+        template = CourseEmailTemplate.get_template()
+        message = u"<p>Dear %%USER_FULLNAME%%,</p>\n" + u"<p>Some course news.</p>\n" * 200
+        contexts = self._get_recipient_contexts(self._get_sample_html_context()) * 100
+        compiled = template.compile_htmltext(message, dict(contexts[0], name='', email=''))
+        self.assertEquals(
+            [compiled.render(context) for context in contexts],
+            [template.render_htmltext(message, context) for context in contexts]
+        )
+
+    @skipUnless(os.environ.get('BULK_EMAIL_BENCHMARK'), "Set BULK_EMAIL_BENCHMARK to run this benchmark.")
+    def test_compiled_render_throughput(self):
+        template = CourseEmailTemplate.get_template()
+        message = u"<p>Dear %%USER_FULLNAME%%,</p>\n" + u"<p>Some course news.</p>\n" * 200
+        contexts = self._get_recipient_contexts(self._get_sample_html_context()) * 100
+
+        start = time()
+        for context in contexts:
+            template.render_htmltext(message, context)
+        render_time = time() - start
+
+        start = time()
+        compiled = template.compile_htmltext(message, dict(contexts[0], name='', email=''))
+        for context in contexts:
+            compiled.render(context)
+        compiled_time = time() - start
+
+        log.info(
+            "Rendered %d messages/sec, %d messages/sec with a compiled template",
+            len(contexts) / max(render_time, 0.001),
+            len(contexts) / max(compiled_time, 0.001),
+        )
+        # Timings are noisy, so only check that compiling isn't slower.
+        self.assertLess(compiled_time, render_time)
+
 
 @attr('shard_1')
 class CourseAuthorizationTest(TestCase):
@@ -11,7 +11,7 @@ from uuid import uuid4
 from itertools import cycle, chain, repeat
 from mock import patch, Mock
 from nose.plugins.attrib import attr
-from smtplib import SMTPServerDisconnected, SMTPDataError, SMTPConnectError, SMTPAuthenticationError
+from smtplib import SMTP, SMTPServerDisconnected, SMTPDataError, SMTPConnectError, SMTPAuthenticationError
 from boto.ses.exceptions import (
     SESAddressNotVerifiedError,
     SESIdentityNotVerifiedError,
@@ -29,10 +29,12 @@ from celery.states import SUCCESS, FAILURE  # pylint: disable=no-name-in-module,
 
 from django.conf import settings
 from django.core.management import call_command
+from django.test.utils import override_settings
 
 from xmodule.modulestore.tests.factories import CourseFactory
 
 from bulk_email.models import CourseEmail, Optout, SEND_TO_ALL
+from bulk_email.tasks import SEND_RATE_LIMITER, CONNECTION_POOL, send_course_email
 
 from instructor_task.tasks import send_bulk_course_email
 from instructor_task.subtasks import update_subtask_status, SubtaskStatus
@@ -229,22 +231,42 @@ class TestBulkEmailInstructorTask(InstructorTaskCourseTestCase):
             get_conn.return_value.send_messages.side_effect = cycle([None])
             self._test_run_with_task(send_bulk_course_email, 'emailed', num_emails - 1, num_emails - 1)
 
-    def test_skipped(self):
+    def test_optouts_excluded(self):
         # Select number of emails to fit into a single subtask.
         num_emails = settings.BULK_EMAIL_EMAILS_PER_TASK
         # We also send email to the instructor:
         students = self._create_students(num_emails - 1)
         # have every fourth student optout:
-        expected_skipped = int((num_emails + 3) / 4.0)
-        expected_succeeds = num_emails - expected_skipped
+        num_optouts = int((num_emails + 3) / 4.0)
+        expected_succeeds = num_emails - num_optouts
         for index in range(0, num_emails, 4):
             Optout.objects.create(user=students[index], course_id=self.course.id)
-        # mark some students as opting out
+        # Students who have opted out are not recipients at all.
         with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
             get_conn.return_value.send_messages.side_effect = cycle([None])
-            self._test_run_with_task(
-                send_bulk_course_email, 'emailed', num_emails, expected_succeeds, skipped=expected_skipped
-            )
+            self._test_run_with_task(send_bulk_course_email, 'emailed', expected_succeeds, expected_succeeds)
+
+    def test_skipped(self):
+        # Select number of emails to fit into a single subtask.
+        num_emails = settings.BULK_EMAIL_EMAILS_PER_TASK
+        # We also send email to the instructor:
+        students = self._create_students(num_emails - 1)
+        expected_skipped = int((num_emails + 3) / 4.0)
+        expected_succeeds = num_emails - expected_skipped
+        create_subtask = send_course_email.subtask
+
+        def create_optouts(*args, **kwargs):
+            """Have every fourth student opt out after the subtasks are queued."""
+            for index in range(0, num_emails, 4):
+                Optout.objects.create(user=students[index], course_id=self.course.id)
+            return create_subtask(*args, **kwargs)
+
+        with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
+            get_conn.return_value.send_messages.side_effect = cycle([None])
+            with patch('bulk_email.tasks.send_course_email.subtask', side_effect=create_optouts):
+                self._test_run_with_task(
+                    send_bulk_course_email, 'emailed', num_emails, expected_succeeds, skipped=expected_skipped
+                )
 
     def _test_email_address_failures(self, exception):
         """Test that celery handles bad address errors by failing and not retrying."""
@@ -387,6 +409,109 @@ class TestBulkEmailInstructorTask(InstructorTaskCourseTestCase):
             SESMaxSendingRateExceededError(455, "Throttling: Sending rate exceeded")
         )
 
+    def _test_throttled_messages_sent_again(self, exception):
+        """Test that throttled messages are sent again at a lower rate, without retrying the task."""
+        num_emails = 8
+        # We also send email to the instructor:
+        self._create_students(num_emails - 1)
+        SEND_RATE_LIMITER.reset()
+        self.addCleanup(SEND_RATE_LIMITER.reset)
+        with override_settings(BULK_EMAIL_MAX_THROTTLE_RETRIES=2):
+            with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
+                with patch('bulk_email.tasks.sleep') as mock_sleep:
+                    # Cycle through two throttling errors followed by a success.
+                    get_conn.return_value.send_messages.side_effect = cycle([exception, exception, None])
+                    self._test_run_with_task(send_bulk_course_email, 'emailed', num_emails, num_emails)
+
+        self.assertEquals(get_conn.return_value.send_messages.call_count, 3 * num_emails)
+        self.assertTrue(mock_sleep.called)
+        self.assertIsNotNone(SEND_RATE_LIMITER.rate)
+
+    def test_smtp_throttled_messages_sent_again(self):
+        self._test_throttled_messages_sent_again(SMTPDataError(455, "Throttling: Sending rate exceeded"))
+
+    def test_ses_throttled_messages_sent_again(self):
+        self._test_throttled_messages_sent_again(
+            SESMaxSendingRateExceededError(455, "Throttling: Sending rate exceeded")
+        )
+
+    @override_settings(BULK_EMAIL_MAX_IN_FLIGHT=3)
+    def test_concurrent_sends(self):
+        num_emails = settings.BULK_EMAIL_EMAILS_PER_TASK
+        # We also send email to the instructor:
+        self._create_students(num_emails - 1)
+        expected_fails = int((num_emails + 1) / 2.0)
+        expected_succeeds = num_emails - expected_fails
+        with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
+            # have every other email fail due to an address failure:
+            get_conn.return_value.send_messages.side_effect = cycle(
+                [SESAddressBlacklistedError(554, "Email address is blacklisted"), None]
+            )
+            self._test_run_with_task(
+                send_bulk_course_email, 'emailed', num_emails, expected_succeeds, failed=expected_fails
+            )
+        # Each thread sends over its own connection, which it keeps after address failures.
+        self.assertLessEqual(get_conn.call_count, 3)
+        self.assertEquals(get_conn.return_value.close.call_count, get_conn.call_count)
+
+    @override_settings(BULK_EMAIL_MAX_IN_FLIGHT=3)
+    def test_concurrent_sends_retry_after_disconnect(self):
+        # If we want the batch to succeed, we need to send fewer emails
+        # than the max retries, so that the max is not triggered.
+        num_emails = settings.BULK_EMAIL_MAX_RETRIES
+        # We also send email to the instructor:
+        self._create_students(num_emails - 1)
+        with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
+            # Have every other mail attempt fail due to disconnection.
+            get_conn.return_value.send_messages.side_effect = cycle(
+                [SMTPServerDisconnected(425, "Disconnecting"), None]
+            )
+            entry = self._create_input_entry()
+            self._run_task_with_mock_celery(send_bulk_course_email, entry.id, entry.task_id)
+
+        # Messages that were sent before a retry are not sent again.
+        status = json.loads(InstructorTask.objects.get(id=entry.id).task_output)
+        self.assertEquals(status.get('succeeded'), num_emails)
+        self.assertEquals(status.get('failed'), 0)
+        self.assertEquals(get_conn.return_value.send_messages.call_count, 2 * num_emails)
+
+    @override_settings(BULK_EMAIL_CONNECTION_MAX_IDLE_TIME=60, BULK_EMAIL_EMAILS_PER_TASK=3)
+    def test_connection_reused_between_subtasks(self):
+        num_emails = 9
+        # We also send email to the instructor:
+        self._create_students(num_emails - 1)
+        self.addCleanup(CONNECTION_POOL.clear)
+        with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
+            get_conn.return_value.send_messages.side_effect = cycle([None])
+            entry = self._create_input_entry()
+            self._run_task_with_mock_celery(send_bulk_course_email, entry.id, entry.task_id)
+
+        status = json.loads(InstructorTask.objects.get(id=entry.id).task_output)
+        self.assertEquals(status.get('succeeded'), num_emails)
+        self.assertEquals(get_conn.call_count, 1)
+        self.assertFalse(get_conn.return_value.close.called)
+
+    @override_settings(BULK_EMAIL_CONNECTION_MAX_IDLE_TIME=60, BULK_EMAIL_EMAILS_PER_TASK=3)
+    def test_stale_pooled_connection_replaced(self):
+        num_emails = 9
+        # We also send email to the instructor:
+        self._create_students(num_emails - 1)
+        self.addCleanup(CONNECTION_POOL.clear)
+        with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
+            # The server closes the connection whenever it's idle in the pool.
+            get_conn.return_value.connection = Mock(spec=SMTP)
+            get_conn.return_value.connection.noop.side_effect = SMTPServerDisconnected("Connection unexpectedly closed")
+            get_conn.return_value.send_messages.side_effect = cycle([None])
+            entry = self._create_input_entry()
+            self._run_task_with_mock_celery(send_bulk_course_email, entry.id, entry.task_id)
+
+        # Each subtask after the first reconnects instead of failing to send.
+        status = json.loads(InstructorTask.objects.get(id=entry.id).task_output)
+        self.assertEquals(status.get('succeeded'), num_emails)
+        self.assertEquals(status.get('failed'), 0)
+        self.assertEquals(get_conn.call_count, 3)
+        self.assertEquals(get_conn.return_value.close.call_count, 2)
+
     def _test_immediate_failure(self, exception):
         """Test that celery can hit a maximum number of retries."""
         # Doesn't really matter how many recipients, since we expect
@@ -12,6 +12,7 @@ from django.core.urlresolvers import reverse
 from eventtracking import tracker
 from opaque_keys.edx.keys import CourseKey
 
+from courseware import grades
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from xmodule.modulestore.django import modulestore
 from xmodule_django.models import CourseKeyField
@@ -122,6 +123,68 @@ def generate_user_certificates(student, course_key, course=None, insecure=False,
     return status
 
 
+def generate_certificates_for_students(students, course_key, course=None, insecure=False, generation_mode='batch'):
+    """
+    Add add-cert requests for a batch of students into the xqueue.
+
+    This does what generate_user_certificates() does for each student, but
+    shares one xqueue connection between them, loads their scores and
+    profiles in bulk, and sends their requests to the xqueue from
+    settings.CERTIFICATE_GENERATION_XQUEUE_CONCURRENCY threads while the
+    next students are graded.
+
+    Args:
+        students (list of User)
+        course_key (CourseKey)
+
+    Keyword Arguments:
+        course (Course): Optionally provide the course object; if not provided
+            it will be loaded.
+        insecure - (Boolean)
+        generation_mode - who has requested certificate generation.
+
+    Returns:
+        dict: the certificate status of each student, keyed by user id.
+    """
+    if course is None:
+        course = modulestore().get_course(course_key, depth=None)
+
+    xqueue = XQueueCertInterface()
+    if insecure:
+        xqueue.use_https = False
+    xqueue.prefetch_students(students, course_key)
+    scores_clients = grades.scores_clients_for_students(course, students)
+    generate_pdf = not has_html_certificates_enabled(course_key, course)
+
+    statuses = {}
+    certs = {}
+    xqueue.start_pipeline(settings.CERTIFICATE_GENERATION_XQUEUE_CONCURRENCY)
+    try:
+        for student in students:
+            statuses[student.id], certs[student.id] = xqueue.add_cert(
+                student,
+                course_key,
+                course=course,
+                generate_pdf=generate_pdf,
+                scores_client=scores_clients[student.id],
+            )
+    finally:
+        for cert in xqueue.finish_pipeline():
+            statuses[cert.user_id] = cert.status
+
+    for student in students:
+        if statuses.get(student.id) in [CertificateStatuses.generating, CertificateStatuses.downloadable]:
+            cert = certs[student.id]
+            emit_certificate_event('created', student, course_key, course, {
+                'user_id': student.id,
+                'course_id': unicode(course_key),
+                'certificate_id': cert.verify_uuid,
+                'enrollment_mode': cert.mode,
+                'generation_mode': generation_mode
+            })
+    return statuses
+
+
 def regenerate_user_certificates(student, course_key, course=None,
                                  forced_grade=None, template_file=None, insecure=False):
     """
@@ -197,21 +197,44 @@ def certificate_status_for_student(student, course_id):
     try:
         generated_certificate = GeneratedCertificate.objects.get(
             user=student, course_id=course_id)
-        cert_status = {
-            'status': generated_certificate.status,
-            'mode': generated_certificate.mode
-        }
-        if generated_certificate.grade:
-            cert_status['grade'] = generated_certificate.grade
-        if generated_certificate.status == CertificateStatuses.downloadable:
-            cert_status['download_url'] = generated_certificate.download_url
-
-        return cert_status
+        return _certificate_status(generated_certificate)
     except GeneratedCertificate.DoesNotExist:
         pass
     return {'status': CertificateStatuses.unavailable, 'mode': GeneratedCertificate.MODES.honor}
 
 
+def certificate_statuses_for_student(student, course_ids):
+    """
+    Returns a dict mapping each of `course_ids` to the certificate status of
+    the student in that course, as returned by certificate_status_for_student,
+    with a single query.
+    """
+    statuses = {
+        course_id: {'status': CertificateStatuses.unavailable, 'mode': GeneratedCertificate.MODES.honor}
+        for course_id in course_ids
+    }
+    if statuses:
+        for generated_certificate in GeneratedCertificate.objects.filter(user=student, course_id__in=course_ids):
+            statuses[generated_certificate.course_id] = _certificate_status(generated_certificate)
+    return statuses
+
+
+def _certificate_status(generated_certificate):
+    """
+    Returns the certificate status dict of a GeneratedCertificate.
+    """
+    cert_status = {
+        'status': generated_certificate.status,
+        'mode': generated_certificate.mode
+    }
+    if generated_certificate.grade:
+        cert_status['grade'] = generated_certificate.grade
+    if generated_certificate.status == CertificateStatuses.downloadable:
+        cert_status['download_url'] = generated_certificate.download_url
+
+    return cert_status
+
+
 def certificate_info_for_user(user, course_id, grade, user_is_whitelisted=None):
     """
     Returns the certificate info for a user for grade report.
@@ -4,6 +4,7 @@ import random
 import logging
 import lxml.html
 from lxml.etree import XMLSyntaxError, ParserError  # pylint:disable=no-name-in-module
+from multiprocessing.pool import ThreadPool
 from uuid import uuid4
 
 from django.test.client import RequestFactory
@@ -55,8 +56,9 @@ class XQueueCertInterface(object):
     interface to the xqueue server for
     managing student certificates.
 
-    Instantiating an object will create a new
-    connection to the queue server.
+    Objects share their connections to the queue
+    server with the other xqueue clients of the
+    process (see capa.xqueue_interface.XQueueSession).
 
     See models.py for valid state transitions,
     summary of methods:
@@ -106,6 +108,80 @@ class XQueueCertInterface(object):
         self.restricted = UserProfile.objects.filter(allow_certificate=False)
         self.use_https = True
 
+        # Set by prefetch_students()
+        self._prefetched_course_id = None
+        self._whitelisted_ids = set()
+        self._restricted_ids = set()
+        self._profile_names = {}
+
+        # Set by start_pipeline()
+        self._pipeline = None
+        self._in_flight = []
+
+    def prefetch_students(self, students, course_id):
+        """
+        Load what add_cert() needs to know about each of `students` in the
+        course, other than their grades, with one query for all of them.
+        """
+        user_ids = [student.id for student in students]
+        self._prefetched_course_id = course_id
+        self._whitelisted_ids = set(
+            self.whitelist.filter(user_id__in=user_ids, course_id=course_id, whitelist=True).values_list(
+                'user_id', flat=True
+            )
+        )
+        self._restricted_ids = set(self.restricted.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+        self._profile_names = dict(UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', 'name'))
+
+    def start_pipeline(self, max_in_flight):
+        """
+        Send the certificate tasks of add_cert() from `max_in_flight` threads
+        instead of waiting for each of them, until finish_pipeline() is called.
+
+        The certificates are marked as generating until their tasks are sent.
+        """
+        self._pipeline = ThreadPool(max_in_flight)
+        self._in_flight = []
+
+    def finish_pipeline(self):
+        """
+        Wait for the certificate tasks sent since start_pipeline() was called,
+        and mark the certificates whose tasks could not be sent as 'error'.
+
+        Returns the list of those certificates.
+        """
+        pipeline, in_flight = self._pipeline, self._in_flight
+        self._pipeline = None
+        self._in_flight = []
+        if pipeline is None:
+            return []
+
+        pipeline.close()
+        pipeline.join()
+
+        failed = []
+        for cert, result in in_flight:
+            try:
+                result.get()
+            except XQueueAddToQueueError as exc:
+                self._mark_send_error(cert, exc)
+                failed.append(cert)
+        return failed
+
+    def _mark_send_error(self, cert, exc):
+        """Mark `cert` as 'error' because its task could not be added to the queue."""
+        cert.status = ExampleCertificate.STATUS_ERROR
+        cert.error_reason = unicode(exc)
+        cert.save()
+        LOGGER.critical(
+            (
+                u"Could not add certificate task to XQueue.  "
+                u"The course was '%s' and the student was '%s'."
+                u"The certificate task status has been marked as 'error' "
+                u"and can be re-submitted with a management command."
+            ), cert.course_id, cert.user_id
+        )
+
     def regen_cert(self, student, course_id, course=None, forced_grade=None, template_file=None, generate_pdf=True):
         """(Re-)Make certificate for a particular student in a particular course
 
@@ -184,7 +260,7 @@ class XQueueCertInterface(object):
 
     # pylint: disable=too-many-statements
     def add_cert(self, student, course_id, course=None, forced_grade=None, template_file=None,
-                 title='None', generate_pdf=True):
+                 title='None', generate_pdf=True, scores_client=None):
         """
         Request a new certificate for a student.
 
@@ -195,6 +271,8 @@ class XQueueCertInterface(object):
                          the certificate request. If this is given, grading
                          will be skipped.
           generate_pdf - Boolean should a message be sent in queue to generate certificate PDF
+          scores_client - a ScoresClient holding the student's scores, if they
+                          have already been fetched
 
         Will change the certificate status to 'generating' or
         `downloadable` in case of web view certificates.
@@ -246,16 +324,21 @@ class XQueueCertInterface(object):
             # for every student
             if course is None:
                 course = modulestore().get_course(course_id, depth=0)
-            profile = UserProfile.objects.get(user=student)
-            profile_name = profile.name
+            # use what prefetch_students() loaded, if it loaded this student
+            prefetched = course_id == self._prefetched_course_id and student.id in self._profile_names
+            if prefetched:
+                profile_name = self._profile_names[student.id]
+                is_whitelisted = student.id in self._whitelisted_ids
+            else:
+                profile_name = UserProfile.objects.get(user=student).name
+                is_whitelisted = self.whitelist.filter(user=student, course_id=course_id, whitelist=True).exists()
 
             # Needed
             self.request.user = student
             self.request.session = {}
 
             course_name = course.display_name or unicode(course_id)
-            is_whitelisted = self.whitelist.filter(user=student, course_id=course_id, whitelist=True).exists()
-            grade = grades.grade(student, self.request, course)
+            grade = grades.grade(student, self.request, course, scores_client=scores_client)
             enrollment_mode, __ = CourseEnrollment.enrollment_mode_for_user(student, course_id)
             mode_is_verified = enrollment_mode in GeneratedCertificate.VERIFIED_CERTS_MODES
             user_is_verified = SoftwareSecurePhotoVerification.user_is_verified(student)
@@ -320,7 +403,12 @@ class XQueueCertInterface(object):
                 # otherwise, put a new certificate request
                 # on the queue
 
-                if self.restricted.filter(user=student).exists():
+                if prefetched:
+                    is_restricted = student.id in self._restricted_ids
+                else:
+                    is_restricted = self.restricted.filter(user=student).exists()
+
+                if is_restricted:
                     new_status = status.restricted
                     cert.status = new_status
                     cert.save()
@@ -359,22 +447,16 @@ class XQueueCertInterface(object):
                     cert.status = new_status
                     cert.save()
 
-                    if generate_pdf:
+                    if generate_pdf and self._pipeline is not None:
+                        self._in_flight.append(
+                            (cert, self._pipeline.apply_async(self._send_to_xqueue, (contents, key)))
+                        )
+                    elif generate_pdf:
                         try:
                             self._send_to_xqueue(contents, key)
                         except XQueueAddToQueueError as exc:
                             new_status = ExampleCertificate.STATUS_ERROR
-                            cert.status = new_status
-                            cert.error_reason = unicode(exc)
-                            cert.save()
-                            LOGGER.critical(
-                                (
-                                    u"Could not add certificate task to XQueue.  "
-                                    u"The course was '%s' and the student was '%s'."
-                                    u"The certificate task status has been marked as 'error' "
-                                    u"and can be re-submitted with a management command."
-                                ), course_id, student.id
-                            )
+                            self._mark_send_error(cert, exc)
                         else:
                             LOGGER.info(
                                 (
@@ -5,9 +5,15 @@ from util.json_request import JsonResponse
 import json
 
 from courseware import models
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.db.models import Count
+from django.utils import timezone
 from django.utils.translation import ugettext as _
 
+from class_dashboard.models import CourseMetricsRefresh, ProblemGradeSummary, SequentialOpenSummary
+
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.inheritance import own_metadata
 from instructor_analytics.csvs import create_csv_response
@@ -17,6 +23,102 @@ from opaque_keys.edx.locations import Location
 # Used to limit the length of list displayed to the screen.
 MAX_SCREEN_LIST_LENGTH = 250
 
+# Seconds after which a scheduled refresh of a course's metrics can be scheduled again,
+# in case the first one failed.
+METRICS_REFRESH_SCHEDULE_TIMEOUT = 60 * 60
+
+
+def _use_precomputed_metrics(course_id):
+    """
+    Return whether the metrics for `course_id` should be read from the summary
+    tables, scheduling a refresh of those tables if they are stale.
+
+    Precomputed metrics are used when FEATURES['CLASS_DASHBOARD_PRECOMPUTED_METRICS']
+    is set and the metrics for the course have been computed at least once.
+    """
+    if not settings.FEATURES.get('CLASS_DASHBOARD_PRECOMPUTED_METRICS'):
+        return False
+
+    refresh = CourseMetricsRefresh.record_view(course_id)
+    if refresh.is_stale():
+        schedule_metrics_refresh(course_id)
+    return refresh.computed is not None
+
+
+def _metrics_refresh_cache_key(course_id):
+    """
+    Returns the cache key used to record that a refresh of `course_id` has been scheduled.
+    """
+    return u"class_dashboard.metrics_refresh_scheduled.{}".format(course_id)
+
+
+def schedule_metrics_refresh(course_id):
+    """
+    Recompute the metrics for `course_id` in a celery task, unless a refresh is
+    already scheduled.
+    """
+    if cache.add(_metrics_refresh_cache_key(course_id), True, METRICS_REFRESH_SCHEDULE_TIMEOUT):
+        # Imported here to avoid a circular import between this module and the tasks.
+        from class_dashboard.tasks import refresh_course_metrics
+        refresh_course_metrics.delay(unicode(course_id))
+
+
+def _student_modules_read_only():
+    """
+    Returns the StudentModule manager, using the read replica if there is one.
+    """
+    if "read_replica" in settings.DATABASES:
+        return models.StudentModule.objects.using("read_replica")
+    return models.StudentModule.objects
+
+
+def refresh_course_metrics(course_id):
+    """
+    Recompute the problem grade and subsection open distributions for `course_id`
+    and replace the precomputed summaries with them.
+    """
+    grade_summaries = [
+        ProblemGradeSummary(
+            course_id=course_id,
+            module_state_key=row['module_state_key'],
+            grade=row['grade'],
+            max_grade=row['max_grade'],
+            count_grade=row['count_grade'],
+        )
+        for row in _student_modules_read_only().filter(
+            course_id__exact=course_id,
+            grade__isnull=False,
+            module_type__exact="problem",
+        ).values('module_state_key', 'grade', 'max_grade').annotate(count_grade=Count('grade'))
+    ]
+    open_summaries = [
+        SequentialOpenSummary(
+            course_id=course_id,
+            module_state_key=row['module_state_key'],
+            count_sequential=row['count_sequential'],
+        )
+        for row in _student_modules_read_only().filter(
+            course_id__exact=course_id,
+            module_type__exact="sequential",
+        ).values('module_state_key').annotate(count_sequential=Count('module_state_key'))
+    ]
+
+    with transaction.commit_on_success():
+        ProblemGradeSummary.objects.filter(course_id=course_id).delete()
+        ProblemGradeSummary.objects.bulk_create(grade_summaries)
+        SequentialOpenSummary.objects.filter(course_id=course_id).delete()
+        SequentialOpenSummary.objects.bulk_create(open_summaries)
+
+        now = timezone.now()
+        refresh, created = CourseMetricsRefresh.objects.get_or_create(
+            course_id=course_id,
+            defaults={'computed': now, 'last_viewed': now},
+        )
+        if not created:
+            CourseMetricsRefresh.objects.filter(pk=refresh.pk).update(computed=now)
+
+    cache.delete(_metrics_refresh_cache_key(course_id))
+
 
 def get_problem_grade_distribution(course_id):
     """
@@ -32,12 +134,17 @@ def get_problem_grade_distribution(course_id):
         attempting the problem
     """
 
-    # Aggregate query on studentmodule table for grade data for all problems in course
-    db_query = models.StudentModule.objects.filter(
-        course_id__exact=course_id,
-        grade__isnull=False,
-        module_type__exact="problem",
-    ).values('module_state_key', 'grade', 'max_grade').annotate(count_grade=Count('grade'))
+    if _use_precomputed_metrics(course_id):
+        db_query = ProblemGradeSummary.objects.filter(
+            course_id=course_id,
+        ).values('module_state_key', 'grade', 'max_grade', 'count_grade')
+    else:
+        # Aggregate query on studentmodule table for grade data for all problems in course
+        db_query = models.StudentModule.objects.filter(
+            course_id__exact=course_id,
+            grade__isnull=False,
+            module_type__exact="problem",
+        ).values('module_state_key', 'grade', 'max_grade').annotate(count_grade=Count('grade'))
 
     prob_grade_distrib = {}
     total_student_count = {}
@@ -75,11 +182,16 @@ def get_sequential_open_distrib(course_id):
     Outputs a dict mapping the 'module_id' to the number of students that have opened that subsection/sequential.
     """
 
-    # Aggregate query on studentmodule table for "opening a subsection" data
-    db_query = models.StudentModule.objects.filter(
-        course_id__exact=course_id,
-        module_type__exact="sequential",
-    ).values('module_state_key').annotate(count_sequential=Count('module_state_key'))
+    if _use_precomputed_metrics(course_id):
+        db_query = SequentialOpenSummary.objects.filter(
+            course_id=course_id,
+        ).values('module_state_key', 'count_sequential')
+    else:
+        # Aggregate query on studentmodule table for "opening a subsection" data
+        db_query = models.StudentModule.objects.filter(
+            course_id__exact=course_id,
+            module_type__exact="sequential",
+        ).values('module_state_key').annotate(count_sequential=Count('module_state_key'))
 
     # Build set of "opened" data for each subsection that has "opened" data
     sequential_open_distrib = {}
@@ -105,17 +217,28 @@ def get_problem_set_grade_distrib(course_id, problem_set):
       'grade_distrib' - array of tuples (`grade`,`count`) ordered by `grade`
     """
 
-    # Aggregate query on studentmodule table for grade data for set of problems in course
-    db_query = models.StudentModule.objects.filter(
-        course_id__exact=course_id,
-        grade__isnull=False,
-        module_type__exact="problem",
-        module_state_key__in=problem_set,
-    ).values(
-        'module_state_key',
-        'grade',
-        'max_grade',
-    ).annotate(count_grade=Count('grade')).order_by('module_state_key', 'grade')
+    if _use_precomputed_metrics(course_id):
+        db_query = ProblemGradeSummary.objects.filter(
+            course_id=course_id,
+            module_state_key__in=problem_set,
+        ).values(
+            'module_state_key',
+            'grade',
+            'max_grade',
+            'count_grade',
+        ).order_by('module_state_key', 'grade')
+    else:
+        # Aggregate query on studentmodule table for grade data for set of problems in course
+        db_query = models.StudentModule.objects.filter(
+            course_id__exact=course_id,
+            grade__isnull=False,
+            module_type__exact="problem",
+            module_state_key__in=problem_set,
+        ).values(
+            'module_state_key',
+            'grade',
+            'max_grade',
+        ).annotate(count_grade=Count('grade')).order_by('module_state_key', 'grade')
 
     prob_grade_distrib = {}
 
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=invalid-name, missing-docstring, unused-argument, unused-import, line-too-long
+
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'CourseMetricsRefresh'
+        db.create_table('class_dashboard_coursemetricsrefresh', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('course_id', self.gf('xmodule_django.models.CourseKeyField')(unique=True, max_length=255)),
+            ('computed', self.gf('django.db.models.fields.DateTimeField')(null=True, blank=True)),
+            ('last_viewed', self.gf('django.db.models.fields.DateTimeField')(db_index=True)),
+        ))
+        db.send_create_signal('class_dashboard', ['CourseMetricsRefresh'])
+
+        # Adding model 'ProblemGradeSummary'
+        db.create_table('class_dashboard_problemgradesummary', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('course_id', self.gf('xmodule_django.models.CourseKeyField')(max_length=255, db_index=True)),
+            ('module_state_key', self.gf('xmodule_django.models.LocationKeyField')(max_length=255)),
+            ('grade', self.gf('django.db.models.fields.FloatField')()),
+            ('max_grade', self.gf('django.db.models.fields.FloatField')(null=True)),
+            ('count_grade', self.gf('django.db.models.fields.IntegerField')()),
+        ))
+        db.send_create_signal('class_dashboard', ['ProblemGradeSummary'])
+
+        # Adding model 'SequentialOpenSummary'
+        db.create_table('class_dashboard_sequentialopensummary', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('course_id', self.gf('xmodule_django.models.CourseKeyField')(max_length=255, db_index=True)),
+            ('module_state_key', self.gf('xmodule_django.models.LocationKeyField')(max_length=255)),
+            ('count_sequential', self.gf('django.db.models.fields.IntegerField')()),
+        ))
+        db.send_create_signal('class_dashboard', ['SequentialOpenSummary'])
+
+    def backwards(self, orm):
+        # Deleting model 'CourseMetricsRefresh'
+        db.delete_table('class_dashboard_coursemetricsrefresh')
+
+        # Deleting model 'ProblemGradeSummary'
+        db.delete_table('class_dashboard_problemgradesummary')
+
+        # Deleting model 'SequentialOpenSummary'
+        db.delete_table('class_dashboard_sequentialopensummary')
+
+    models = {
+        'class_dashboard.coursemetricsrefresh': {
+            'Meta': {'object_name': 'CourseMetricsRefresh'},
+            'computed': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'blank': 'True'}),
+            'course_id': ('xmodule_django.models.CourseKeyField', [], {'unique': 'True', 'max_length': '255'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'last_viewed': ('django.db.models.fields.DateTimeField', [], {'db_index': 'True'})
+        },
+        'class_dashboard.problemgradesummary': {
+            'Meta': {'object_name': 'ProblemGradeSummary'},
+            'count_grade': ('django.db.models.fields.IntegerField', [], {}),
+            'course_id': ('xmodule_django.models.CourseKeyField', [], {'max_length': '255', 'db_index': 'True'}),
+            'grade': ('django.db.models.fields.FloatField', [], {}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'max_grade': ('django.db.models.fields.FloatField', [], {'null': 'True'}),
+            'module_state_key': ('xmodule_django.models.LocationKeyField', [], {'max_length': '255'})
+        },
+        'class_dashboard.sequentialopensummary': {
+            'Meta': {'object_name': 'SequentialOpenSummary'},
+            'count_sequential': ('django.db.models.fields.IntegerField', [], {}),
+            'course_id': ('xmodule_django.models.CourseKeyField', [], {'max_length': '255', 'db_index': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'module_state_key': ('xmodule_django.models.LocationKeyField', [], {'max_length': '255'})
+        }
+    }
+
+    complete_apps = ['class_dashboard']
@@ -0,0 +1,76 @@
+"""
+Precomputed metrics for the class dashboard (the Metrics tab of the
+Instructor Dashboard).
+
+The aggregations over StudentModule that the metrics tab displays are
+materialized here by `class_dashboard.tasks.refresh_course_metrics`, so that
+the views don't have to run them on every page load.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from xmodule_django.models import CourseKeyField, LocationKeyField
+
+
+class CourseMetricsRefresh(models.Model):
+    """
+    Records when the metrics for a course were last computed, and when they
+    were last viewed (so that the periodic refresh only recomputes metrics for
+    courses that instructors are looking at).
+    """
+    course_id = CourseKeyField(max_length=255, unique=True)
+
+    # When the summaries for the course were last computed; None if they never have been.
+    computed = models.DateTimeField(null=True, blank=True)
+    last_viewed = models.DateTimeField(db_index=True)
+
+    @classmethod
+    def record_view(cls, course_key):
+        """
+        Note that the metrics for ``course_key`` were viewed, and return the
+        CourseMetricsRefresh for the course.
+
+        ``last_viewed`` is only written once an hour, so that viewing the
+        metrics doesn't write to the database every time.
+        """
+        now = timezone.now()
+        refresh, created = cls.objects.get_or_create(course_id=course_key, defaults={'last_viewed': now})
+        if not created and refresh.last_viewed < now - timedelta(hours=1):
+            refresh.last_viewed = now
+            cls.objects.filter(pk=refresh.pk).update(last_viewed=now)
+        return refresh
+
+    def is_stale(self):
+        """
+        Return whether the metrics for this course are missing, or older than
+        settings.CLASS_DASHBOARD_METRICS_MAX_AGE seconds.
+        """
+        if self.computed is None:
+            return True
+        return self.computed < timezone.now() - timedelta(seconds=settings.CLASS_DASHBOARD_METRICS_MAX_AGE)
+
+    def __unicode__(self):
+        return u"CourseMetricsRefresh<{}: {}>".format(self.course_id, self.computed)
+
+
+class ProblemGradeSummary(models.Model):
+    """
+    The number of students with a given grade for a problem.
+    """
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    module_state_key = LocationKeyField(max_length=255)
+    grade = models.FloatField()
+    max_grade = models.FloatField(null=True)
+    count_grade = models.IntegerField()
+
+
+class SequentialOpenSummary(models.Model):
+    """
+    The number of students who have opened a subsection.
+    """
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    module_state_key = LocationKeyField(max_length=255)
+    count_sequential = models.IntegerField()
@@ -0,0 +1,38 @@
+"""
+Celery tasks that keep the precomputed class dashboard metrics up to date.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from opaque_keys.edx.keys import CourseKey
+
+from lms import CELERY_APP
+from class_dashboard import dashboard_data
+from class_dashboard.models import CourseMetricsRefresh
+
+log = logging.getLogger(__name__)
+
+
+@CELERY_APP.task(name='class_dashboard.tasks.refresh_course_metrics')
+def refresh_course_metrics(course_id):
+    """
+    Recompute the precomputed class dashboard metrics for `course_id`.
+    """
+    dashboard_data.refresh_course_metrics(CourseKey.from_string(course_id))
+
+
+@CELERY_APP.task(name='class_dashboard.tasks.refresh_stale_course_metrics')
+def refresh_stale_course_metrics():
+    """
+    Schedule a refresh of the metrics of each course whose metrics have been
+    viewed in the last settings.CLASS_DASHBOARD_METRICS_ACTIVE_DAYS days and are stale.
+
+    Run periodically by celerybeat.
+    """
+    recently_viewed = timezone.now() - timedelta(days=settings.CLASS_DASHBOARD_METRICS_ACTIVE_DAYS)
+    for refresh in CourseMetricsRefresh.objects.filter(last_viewed__gte=recently_viewed):
+        if refresh.is_stale():
+            log.info(u"Refreshing class dashboard metrics for %s", refresh.course_id)
+            dashboard_data.schedule_metrics_refresh(refresh.course_id)
@@ -21,7 +21,9 @@ from class_dashboard.dashboard_data import (
     get_d3_sequential_open_distrib, get_d3_section_grade_distrib,
     get_section_display_name, get_array_section_has_problem,
     get_students_opened_subsection, get_students_problem_grades,
+    refresh_course_metrics,
 )
+from class_dashboard.models import CourseMetricsRefresh
 from class_dashboard.views import has_instructor_access_for_class
 
 USER_COUNT = 11
@@ -323,3 +325,42 @@ class TestGetProblemGradeDistribution(SharedModuleStoreTestCase):
         """
         ret_val = bool(has_instructor_access_for_class(self.instructor, self.course.id))
         self.assertEquals(ret_val, True)
+
+
+@attr('shard_1')
+@patch.dict('django.conf.settings.FEATURES', {'CLASS_DASHBOARD_PRECOMPUTED_METRICS': True})
+class TestPrecomputedMetrics(TestGetProblemGradeDistribution):
+    """
+    Runs the dashboard_data tests against the precomputed metrics.
+    """
+    def setUp(self):
+        super(TestPrecomputedMetrics, self).setUp()
+        refresh_course_metrics(self.course.id)
+
+    def test_matches_live_metrics(self):
+        precomputed = (
+            get_problem_grade_distribution(self.course.id),
+            get_sequential_open_distrib(self.course.id),
+        )
+        with patch.dict('django.conf.settings.FEATURES', {'CLASS_DASHBOARD_PRECOMPUTED_METRICS': False}):
+            live = (
+                get_problem_grade_distribution(self.course.id),
+                get_sequential_open_distrib(self.course.id),
+            )
+        self.assertTrue(precomputed[1])
+        self.assertEquals(live, precomputed)
+
+    @patch('class_dashboard.tasks.refresh_course_metrics.delay')
+    def test_missing_metrics_are_scheduled(self, mock_refresh):
+        CourseMetricsRefresh.objects.all().delete()
+
+        # The live metrics are returned until the summaries have been computed.
+        sequential_open_distrib = get_sequential_open_distrib(self.course.id)
+        self.assertEquals(USER_COUNT, sequential_open_distrib.values()[0])
+        mock_refresh.assert_called_once_with(unicode(self.course.id))
+        self.assertIsNone(CourseMetricsRefresh.objects.get(course_id=self.course.id).computed)
+
+    @patch('class_dashboard.tasks.refresh_course_metrics.delay')
+    def test_fresh_metrics_are_not_refreshed(self, mock_refresh):
+        get_sequential_open_distrib(self.course.id)
+        self.assertFalse(mock_refresh.called)
@@ -23,7 +23,7 @@ from xmodule import graders
 from xmodule.graders import Score
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
-from .models import StudentModule
+from .models import ProblemAnswerCount, StudentModule
 from .module_render import get_module_for_descriptor
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import CourseKey
@@ -202,6 +202,22 @@ def field_data_cache_for_grading(course, user):
     )
 
 
+def scores_clients_for_students(course, students):
+    """
+    Return a ScoresClient for each of `students`, keyed by user id, with the
+    scores of their graded problems in `course` fetched in a single query.
+
+    Pass them to grade() to avoid a scores query for each student.
+    """
+    locations = [
+        descriptor.location
+        for sections in course.grading_context['graded_sections'].itervalues()
+        for section in sections
+        for descriptor in section['xmoduledescriptors']
+    ]
+    return ScoresClient.create_for_users(course.id, [student.id for student in students], locations)
+
+
 def answer_distributions(course_key):
     """
     Given a course_key, return answer distributions in the form of a dictionary
@@ -230,6 +246,9 @@ def answer_distributions(course_key):
     generate the report.
 
     This method will try to use a read-replica database if one is available.
+
+    If FEATURES['ENABLE_ANSWER_DISTRIBUTION_COUNTS'] is set, the distributions
+    are read from the precomputed ProblemAnswerCount table instead.
     """
     # dict: { module.module_state_key : (url_name, display_name) }
     state_keys_to_problem_info = {}  # For caching, used by url_and_display_name
@@ -252,6 +271,9 @@ def answer_distributions(course_key):
 
         return state_keys_to_problem_info[usage_key]
 
+    if settings.FEATURES.get('ENABLE_ANSWER_DISTRIBUTION_COUNTS'):
+        return _precomputed_answer_distributions(course_key, url_and_display_name)
+
     # Iterate through all problems submitted for this course in no particular
     # order, and build up our answer_counts dict that we will eventually return
     answer_counts = defaultdict(lambda: defaultdict(int))
@@ -295,6 +317,31 @@ def answer_distributions(course_key):
     return answer_counts
 
 
+def _precomputed_answer_distributions(course_key, url_and_display_name):
+    """
+    Return the answer distributions for `course_key` (in the format returned by
+    `answer_distributions`) from the ProblemAnswerCount table.
+
+    `url_and_display_name` returns the problem url_name and display_name for a
+    usage key.
+    """
+    answer_counts = defaultdict(lambda: defaultdict(int))
+    for problem_answer in ProblemAnswerCount.objects.filter(course_id=course_key).iterator():
+        try:
+            url, display_name = url_and_display_name(problem_answer.module_state_key.map_into_course(course_key))
+        except (ItemNotFoundError, InvalidKeyError):
+            log.warning(
+                u"Answer Distribution: Item %s in course %s not found; omitting its answer counts.",
+                problem_answer.module_state_key,
+                course_key,
+            )
+            continue
+
+        answer_counts[(url, display_name, problem_answer.answer_id)][problem_answer.answer] += problem_answer.count
+
+    return answer_counts
+
+
 @transaction.commit_manually
 def grade(student, request, course, keep_raw_scores=False, field_data_cache=None, scores_client=None):
     """
@@ -0,0 +1,133 @@
+"""
+Copy the XBlock user state stored in StudentModule into StudentCourseStateBlobs,
+for use by :class:`~courseware.user_state_blob_client.BlobXBlockUserStateClient`.
+
+Blocks whose state is larger than settings.USER_STATE_BLOB_MAX_BLOCK_BYTES are left
+in StudentModule and listed as overflow in the blob. Blocks of the types in
+settings.USER_STATE_BLOB_ROW_BLOCK_TYPES are always left in StudentModule.
+"""
+
+import calendar
+import itertools
+import logging
+from optparse import make_option
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey, UsageKey
+
+from courseware.models import StudentCourseStateBlob, StudentModule
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Copy StudentModule state into StudentCourseStateBlobs.
+    """
+    args = "<course_id course_id ...>"
+    help = "Copy the StudentModule user state for the specified courses into per-user state blobs."
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--overwrite',
+            action='store_true',
+            default=False,
+            help="Replace blobs that already exist, rather than skipping those users.",
+        ),
+        make_option(
+            '--batch',
+            type='int',
+            default=500,
+            help="Number of blobs to write in each bulk insert.",
+        ),
+    )
+
+    def handle(self, *args, **options):
+        if not args:
+            raise CommandError("At least one course id must be specified.")
+
+        try:
+            course_keys = [CourseKey.from_string(arg) for arg in args]
+        except InvalidKeyError:
+            raise CommandError("Invalid course id in {}".format(args))
+
+        for course_key in course_keys:
+            copied = copy_course_state(course_key, overwrite=options['overwrite'], batch_size=options['batch'])
+            log.info("Copied user state for %d users in %s", copied, course_key)
+
+
+def _student_modules(course_key):
+    """
+    Yield ``(student_id, module_state_key, state, modified)`` for each StudentModule
+    with state in ``course_key``, ordered by student.
+    """
+    return StudentModule.objects.filter(
+        course_id=course_key,
+        state__isnull=False,
+    ).order_by('student').values_list(
+        'student_id', 'module_state_key', 'state', 'modified'
+    ).iterator()
+
+
+def copy_course_state(course_key, overwrite=False, batch_size=500):
+    """
+    Build a StudentCourseStateBlob for each student with state in ``course_key``.
+
+    Returns the number of blobs written.
+    """
+    max_block_bytes = getattr(settings, 'USER_STATE_BLOB_MAX_BLOCK_BYTES', 64 * 1024)
+    row_block_types = getattr(settings, 'USER_STATE_BLOB_ROW_BLOCK_TYPES', ('problem',))
+    existing = set(
+        StudentCourseStateBlob.objects.filter(course_id=course_key).values_list('student_id', flat=True)
+    )
+    if overwrite and existing:
+        StudentCourseStateBlob.objects.filter(course_id=course_key).delete()
+        existing = set()
+
+    copied = 0
+    pending = []
+    for student_id, rows in itertools.groupby(_student_modules(course_key), lambda row: row[0]):
+        if student_id in existing:
+            continue
+
+        blocks = {}
+        overflow = set()
+        for _, module_state_key, state, modified in rows:
+            # values_list() returns the serialized key, not a UsageKey.
+            usage_key = UsageKey.from_string(module_state_key).map_into_course(course_key)
+            if usage_key.block_type in row_block_types:
+                continue
+
+            usage_key = unicode(usage_key)
+            if len(state) > max_block_bytes:
+                overflow.add(usage_key)
+                continue
+
+            state = json.loads(state)
+            # A state of "{}" means the state was deleted.
+            if state:
+                blocks[usage_key] = [state, calendar.timegm(modified.utctimetuple())]
+
+        pending.append(StudentCourseStateBlob(
+            student_id=student_id,
+            course_id=course_key,
+            version=1,
+            data=StudentCourseStateBlob.encode(blocks, overflow),
+        ))
+        if len(pending) >= batch_size:
+            StudentCourseStateBlob.objects.bulk_create(pending)
+            copied += len(pending)
+            pending = []
+
+    if pending:
+        StudentCourseStateBlob.objects.bulk_create(pending)
+        copied += len(pending)
+
+    return copied
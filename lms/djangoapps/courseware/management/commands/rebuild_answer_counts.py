@@ -0,0 +1,49 @@
+"""
+Rebuild the ProblemAnswerCounts used by `courseware.grades.answer_distributions`
+when FEATURES['ENABLE_ANSWER_DISTRIBUTION_COUNTS'] is set.
+"""
+
+import logging
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from courseware.models import ProblemAnswerCount
+from xmodule.modulestore.django import modulestore
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Rebuild answer counts for the specified courses, or for all courses.
+    """
+    args = "<course_id course_id ...>"
+    help = "Rebuild the answer distribution counts for the specified courses."
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--all',
+            action='store_true',
+            dest='all',
+            default=False,
+            help="Rebuild the answer counts for all courses.",
+        ),
+    )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            course_keys = [course.id for course in modulestore().get_courses()]
+        elif args:
+            try:
+                course_keys = [CourseKey.from_string(arg) for arg in args]
+            except InvalidKeyError:
+                raise CommandError("Invalid course id in {}".format(args))
+        else:
+            raise CommandError("Specify at least one course id, or --all.")
+
+        for course_key in course_keys:
+            count = ProblemAnswerCount.rebuild_for_course(course_key)
+            log.info("Rebuilt %d answer counts for %s", count, course_key)
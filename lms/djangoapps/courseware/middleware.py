@@ -6,6 +6,8 @@ from django.shortcuts import redirect
 from django.core.urlresolvers import reverse
 
 from courseware.courses import UserNotEnrolled
+from courseware.user_state_client import DEFERRED_WRITES_CACHE_NAME, flush_deferred_writes
+from request_cache import get_cache
 
 
 class RedirectUnenrolledMiddleware(object):
@@ -22,3 +24,21 @@ class RedirectUnenrolledMiddleware(object):
                     args=[course_key.to_deprecated_string()]
                 )
             )
+
+
+class UserStateWriteBehindMiddleware(object):
+    """
+    Write the user state that DjangoXBlockUserStateClient deferred during the
+    request once the view has finished.
+
+    This must come after TransactionMiddleware, so that the writes are made
+    inside the request's transaction.
+    """
+    def process_response(self, _request, response):
+        flush_deferred_writes()
+        return response
+
+    def process_exception(self, _request, _exception):
+        # The request's transaction is about to be rolled back, so drop the
+        # deferred writes along with everything else.
+        get_cache(DEFERRED_WRITES_CACHE_NAME).clear()
@@ -43,7 +43,7 @@ from xblock.exceptions import KeyValueMultiSaveError, InvalidScopeError
 from xblock.fields import Scope, UserScope
 from xmodule.modulestore.django import modulestore
 from xblock.core import XBlockAside
-from courseware.user_state_client import DjangoXBlockUserStateClient
+from courseware.user_state_client import get_user_state_client
 
 from openedx.core.djangoapps.call_stack_manager import donottrack
 
@@ -354,7 +354,7 @@ class UserStateCache(object):
         self._cache = defaultdict(dict)
         self.course_id = course_id
         self.user = user
-        self._client = DjangoXBlockUserStateClient(self.user)
+        self._client = get_user_state_client(self.user)
 
     def cache_fields(self, fields, xblocks, aside_types):  # pylint: disable=unused-argument
         """
@@ -990,6 +990,29 @@ class ScoresClient(object):
         client.fetch_scores(fd_cache.scorable_locations)
         return client
 
+    @classmethod
+    def create_for_users(cls, course_key, user_ids, locations):
+        """
+        Create a ScoresClient for each of `user_ids`, fetching the scores of
+        all of them with a single query.
+
+        Returns a dict of ScoresClients keyed by user id.
+        """
+        clients = {user_id: cls(course_key, user_id) for user_id in user_ids}
+        scores_qset = StudentModule.objects.filter(
+            student_id__in=clients.keys(),
+            course_id=course_key,
+            module_state_key__in=set(locations),
+        )
+        for user_id, location, correct, total in scores_qset.values_list(
+                'student_id', 'module_state_key', 'grade', 'max_grade'
+        ):
+            location = UsageKey.from_string(location).map_into_course(course_key)
+            clients[user_id]._locations_to_scores[location] = cls.Score(correct, total)  # pylint: disable=protected-access
+        for client in clients.itervalues():
+            client._has_fetched = True  # pylint: disable=protected-access
+        return clients
+
 
 # @contract(user_id=int, usage_key=UsageKey, score="number|None", max_score="number|None")
 @donottrack(StudentModule)
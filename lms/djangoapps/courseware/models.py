@@ -12,18 +12,23 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
+import base64
+import json
 import logging
 import itertools
+import zlib
+from collections import defaultdict
 
 from django.contrib.auth.models import User
 from django.conf import settings
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver, Signal
 
 from model_utils.models import TimeStampedModel
 from student.models import user_by_anonymous_id
 from submissions.models import score_set, score_reset
+from util.db import run_after_commit
 
 from openedx.core.djangoapps.call_stack_manager import CallStackManager, CallStackMixin
 from xmodule_django.models import CourseKeyField, LocationKeyField, BlockTypeKeyField  # pylint: disable=import-error
@@ -183,14 +188,107 @@ class StudentModuleHistory(CallStackMixin, models.Model):
         StudentModuleHistory entry if the module_type is one that
         we save.
         """
-        if instance.module_type in StudentModuleHistory.HISTORY_SAVING_TYPES:
-            history_entry = StudentModuleHistory(student_module=instance,
-                                                 version=None,
-                                                 created=instance.modified,
-                                                 state=instance.state,
-                                                 grade=instance.grade,
-                                                 max_grade=instance.max_grade)
-            history_entry.save()
+        StudentModuleHistory.save_history_entries([instance])
+
+    @classmethod
+    def save_history_entries(cls, student_modules):
+        """
+        Record the current state of each of ``student_modules`` whose
+        module_type is one that we save history for.
+
+        The entries are written with a single bulk insert, or handed off to
+        a celery task when FEATURES['ENABLE_ASYNC_STUDENT_MODULE_HISTORY'] is
+        set, so that the history write isn't made inside the request.
+
+        Arguments:
+            student_modules (list of :class:`StudentModule`): Saved modules
+                to record history for.
+        """
+        entries = [
+            {
+                'student_module_id': student_module.id,
+                'created': student_module.modified,
+                'state': student_module.state,
+                'grade': student_module.grade,
+                'max_grade': student_module.max_grade,
+            }
+            for student_module in student_modules
+            if student_module.module_type in cls.HISTORY_SAVING_TYPES
+        ]
+        if not entries:
+            return
+
+        if settings.FEATURES.get('ENABLE_ASYNC_STUDENT_MODULE_HISTORY'):
+            # Imported here to avoid a circular import between the models and the tasks.
+            from courseware.tasks import save_student_module_history
+            for entry in entries:
+                entry['created'] = entry['created'].isoformat()
+            save_student_module_history.delay(entries)
+        else:
+            cls.objects.bulk_create([cls(version=None, **entry) for entry in entries])
+
+
+class StudentCourseStateBlob(models.Model):
+    """
+    Stores all of a student's Scope.user_state data for one course as a single
+    compressed JSON document, so that it can be loaded with one query.
+
+    The document maps serialized usage keys to ``[state, modified]`` pairs, where
+    ``modified`` is a unix timestamp. Blocks whose state is too large to keep in
+    the document are stored as StudentModule rows instead, and listed under
+    ``overflow``.
+
+    ``version`` is incremented on every write. Writers lock the row while they
+    read and update it.
+    """
+    FORMAT_VERSION = 1
+
+    class Meta(object):
+        unique_together = (('student', 'course_id'),)
+
+    student = models.ForeignKey(User, db_index=True)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    version = models.PositiveIntegerField(default=0)
+
+    # Base64 encoded, zlib compressed JSON document.
+    data = models.TextField(blank=True, default='')
+
+    modified = models.DateTimeField(auto_now=True, db_index=True)
+
+    @classmethod
+    def encode(cls, blocks, overflow):
+        """
+        Return the serialized form of ``blocks`` and ``overflow``.
+
+        Arguments:
+            blocks (dict): Maps serialized usage keys to ``[state, modified]`` pairs.
+            overflow (set): Serialized usage keys whose state is stored in StudentModule.
+        """
+        document = json.dumps({
+            'format': cls.FORMAT_VERSION,
+            'blocks': blocks,
+            'overflow': sorted(overflow),
+        }, separators=(',', ':'))
+        return base64.b64encode(zlib.compress(document))
+
+    def decode(self):
+        """
+        Return ``(blocks, overflow)`` from the stored document (see :meth:`encode`).
+        """
+        if not self.data:
+            return {}, set()
+
+        document = json.loads(zlib.decompress(base64.b64decode(self.data)))
+        if document.get('format') != self.FORMAT_VERSION:
+            raise ValueError("Unknown StudentCourseStateBlob format {}".format(document.get('format')))
+        return document['blocks'], set(document['overflow'])
+
+    def __unicode__(self):
+        return u'StudentCourseStateBlob<{!r}>'.format({
+            'student_id': self.student_id,  # pylint: disable=no-member
+            'course_id': self.course_id,
+            'version': self.version,
+        })
 
 
 class XBlockFieldBase(models.Model):
@@ -310,6 +408,140 @@ class StudentFieldOverride(TimeStampedModel):
     value = models.TextField(default='null')
 
 
+class ProblemAnswerCount(models.Model):
+    """
+    The number of students whose submitted answer to a part of a capa problem
+    is a given value, as reported by `courseware.grades.answer_distributions`.
+
+    The counts are updated with the change in a student's submitted answers
+    whenever their state for a problem is saved or deleted (see
+    :meth:`update_for_states`), and can be rebuilt for a whole course from the
+    state of all of its students with the `rebuild_answer_counts` management
+    command.
+    """
+    objects = ChunkingManager()
+
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    module_state_key = LocationKeyField(max_length=255, db_index=True)
+
+    # The ID of the problem part, as stored in the problem's student_answers
+    answer_id = models.CharField(max_length=255)
+    answer = models.TextField()
+    count = models.IntegerField(default=0)
+
+    modified = models.DateTimeField(auto_now=True)
+
+    @staticmethod
+    def _count_answers(states):
+        """
+        Return a dict mapping ``(answer_id, answer)`` to the number of the serialized
+        problem ``states`` that contain that answer.
+        """
+        counts = defaultdict(int)
+        for state in states:
+            try:
+                raw_answers = json.loads(state).get("student_answers", {}) if state else {}
+            except ValueError:
+                continue
+
+            for answer_id, raw_answer in raw_answers.items():
+                counts[(answer_id, unicode(raw_answer))] += 1
+        return counts
+
+    @classmethod
+    def _build(cls, course_key, usage_key, states):
+        """
+        Return unsaved ProblemAnswerCounts for ``usage_key`` counted from ``states``.
+        """
+        return [
+            cls(
+                course_id=course_key,
+                module_state_key=usage_key,
+                answer_id=answer_id,
+                answer=answer,
+                count=count,
+            )
+            for (answer_id, answer), count in cls._count_answers(states).iteritems()
+        ]
+
+    @classmethod
+    def update_for_states(cls, course_key, usage_key, old_states, new_states):
+        """
+        Update the counts for ``usage_key`` with the change in answers from the
+        serialized problem ``old_states`` of some students to their ``new_states``.
+
+        The counts are changed once the current transaction is committed, in a
+        short transaction of their own, so that the rows of popular answers
+        aren't locked while the rest of the request runs.
+        """
+        deltas = cls._count_answers(new_states)
+        for key, count in cls._count_answers(old_states).iteritems():
+            deltas[key] -= count
+        deltas = {key: delta for key, delta in deltas.iteritems() if delta}
+        if deltas:
+            run_after_commit(cls._apply_deltas_in_transaction, course_key, usage_key, deltas)
+
+    @classmethod
+    def _apply_deltas_in_transaction(cls, course_key, usage_key, deltas):
+        """
+        Apply ``deltas`` in the current transaction if there is one, or else in
+        a new one.
+        """
+        if transaction.is_managed():
+            cls.apply_deltas(course_key, usage_key, deltas)
+        else:
+            with transaction.commit_on_success():
+                cls.apply_deltas(course_key, usage_key, deltas)
+
+    @classmethod
+    def apply_deltas(cls, course_key, usage_key, deltas):
+        """
+        Add ``deltas``, a dict mapping ``(answer_id, answer)`` to a change in the
+        number of students, to the counts for ``usage_key``. Counts that drop to
+        zero are deleted.
+        """
+        for (answer_id, answer), delta in deltas.iteritems():
+            counts = cls.objects.filter(
+                course_id=course_key, module_state_key=usage_key, answer_id=answer_id, answer=answer,
+            )
+            if counts.update(count=models.F('count') + delta):
+                if delta < 0:
+                    counts.filter(count__lte=0).delete()
+            elif delta > 0:
+                cls.objects.create(
+                    course_id=course_key, module_state_key=usage_key, answer_id=answer_id, answer=answer, count=delta,
+                )
+
+    @classmethod
+    def rebuild_for_course(cls, course_key, batch_size=1000):
+        """
+        Replace the counts for every problem in ``course_key``, reading the state of
+        all submitted problems in the course in one pass.
+        """
+        rows = StudentModule.all_submitted_problems_read_only(course_key).order_by(
+            'module_state_key'
+        ).values_list('module_state_key', 'state').iterator()
+
+        answer_counts = []
+        for module_state_key, problem_rows in itertools.groupby(rows, lambda row: row[0]):
+            answer_counts.extend(cls._build(course_key, module_state_key, (state for _, state in problem_rows)))
+
+        with transaction.commit_on_success():
+            cls.objects.filter(course_id=course_key).delete()
+            for start in xrange(0, len(answer_counts), batch_size):
+                cls.objects.bulk_create(answer_counts[start:start + batch_size])
+
+        return len(answer_counts)
+
+    def __unicode__(self):
+        return u'ProblemAnswerCount<{!r}>'.format({
+            'module_state_key': self.module_state_key,
+            'answer_id': self.answer_id,
+            'answer': self.answer[:20],
+            'count': self.count,
+        })
+
+
 # Signal that indicates that a user's score for a problem has been updated.
 # This signal is generated when a scoring event occurs either within the core
 # platform or in the Submissions module. Note that this signal will be triggered
@@ -406,3 +638,63 @@ def submissions_score_reset_handler(sender, **kwargs):  # pylint: disable=unused
             u"Failed to process score_reset signal from Submissions API. "
             "user: %s, course_id: %s, usage_id: %s", user, course_id, usage_id
         )
+
+
+def _counted_state(student_module):
+    """
+    Return the state of ``student_module`` that its answers are counted from: its
+    state once the problem has been submitted, and None before then.
+    """
+    return student_module.state if student_module.grade is not None else None
+
+
+def update_answer_counts(student_module, deleted=False):
+    """
+    Update the answer counts for the change in the submitted answers of
+    ``student_module``, a capa problem's state, since it was loaded or last
+    counted, when FEATURES['ENABLE_ANSWER_DISTRIBUTION_COUNTS'] is set.
+
+    This is called whenever problem state is saved or deleted, including by
+    instructors resetting the attempts of students or deleting their state,
+    and must be called by code that writes it with queryset updates.
+    """
+    if student_module.module_type != 'problem':
+        return
+
+    old_state = student_module._counted_answers_state  # pylint: disable=protected-access
+    new_state = None if deleted else _counted_state(student_module)
+    student_module._counted_answers_state = new_state  # pylint: disable=protected-access
+
+    if old_state != new_state and settings.FEATURES.get('ENABLE_ANSWER_DISTRIBUTION_COUNTS'):
+        ProblemAnswerCount.update_for_states(
+            student_module.course_id,
+            student_module.module_state_key,
+            [old_state] if old_state is not None else [],
+            [new_state] if new_state is not None else [],
+        )
+
+
+@receiver(post_init, sender=StudentModule)
+def answer_counts_student_module_init_handler(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Record the state that the answers of a loaded capa problem state are counted from.
+    """
+    if instance.module_type == 'problem':
+        counted_state = _counted_state(instance) if instance.pk is not None else None
+        instance._counted_answers_state = counted_state  # pylint: disable=protected-access
+
+
+@receiver(post_save, sender=StudentModule)
+def answer_counts_student_module_save_handler(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Update the answer counts of a capa problem whose student state was saved.
+    """
+    update_answer_counts(instance)
+
+
+@receiver(post_delete, sender=StudentModule)
+def answer_counts_student_module_delete_handler(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Update the answer counts of a capa problem whose student state was deleted.
+    """
+    update_answer_counts(instance, deleted=True)
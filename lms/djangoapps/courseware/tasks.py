@@ -0,0 +1,46 @@
+"""
+Asynchronous tasks for the courseware app.
+"""
+
+import logging
+
+from dateutil.parser import parse as parse_datetime
+from django.conf import settings
+from django.db import IntegrityError
+
+from lms import CELERY_APP
+
+from courseware.models import StudentModuleHistory
+
+log = logging.getLogger("edx.courseware")
+
+
+@CELERY_APP.task(
+    name='courseware.tasks.save_student_module_history',
+    default_retry_delay=settings.STUDENT_MODULE_HISTORY_TASK_RETRY_DELAY,
+    max_retries=settings.STUDENT_MODULE_HISTORY_TASK_MAX_RETRIES,
+)
+def save_student_module_history(entries):
+    """
+    Write a batch of StudentModuleHistory rows.
+
+    Arguments:
+        entries (list of dict): Field values for each history entry, as built by
+            :meth:`StudentModuleHistory.save_history_entries`, with ``created``
+            serialized as an ISO 8601 string.
+    """
+    history_entries = []
+    for entry in entries:
+        entry = dict(entry, created=parse_datetime(entry['created']))
+        history_entries.append(StudentModuleHistory(version=None, **entry))
+
+    try:
+        StudentModuleHistory.objects.bulk_create(history_entries)
+    except IntegrityError as exc:
+        # The StudentModule rows may have been created in a request transaction
+        # that hasn't been committed yet, so try again a little later.
+        log.warning(
+            "Failed to save %d StudentModuleHistory entries, retrying: %s",
+            len(history_entries), exc
+        )
+        raise save_student_module_history.retry(args=[entries], exc=exc)
@@ -19,8 +19,9 @@ from capa.tests.response_xml_factory import (
     CodeResponseXMLFactory,
 )
 from courseware import grades
-from courseware.models import StudentModule, StudentModuleHistory
+from courseware.models import ProblemAnswerCount, StudentModule, StudentModuleHistory
 from courseware.tests.helpers import LoginEnrollmentTestCase
+from instructor.enrollment import reset_student_attempts
 from lms.djangoapps.lms_xblock.runtime import quote_slashes
 from student.tests.factories import UserFactory
 from student.models import anonymous_id_for_user
@@ -1171,6 +1172,58 @@ class TestAnswerDistributions(TestSubmittingProblems):
             )
 
 
+@attr('shard_1')
+@patch.dict('django.conf.settings.FEATURES', {'ENABLE_ANSWER_DISTRIBUTION_COUNTS': True})
+class TestPrecomputedAnswerDistributions(TestSubmittingProblems):
+    """Check that answer distributions can be served from ProblemAnswerCounts."""
+
+    def setUp(self):
+        """Set up a simple course with two problems."""
+        super(TestPrecomputedAnswerDistributions, self).setUp()
+
+        self.homework = self.add_graded_section_to_course('homework')
+        self.p1_html_id = self.add_dropdown_to_section(self.homework.location, 'p1', 1).location.html_id()
+        self.p2_html_id = self.add_dropdown_to_section(self.homework.location, 'p2', 1).location.html_id()
+        self.refresh_course()
+
+    def test_submissions_update_counts(self):
+        self.submit_question_answer('p1', {'2_1': u'Incorrect'})
+        self.submit_question_answer('p2', {'2_1': u'Incorrect'})
+        self.submit_question_answer('p1', {'2_1': u'Correct'})
+
+        self.assertEqual(
+            grades.answer_distributions(self.course.id),
+            {
+                ('p1', 'p1', '{}_2_1'.format(self.p1_html_id)): {
+                    'Correct': 1
+                },
+                ('p2', 'p2', '{}_2_1'.format(self.p2_html_id)): {
+                    'Incorrect': 1
+                },
+            }
+        )
+        # The count of the answer that was replaced is deleted once it drops to zero.
+        self.assertFalse(ProblemAnswerCount.objects.filter(
+            module_state_key=self.problem_location('p1'), answer=u'Incorrect',
+        ).exists())
+
+    def test_reset_updates_counts(self):
+        self.submit_question_answer('p1', {'2_1': u'Correct'})
+        self.assertEqual(len(grades.answer_distributions(self.course.id)), 1)
+
+        reset_student_attempts(self.course.id, self.student_user, self.problem_location('p1'), delete_module=True)
+        self.assertEqual(grades.answer_distributions(self.course.id), {})
+
+    def test_rebuild_matches_scan(self):
+        self.submit_question_answer('p1', {'2_1': u'Correct'})
+        self.submit_question_answer('p2', {'2_1': u'ⓤⓝⓘⓒⓞⓓⓔ'})
+
+        self.assertEqual(ProblemAnswerCount.rebuild_for_course(self.course.id), 2)
+        precomputed = grades.answer_distributions(self.course.id)
+        with patch.dict('django.conf.settings.FEATURES', {'ENABLE_ANSWER_DISTRIBUTION_COUNTS': False}):
+            self.assertEqual(precomputed, grades.answer_distributions(self.course.id))
+
+
 @attr('shard_1')
 class TestConditionalContent(TestSubmittingProblems):
     """
@@ -0,0 +1,148 @@
+"""
+Tests of the BlobXBlockUserStateClient.
+"""
+
+from collections import defaultdict
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from opaque_keys.edx.locator import CourseLocator
+
+from edx_user_state_client.tests import (
+    UserStateClientTestBase, _UserStateClientTestCRUD, _UserStateClientTestIterAll
+)
+from courseware.models import StudentCourseStateBlob, StudentModule
+from courseware.management.commands.copy_user_state_to_blobs import copy_course_state
+from courseware.tests.factories import StudentModuleFactory, UserFactory
+from courseware.user_state_blob_client import BlobXBlockUserStateClient
+from courseware.user_state_client import get_user_state_client
+
+
+class TestBlobUserStateClientRows(UserStateClientTestBase, TestCase):
+    """
+    Black-box tests of the BlobXBlockUserStateClient for the block types whose
+    state, and its history, it stores in StudentModule rows.
+    """
+    __test__ = True
+
+    def _user(self, user_idx):
+        return self.users[user_idx].username
+
+    def _block_type(self, block):  # pylint: disable=unused-argument
+        return 'problem'
+
+    def setUp(self):
+        super(TestBlobUserStateClientRows, self).setUp()
+        self.client = BlobXBlockUserStateClient()
+        self.users = defaultdict(UserFactory.create)
+
+
+class TestBlobUserStateClientBlobs(_UserStateClientTestCRUD, _UserStateClientTestIterAll, TestCase):
+    """
+    Black-box tests of the BlobXBlockUserStateClient for the block types whose
+    state it stores in blobs. History isn't kept for those.
+    """
+    __test__ = True
+
+    def _user(self, user_idx):
+        return self.users[user_idx].username
+
+    def _block_type(self, block):  # pylint: disable=unused-argument
+        return 'html'
+
+    def setUp(self):
+        super(TestBlobUserStateClientBlobs, self).setUp()
+        self.client = BlobXBlockUserStateClient()
+        self.users = defaultdict(UserFactory.create)
+
+
+class TestBlobXBlockUserStateClient(TestCase):
+    """
+    Tests of the BlobXBlockUserStateClient.
+    """
+    def setUp(self):
+        super(TestBlobXBlockUserStateClient, self).setUp()
+        self.user = UserFactory.create()
+        self.client = BlobXBlockUserStateClient(self.user)
+        self.course_key = CourseLocator('org', 'course', 'run')
+        self.block_keys = [self.course_key.make_usage_key('html', 'html_{}'.format(i)) for i in range(3)]
+
+    def _get_states(self, block_keys, fields=None):
+        """
+        Return a dict mapping block keys to the state stored for them.
+        """
+        return {
+            user_state.block_key: user_state.state
+            for user_state in self.client.get_many(self.user.username, block_keys, fields=fields)
+        }
+
+    def test_set_and_get_many(self):
+        self.client.set_many(self.user.username, {
+            self.block_keys[0]: {'a': 1},
+            self.block_keys[1]: {'b': 2},
+        })
+        self.client.set_many(self.user.username, {self.block_keys[0]: {'c': 3}})
+
+        with self.assertNumQueries(1):
+            states = self._get_states(self.block_keys)
+        self.assertEqual(states, {self.block_keys[0]: {'a': 1, 'c': 3}, self.block_keys[1]: {'b': 2}})
+        self.assertEqual(self._get_states(self.block_keys[:1], fields=['c']), {self.block_keys[0]: {'c': 3}})
+        self.assertEqual(StudentCourseStateBlob.objects.get(student=self.user).version, 2)
+
+    def test_problem_state_stays_in_rows(self):
+        problem_key = self.course_key.make_usage_key('problem', 'problem')
+        self.client.set_many(self.user.username, {problem_key: {'attempts': 1}, self.block_keys[0]: {'a': 1}})
+
+        self.assertEqual(StudentModule.objects.get(student=self.user).module_state_key, problem_key)
+        self.assertEqual(self._get_states([problem_key]), {problem_key: {'attempts': 1}})
+        self.assertEqual(len(list(self.client.get_history(self.user.username, problem_key))), 1)
+
+    @override_settings(USER_STATE_CLIENT_CLASS='courseware.user_state_blob_client.BlobXBlockUserStateClient')
+    def test_get_user_state_client(self):
+        client = get_user_state_client(self.user)
+        self.assertIsInstance(client, BlobXBlockUserStateClient)
+        self.assertEqual(client.user, self.user)
+
+    def test_delete_many(self):
+        self.client.set_many(self.user.username, {
+            self.block_keys[0]: {'a': 1, 'b': 2},
+            self.block_keys[1]: {'c': 3},
+        })
+        self.client.delete_many(self.user.username, self.block_keys[:1], fields=['a'])
+        self.client.delete_many(self.user.username, self.block_keys[1:2])
+
+        self.assertEqual(self._get_states(self.block_keys), {self.block_keys[0]: {'b': 2}})
+
+    @override_settings(USER_STATE_BLOB_MAX_BLOCK_BYTES=20)
+    def test_large_state_overflows_into_rows(self):
+        large_state = {'answer': 'x' * 50}
+        self.client.set_many(self.user.username, {
+            self.block_keys[0]: large_state,
+            self.block_keys[1]: {'a': 1},
+        })
+
+        self.assertEqual(StudentModule.objects.filter(student=self.user).count(), 1)
+        self.assertEqual(self._get_states(self.block_keys), {self.block_keys[0]: large_state, self.block_keys[1]: {'a': 1}})
+
+    def test_iter_all_for_course(self):
+        other_user = UserFactory.create()
+        self.client.set_many(self.user.username, {self.block_keys[0]: {'a': 1}})
+        BlobXBlockUserStateClient(other_user).set_many(other_user.username, {self.block_keys[0]: {'a': 2}})
+
+        states = sorted(
+            (user_state.username, user_state.state['a'])
+            for user_state in self.client.iter_all_for_course(self.course_key, batch_size=1)
+        )
+        self.assertEqual(states, [(self.user.username, 1), (other_user.username, 2)])
+
+    def test_copy_course_state(self):
+        StudentModuleFactory.create(
+            student=self.user,
+            course_id=self.course_key,
+            module_state_key=self.block_keys[0],
+            state='{"a": 1}',
+        )
+        self.assertEqual(copy_course_state(self.course_key), 1)
+        self.assertEqual(self._get_states(self.block_keys), {self.block_keys[0]: {'a': 1}})
+        # Users that already have a blob are skipped.
+        self.assertEqual(copy_course_state(self.course_key), 0)
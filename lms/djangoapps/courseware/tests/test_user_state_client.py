@@ -4,13 +4,18 @@ defined in edx_user_state_client.
 """
 
 from collections import defaultdict
-from unittest import skip
+import json
 
 from django.test import TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+from opaque_keys.edx.locator import CourseLocator
 
 from edx_user_state_client.tests import UserStateClientTestBase
-from courseware.user_state_client import DjangoXBlockUserStateClient
+from courseware.models import StudentModule
+from courseware.user_state_client import DjangoXBlockUserStateClient, flush_deferred_writes
 from courseware.tests.factories import UserFactory
+from request_cache.middleware import RequestCache
 
 
 class TestDjangoUserStateClient(UserStateClientTestBase, TestCase):
@@ -32,36 +37,67 @@ class TestDjangoUserStateClient(UserStateClientTestBase, TestCase):
         self.client = DjangoXBlockUserStateClient()
         self.users = defaultdict(UserFactory.create)
 
-    # We're skipping these tests because the iter_all_by_block and iter_all_by_course
-    # are not implemented in the DjangoXBlockUserStateClient
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_deleted_block(self):
-        pass
 
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_empty(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_many_users(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_single_user(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_deleted_block(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_empty(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_single_user(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_many_users(self):
-        pass
+@override_settings(USER_STATE_WRITE_BEHIND_BLOCK_TYPES=('video',))
+class TestDjangoUserStateClientWriteBehind(TestCase):
+    """
+    Tests of the deferred writes made by DjangoXBlockUserStateClient.
+    """
+    def setUp(self):
+        super(TestDjangoUserStateClientWriteBehind, self).setUp()
+        self.user = UserFactory.create()
+        self.client = DjangoXBlockUserStateClient(self.user)
+        self.course_key = CourseLocator('org', 'course', 'run')
+        self.video_key = self.course_key.make_usage_key('video', 'video')
+        self.problem_key = self.course_key.make_usage_key('problem', 'problem')
+
+        RequestCache.clear_request_cache()
+        RequestCache.get_request_cache().request = RequestFactory().get('/')
+        self.addCleanup(RequestCache.clear_request_cache)
+
+    def _student_modules(self, usage_key):
+        """
+        Return the StudentModules stored for `usage_key`.
+        """
+        return StudentModule.objects.filter(student=self.user, module_state_key=usage_key)
+
+    def test_writes_are_deferred_and_coalesced(self):
+        self.client.set_many(self.user.username, {self.video_key: {'position': 1}})
+        self.client.set_many(self.user.username, {self.video_key: {'position': 2, 'speed': 1.5}})
+        self.assertFalse(self._student_modules(self.video_key).exists())
+
+        with self.assertNumQueries(2):
+            flush_deferred_writes()
+
+        student_module = self._student_modules(self.video_key).get()
+        self.assertEqual(json.loads(student_module.state), {'position': 2, 'speed': 1.5})
+
+    def test_flush_updates_existing_state(self):
+        StudentModule.objects.create(
+            student=self.user,
+            course_id=self.course_key,
+            module_state_key=self.video_key,
+            module_type='video',
+            state=json.dumps({'position': 1, 'saved': True}),
+        )
+        self.client.set_many(self.user.username, {self.video_key: {'position': 3}})
+        flush_deferred_writes()
+
+        student_module = self._student_modules(self.video_key).get()
+        self.assertEqual(json.loads(student_module.state), {'position': 3, 'saved': True})
+
+    def test_other_block_types_written_immediately(self):
+        self.client.set_many(self.user.username, {self.problem_key: {'attempts': 1}})
+        self.assertTrue(self._student_modules(self.problem_key).exists())
+
+    def test_reads_see_deferred_writes(self):
+        self.client.set_many(self.user.username, {self.video_key: {'position': 4}})
+        self.assertEqual(
+            self.client.get(self.user.username, self.video_key).state,
+            {'position': 4}
+        )
+
+    def test_writes_not_deferred_outside_request(self):
+        RequestCache.clear_request_cache()
+        self.client.set_many(self.user.username, {self.video_key: {'position': 5}})
+        self.assertTrue(self._student_modules(self.video_key).exists())
@@ -0,0 +1,437 @@
+"""
+An implementation of :class:`XBlockUserStateClient` which stores all of a user's
+XBlock Scope.user_state data for a course in a single compressed document
+(:class:`~courseware.models.StudentCourseStateBlob`), so that the state for a whole
+course can be read with one query.
+
+Blocks whose state is larger than settings.USER_STATE_BLOB_MAX_BLOCK_BYTES, and
+blocks of the types in settings.USER_STATE_BLOB_ROW_BLOCK_TYPES, are stored as
+StudentModule rows by :class:`~courseware.user_state_client.DjangoXBlockUserStateClient`
+instead.
+
+Enable it by setting settings.USER_STATE_CLIENT_CLASS to
+``'courseware.user_state_blob_client.BlobXBlockUserStateClient'``.
+"""
+
+import itertools
+from datetime import datetime
+from operator import attrgetter
+from time import time
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from opaque_keys.edx.keys import UsageKey
+from pytz import UTC
+from xblock.fields import Scope
+from edx_user_state_client.interface import XBlockUserStateClient, XBlockUserState
+
+from courseware.models import StudentCourseStateBlob
+from courseware.user_state_client import DjangoXBlockUserStateClient
+
+
+def _by_course(block_keys):
+    """
+    Group ``block_keys`` by course, yielding ``(course_key, [usage_key, ...])``.
+    """
+    course_key_func = attrgetter('course_key')
+    for course_key, usage_keys in itertools.groupby(sorted(block_keys, key=course_key_func), course_key_func):
+        yield course_key, list(usage_keys)
+
+
+class BlobXBlockUserStateClient(XBlockUserStateClient):
+    """
+    An XBlockUserStateClient that stores each user's state for a course in a
+    :class:`~courseware.models.StudentCourseStateBlob`.
+
+    History is only kept for the state of blocks stored in StudentModule rows,
+    which includes every block of the types in settings.USER_STATE_BLOB_ROW_BLOCK_TYPES.
+    """
+
+    class ServiceUnavailable(XBlockUserStateClient.ServiceUnavailable):
+        """
+        This error is raised if the service backing this client is currently unavailable.
+        """
+        pass
+
+    class PermissionDenied(XBlockUserStateClient.PermissionDenied):
+        """
+        This error is raised if the caller is not allowed to access the requested data.
+        """
+        pass
+
+    class DoesNotExist(XBlockUserStateClient.DoesNotExist):
+        """
+        This error is raised if the caller has requested data that does not exist.
+        """
+        pass
+
+    def __init__(self, user=None):
+        """
+        Arguments:
+            user (:class:`~User`): An already-loaded django user. If this user matches the username
+                supplied to `set_many`, then that will reduce the number of queries made to store
+                the user state.
+        """
+        self.user = user
+        self._row_client = DjangoXBlockUserStateClient(user)
+
+    @property
+    def max_block_bytes(self):
+        """
+        The size of serialized state above which a block is stored as a StudentModule row.
+        """
+        return getattr(settings, 'USER_STATE_BLOB_MAX_BLOCK_BYTES', 64 * 1024)
+
+    @property
+    def row_block_types(self):
+        """
+        The block types whose state is always stored as StudentModule rows.
+        """
+        return getattr(settings, 'USER_STATE_BLOB_ROW_BLOCK_TYPES', ('problem',))
+
+    def _split_by_storage(self, block_keys):
+        """
+        Return ``(blob_keys, row_keys)``, splitting ``block_keys`` by whether their type
+        is stored in the blob or always in StudentModule rows.
+        """
+        blob_keys, row_keys = [], []
+        for block_key in block_keys:
+            if block_key.block_type in self.row_block_types:
+                row_keys.append(block_key)
+            else:
+                blob_keys.append(block_key)
+        return blob_keys, row_keys
+
+    def _get_user(self, username):
+        """
+        Return the :class:`~User` for ``username``, re-using the already-loaded
+        user if it matches.
+        """
+        if self.user is not None and self.user.username == username:
+            return self.user
+        else:
+            return User.objects.get(username=username)
+
+    def _get_blob(self, username, course_key, for_update=False):
+        """
+        Return the StudentCourseStateBlob for ``username`` in ``course_key``, or None.
+
+        If ``for_update`` is True, the row is locked until the current transaction ends.
+        """
+        blobs = StudentCourseStateBlob.objects
+        if for_update:
+            blobs = blobs.select_for_update()
+        try:
+            return blobs.get(student__username=username, course_id=course_key)
+        except StudentCourseStateBlob.DoesNotExist:
+            return None
+
+    def _update_blob(self, username, course_key, update_func):
+        """
+        Apply ``update_func(blocks, overflow)`` to the contents of the blob for ``username``
+        in ``course_key`` and store the result.
+
+        The blob row is locked while it is read and written, so that concurrent writers
+        for the same user and course wait for each other rather than overwrite each
+        other's changes. ``update_func`` modifies ``blocks`` and ``overflow`` in place,
+        and returns whether anything was changed; it may be called more than once.
+        """
+        blob = self._get_blob(username, course_key, for_update=True)
+        if blob is None:
+            blocks, overflow = {}, set()
+            if not update_func(blocks, overflow):
+                return
+
+            savepoint = transaction.savepoint()
+            try:
+                StudentCourseStateBlob.objects.create(
+                    student=self._get_user(username),
+                    course_id=course_key,
+                    version=1,
+                    data=StudentCourseStateBlob.encode(blocks, overflow),
+                )
+            except IntegrityError:
+                # Another writer created the blob first, so update theirs.
+                transaction.savepoint_rollback(savepoint)
+                blob = self._get_blob(username, course_key, for_update=True)
+            else:
+                transaction.savepoint_commit(savepoint)
+                return
+
+        blocks, overflow = blob.decode()
+        if not update_func(blocks, overflow):
+            # Release the lock if no transaction is managing it.
+            transaction.commit_unless_managed()
+            return
+
+        StudentCourseStateBlob.objects.filter(pk=blob.pk).update(
+            data=StudentCourseStateBlob.encode(blocks, overflow),
+            version=F('version') + 1,
+            modified=timezone.now(),
+        )
+
+    @staticmethod
+    def _filter_fields(state, fields):
+        """
+        Return the items of ``state`` named in ``fields``, or all of them if ``fields`` is None.
+        """
+        if fields is None:
+            return state
+        return {field: state[field] for field in fields if field in state}
+
+    def get_many(self, username, block_keys, scope=Scope.user_state, fields=None):
+        """
+        Retrieve the stored XBlock state for the specified XBlock usages.
+
+        Arguments:
+            username: The name of the user whose state should be retrieved
+            block_keys ([UsageKey]): A list of UsageKeys identifying which xblock states to load.
+            scope (Scope): The scope to load data from
+            fields: A list of field values to retrieve. If None, retrieve all stored fields.
+
+        Yields:
+            XBlockUserState tuples for each specified UsageKey in block_keys.
+            field_state is a dict mapping field names to values.
+        """
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported, not {}".format(scope))
+
+        block_keys, overflow_keys = self._split_by_storage(block_keys)
+        for course_key, usage_keys in _by_course(block_keys):
+            blob = self._get_blob(username, course_key)
+            if blob is None:
+                continue
+
+            blocks, overflow = blob.decode()
+            for usage_key in usage_keys:
+                serialized_key = unicode(usage_key)
+                if serialized_key in overflow:
+                    overflow_keys.append(usage_key)
+                elif serialized_key in blocks:
+                    state, modified = blocks[serialized_key]
+                    yield XBlockUserState(
+                        username,
+                        usage_key,
+                        self._filter_fields(state, fields),
+                        datetime.fromtimestamp(modified, UTC),
+                        scope,
+                    )
+
+        if overflow_keys:
+            for user_state in self._row_client.get_many(username, overflow_keys, scope, fields):
+                yield user_state
+
+    def set_many(self, username, block_keys_to_state, scope=Scope.user_state):
+        """
+        Set fields for a particular XBlock.
+
+        Arguments:
+            username: The name of the user whose state should be retrieved
+            block_keys_to_state (dict): A dict mapping UsageKeys to state dicts.
+                Each state dict maps field names to values. These state dicts
+                are overlaid over the stored state. To delete fields, use
+                :meth:`delete` or :meth:`delete_many`.
+            scope (Scope): The scope to load data from
+        """
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported")
+
+        block_keys, row_keys = self._split_by_storage(block_keys_to_state.keys())
+        if row_keys:
+            self._row_client.set_many(
+                username, {usage_key: block_keys_to_state[usage_key] for usage_key in row_keys}, scope
+            )
+
+        for course_key, usage_keys in _by_course(block_keys):
+            row_writes = {}
+
+            def _overlay(blocks, overflow):
+                """
+                Overlay the new state on ``blocks``, moving blocks that grow too large into ``overflow``.
+                """
+                row_writes.clear()
+                modified = time()
+                for usage_key in usage_keys:
+                    serialized_key = unicode(usage_key)
+                    state = block_keys_to_state[usage_key]
+                    if serialized_key in overflow:
+                        row_writes[usage_key] = state
+                        continue
+
+                    current_state = dict(blocks.get(serialized_key, [{}])[0])
+                    current_state.update(state)
+                    if len(json.dumps(current_state)) > self.max_block_bytes:
+                        row_writes[usage_key] = current_state
+                        blocks.pop(serialized_key, None)
+                        overflow.add(serialized_key)
+                    else:
+                        blocks[serialized_key] = [current_state, modified]
+                return True
+
+            self._update_blob(username, course_key, _overlay)
+            if row_writes:
+                self._row_client.set_many(username, row_writes, scope)
+
+    def delete_many(self, username, block_keys, scope=Scope.user_state, fields=None):
+        """
+        Delete the stored XBlock state for a many xblock usages.
+
+        Arguments:
+            username: The name of the user whose state should be deleted
+            block_keys (list): The UsageKey identifying which xblock state to delete.
+            scope (Scope): The scope to delete data from
+            fields: A list of fields to delete. If None, delete all stored fields.
+        """
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported")
+
+        block_keys, row_keys = self._split_by_storage(block_keys)
+        if row_keys:
+            self._row_client.delete_many(username, row_keys, scope, fields)
+
+        for course_key, usage_keys in _by_course(block_keys):
+            row_deletes = []
+
+            def _delete(blocks, overflow):
+                """
+                Remove the deleted fields from ``blocks``, returning whether any were found.
+                """
+                del row_deletes[:]
+                changed = False
+                for usage_key in usage_keys:
+                    serialized_key = unicode(usage_key)
+                    if serialized_key in overflow:
+                        row_deletes.append(usage_key)
+                    elif serialized_key in blocks:
+                        changed = True
+                        if fields is None:
+                            del blocks[serialized_key]
+                        else:
+                            state = blocks[serialized_key][0]
+                            for field in fields:
+                                state.pop(field, None)
+                            if not state:
+                                # Like a StudentModule with a state of "{}", the block no longer has state.
+                                del blocks[serialized_key]
+                return changed
+
+            self._update_blob(username, course_key, _delete)
+            if row_deletes:
+                self._row_client.delete_many(username, row_deletes, scope, fields)
+
+    def get_history(self, username, block_key, scope=Scope.user_state):
+        """
+        Retrieve history of state changes for a given block for a given
+        student. History is only available for blocks whose state overflowed
+        into StudentModule rows.
+
+        If the specified block doesn't exist, raise :class:`~DoesNotExist`.
+
+        Arguments:
+            username: The name of the user whose history should be retrieved.
+            block_key: The key identifying which xblock history to retrieve.
+            scope (Scope): The scope to load data from.
+
+        Yields:
+            XBlockUserState entries for each modification to the specified XBlock, from latest
+            to earliest.
+        """
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported")
+
+        if block_key.block_type not in self.row_block_types:
+            blob = self._get_blob(username, block_key.course_key)
+            if blob is None or unicode(block_key) not in blob.decode()[1]:
+                raise self.DoesNotExist()
+
+        try:
+            for user_state in self._row_client.get_history(username, block_key, scope):
+                yield user_state
+        except self._row_client.DoesNotExist:
+            raise self.DoesNotExist()
+
+    def _iter_blobs(self, course_key, batch_size=None):
+        """
+        Yield ``(username, blocks, overflow)`` for each blob stored for ``course_key``,
+        loading ``batch_size`` blobs at a time.
+        """
+        batch_size = batch_size or 1000
+        last_id = 0
+        while True:
+            blobs = list(
+                StudentCourseStateBlob.objects.filter(
+                    course_id=course_key, id__gt=last_id
+                ).select_related('student').order_by('id')[:batch_size]
+            )
+            if not blobs:
+                return
+
+            for blob in blobs:
+                blocks, overflow = blob.decode()
+                yield blob.student.username, blocks, overflow
+            last_id = blobs[-1].id
+
+    def iter_all_for_block(self, block_key, scope=Scope.user_state, batch_size=None):
+        """
+        You get no ordering guarantees. Fetching will happen in batch_size
+        increments. If you're using this method, you should be running in an
+        async task.
+        """
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported")
+
+        if block_key.block_type in self.row_block_types:
+            for user_state in self._row_client.iter_all_for_block(block_key, scope, batch_size):
+                yield user_state
+            return
+
+        serialized_key = unicode(block_key)
+        for username, blocks, overflow in self._iter_blobs(block_key.course_key, batch_size):
+            if serialized_key in overflow:
+                for user_state in self._row_client.get_many(username, [block_key], scope):
+                    yield user_state
+            elif serialized_key in blocks:
+                state, modified = blocks[serialized_key]
+                yield XBlockUserState(username, block_key, state, datetime.fromtimestamp(modified, UTC), scope)
+
+    def iter_all_for_course(self, course_key, block_type=None, scope=Scope.user_state, batch_size=None):
+        """
+        You get no ordering guarantees. Fetching will happen in batch_size
+        increments. If you're using this method, you should be running in an
+        async task.
+        """
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported")
+
+        for username, blocks, overflow in self._iter_blobs(course_key, batch_size):
+            for serialized_key, (state, modified) in blocks.iteritems():
+                usage_key = UsageKey.from_string(serialized_key).map_into_course(course_key)
+                if block_type is not None and usage_key.block_type != block_type:
+                    continue
+                yield XBlockUserState(username, usage_key, state, datetime.fromtimestamp(modified, UTC), scope)
+
+            overflow_keys = [
+                UsageKey.from_string(serialized_key).map_into_course(course_key)
+                for serialized_key in overflow
+            ]
+            overflow_keys = [
+                usage_key for usage_key in overflow_keys
+                if (block_type is None or usage_key.block_type == block_type) and
+                usage_key.block_type not in self.row_block_types
+            ]
+            if overflow_keys:
+                for user_state in self._row_client.get_many(username, overflow_keys, scope):
+                    yield user_state
+
+        for row_block_type in self.row_block_types:
+            if block_type is None or block_type == row_block_type:
+                for user_state in self._row_client.iter_all_for_course(course_key, row_block_type, scope, batch_size):
+                    yield user_state
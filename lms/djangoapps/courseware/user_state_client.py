@@ -3,6 +3,7 @@ An implementation of :class:`XBlockUserStateClient`, which stores XBlock Scope.u
 data in a Django ORM model.
 """
 
+from importlib import import_module
 import itertools
 from operator import attrgetter
 from time import time
@@ -13,12 +14,48 @@ except ImportError:
     import json
 
 import dogstats_wrapper as dog_stats_api
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.utils import timezone
+from opaque_keys.edx.keys import UsageKey
 from xblock.fields import Scope, ScopeBase
-from courseware.models import StudentModule, StudentModuleHistory
+from courseware.models import StudentModule, StudentModuleHistory, update_answer_counts
 from edx_user_state_client.interface import XBlockUserStateClient, XBlockUserState
 
 from openedx.core.djangoapps.call_stack_manager import donottrack
+from request_cache import get_cache, get_request
+
+# Name of the request cache that holds user state writes which have been
+# deferred until the end of the current request.
+DEFERRED_WRITES_CACHE_NAME = 'courseware.user_state_client.deferred_writes'
+
+
+def get_user_state_client(user=None):
+    """
+    Return an instance of the XBlockUserStateClient named by settings.USER_STATE_CLIENT_CLASS.
+
+    Arguments:
+        user (:class:`~User`): An already-loaded django user, passed on to the client.
+    """
+    module_name, __, class_name = getattr(
+        settings, 'USER_STATE_CLIENT_CLASS', 'courseware.user_state_client.DjangoXBlockUserStateClient'
+    ).rpartition('.')
+    return getattr(import_module(module_name), class_name)(user)
+
+
+def flush_deferred_writes():
+    """
+    Write all user state that was deferred by :meth:`DjangoXBlockUserStateClient.set_many`
+    during the current request.
+
+    This is called by :class:`courseware.middleware.UserStateWriteBehindMiddleware`
+    at the end of each request.
+    """
+    deferred_writes = get_cache(DEFERRED_WRITES_CACHE_NAME)
+    for username in deferred_writes.keys():
+        user, _ = deferred_writes[username]
+        DjangoXBlockUserStateClient(user).flush_deferred_writes(username)
 
 
 class DjangoXBlockUserStateClient(XBlockUserStateClient):
@@ -137,6 +174,8 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported, not {}".format(scope))
 
+        self.flush_deferred_writes(username)
+
         block_count = state_length = 0
         evt_time = time()
 
@@ -171,11 +210,154 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         # Remove it once we're no longer interested in the data.
         self._ddog_histogram(evt_time, 'get_many.blks_out', block_count)
 
+    def _get_user(self, username):
+        """
+        Return the :class:`~User` for ``username``, re-using the already-loaded
+        user if it matches.
+        """
+        if self.user is not None and self.user.username == username:
+            return self.user
+        else:
+            return User.objects.get(username=username)
+
+    @staticmethod
+    def _is_write_behind(usage_key):
+        """
+        Return whether writes to the state of ``usage_key`` can be deferred until
+        the end of the current request.
+
+        Only block types listed in settings.USER_STATE_WRITE_BEHIND_BLOCK_TYPES are
+        deferred, and only while a request is being processed (so that management
+        commands and celery tasks always write immediately).
+        """
+        write_behind_block_types = getattr(settings, 'USER_STATE_WRITE_BEHIND_BLOCK_TYPES', ())
+        return usage_key.block_type in write_behind_block_types and get_request() is not None
+
+    def _defer_writes(self, username, block_keys_to_state):
+        """
+        Add ``block_keys_to_state`` to the writes that will be made for ``username``
+        at the end of the request, coalescing them with any writes already pending
+        for the same blocks.
+        """
+        deferred_writes = get_cache(DEFERRED_WRITES_CACHE_NAME)
+        user, pending = deferred_writes.setdefault(username, (self.user, {}))
+        if user is None and self.user is not None:
+            deferred_writes[username] = (self.user, pending)
+
+        for usage_key, state in block_keys_to_state.items():
+            pending.setdefault(usage_key, {}).update(state)
+
+        self._ddog_histogram(time(), 'set_many.blks_deferred', len(block_keys_to_state))
+
+    def flush_deferred_writes(self, username):
+        """
+        Write all state deferred for ``username`` during this request.
+
+        Rows that already exist are updated in place, and missing rows are
+        created with a single bulk insert. Readers call this first, so that
+        they always see the deferred state.
+        """
+        deferred_writes = get_cache(DEFERRED_WRITES_CACHE_NAME)
+        if username not in deferred_writes:
+            return
+
+        _, pending = deferred_writes.pop(username)
+        if pending:
+            self._write_batch(username, pending)
+
+    def _write_batch(self, username, block_keys_to_state):
+        """
+        Overlay ``block_keys_to_state`` on the stored state using as few queries as
+        possible: one select for the existing rows, one update per existing row
+        and a single bulk insert for the new rows.
+
+        Only the ``state`` and ``modified`` columns of existing rows are written, so
+        that a grade saved earlier in the request isn't overwritten.
+        """
+        user = self._get_user(username)
+        evt_time = time()
+        now = timezone.now()
+
+        existing = {
+            usage_key: student_module
+            for student_module, usage_key
+            in self._get_student_modules(username, block_keys_to_state.keys())
+        }
+
+        updated_modules = []
+        new_modules = []
+        for usage_key, state in block_keys_to_state.items():
+            student_module = existing.get(usage_key)
+            if student_module is None:
+                new_modules.append(StudentModule(
+                    student=user,
+                    course_id=usage_key.course_key,
+                    module_state_key=usage_key,
+                    module_type=usage_key.block_type,
+                    state=json.dumps(state),
+                ))
+                continue
+
+            if student_module.state is None:
+                current_state = {}
+            else:
+                current_state = json.loads(student_module.state)
+            current_state.update(state)
+            student_module.state = json.dumps(current_state)
+            student_module.modified = now
+            StudentModule.objects.filter(pk=student_module.pk).update(
+                state=student_module.state,
+                modified=now,
+            )
+            # The update doesn't send post_save, which counts the answers otherwise.
+            update_answer_counts(student_module)
+            updated_modules.append(student_module)
+
+        if new_modules:
+            try:
+                StudentModule.objects.bulk_create(new_modules)
+            except IntegrityError:
+                # Another request created some of these rows since we looked for them,
+                # so fall back to writing the new rows one at a time.
+                self._set_many_individually(
+                    user,
+                    {
+                        student_module.module_state_key: block_keys_to_state[student_module.module_state_key]
+                        for student_module in new_modules
+                    },
+                    evt_time,
+                )
+                new_modules = []
+            else:
+                # bulk_create doesn't set primary keys, so reload any new rows that
+                # we need to record history for.
+                history_keys = [
+                    student_module.module_state_key
+                    for student_module in new_modules
+                    if student_module.module_type in StudentModuleHistory.HISTORY_SAVING_TYPES
+                ]
+                new_modules = [
+                    student_module
+                    for student_module, _ in self._get_student_modules(username, history_keys)
+                ]
+
+        # Neither queryset updates nor bulk inserts send post_save, so record
+        # history for the whole batch here.
+        StudentModuleHistory.save_history_entries(updated_modules + new_modules)
+
+        self._ddog_increment(evt_time, 'set_many.batch_flushed')
+        self._ddog_histogram(evt_time, 'set_many.batch_blks_updated', len(updated_modules))
+        self._ddog_histogram(evt_time, 'set_many.batch_blks_created', len(block_keys_to_state) - len(updated_modules))
+
     @donottrack(StudentModule, StudentModuleHistory)
     def set_many(self, username, block_keys_to_state, scope=Scope.user_state):
         """
         Set fields for a particular XBlock.
 
+        Writes to the block types listed in settings.USER_STATE_WRITE_BEHIND_BLOCK_TYPES
+        are coalesced and deferred until the end of the current request (see
+        :func:`flush_deferred_writes`).
+
         Arguments:
             username: The name of the user whose state should be retrieved
             block_keys_to_state (dict): A dict mapping UsageKeys to state dicts.
@@ -187,17 +369,39 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
 
+        deferred = {
+            usage_key: state
+            for usage_key, state in block_keys_to_state.items()
+            if self._is_write_behind(usage_key)
+        }
+        if deferred:
+            self._defer_writes(username, deferred)
+            block_keys_to_state = {
+                usage_key: state
+                for usage_key, state in block_keys_to_state.items()
+                if usage_key not in deferred
+            }
+            if not block_keys_to_state:
+                return
+
         # We do a find_or_create for every block (rather than re-using field objects
         # that were queried in get_many) so that if the score has
         # been changed by some other piece of the code, we don't overwrite
         # that score.
-        if self.user is not None and self.user.username == username:
-            user = self.user
-        else:
-            user = User.objects.get(username=username)
+        user = self._get_user(username)
 
         evt_time = time()
 
+        self._set_many_individually(user, block_keys_to_state, evt_time)
+
+        # Event for the entire set_many call.
+        self._ddog_histogram(evt_time, 'set_many.blks_updated', len(block_keys_to_state))
+
+    def _set_many_individually(self, user, block_keys_to_state, evt_time):
+        """
+        Overlay ``block_keys_to_state`` on the stored state of ``user`` with a
+        get_or_create and save for each block.
+        """
         for usage_key, state in block_keys_to_state.items():
             student_module, created = StudentModule.objects.get_or_create(
                 student=user,
@@ -243,9 +447,6 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
             num_fields_updated = max(0, len(state) - num_new_fields_set)
             self._ddog_histogram(evt_time, 'set_many.fields_updated', num_fields_updated)
 
-        # Event for the entire set_many call.
-        self._ddog_histogram(evt_time, 'set_many.blks_updated', len(block_keys_to_state))
-
     @donottrack(StudentModule, StudentModuleHistory)
     def delete_many(self, username, block_keys, scope=Scope.user_state, fields=None):
         """
@@ -260,6 +461,8 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
 
+        self.flush_deferred_writes(username)
+
         evt_time = time()
         if fields is None:
             self._ddog_increment(evt_time, 'delete_many.empty_state')
@@ -303,6 +506,9 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
 
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
+
+        self.flush_deferred_writes(username)
+
         student_modules = list(
             student_module
             for student_module, usage_id
@@ -338,24 +544,119 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
 
             yield XBlockUserState(username, block_key, state, history_entry.created, scope)
 
+    # Number of rows fetched per query by the iter_all_* methods.
+    DEFAULT_ITER_BATCH_SIZE = 1000
+
+    def _iter_state_rows(self, batch_size, order_field, **filters):
+        """
+        Yield ``(username, module_state_key, state, modified)`` tuples for the
+        StudentModules matching ``filters``, without constructing model instances.
+
+        Rows are fetched ``batch_size`` at a time using keyset pagination on
+        ``order_field`` (which must be unique within ``filters``), so that each
+        query is an index range scan, and memory use doesn't grow with the number
+        of rows. The read replica is used if one is configured.
+
+        ``module_state_key`` is the serialized key, and ``state`` is the undecoded
+        JSON, which is None or "{}" for rows that have no state, or whose state has
+        been deleted.
+        """
+        batch_size = batch_size or self.DEFAULT_ITER_BATCH_SIZE
+        queryset = StudentModule.objects.filter(**filters)
+        if "read_replica" in settings.DATABASES:
+            queryset = queryset.using("read_replica")
+
+        last_value = None
+        while True:
+            batch = queryset
+            if last_value is not None:
+                batch = batch.filter(**{order_field + '__gt': last_value})
+            rows = list(batch.order_by(order_field).values_list(
+                order_field, 'student__username', 'module_state_key', 'state', 'modified'
+            )[:batch_size])
+
+            for _, username, module_state_key, state, modified in rows:
+                yield username, module_state_key, state, modified
+
+            if len(rows) < batch_size:
+                return
+            last_value = rows[-1][0]
+
+    @staticmethod
+    def _decode_state(state, fields=None):
+        """
+        Decode the JSON ``state``, keeping only the keys in ``fields`` (or all of them if
+        ``fields`` is None). Returns None if there is no state, or no keys remain.
+        """
+        if state is None:
+            return None
+        state = json.loads(state)
+        if fields is not None:
+            state = {field: state[field] for field in fields if field in state}
+        return state or None
+
+    def iter_raw_state_for_block(self, block_key, batch_size=None):
+        """
+        Yield ``(username, state)`` for every user who has state for ``block_key``,
+        ordered by user, where ``state`` is the undecoded JSON string.
+
+        This is meant for reports that export the stored state as-is, and so don't
+        need to pay for decoding it. Users who have a row but no state (such as those
+        who have only viewed a problem) are included, with a ``state`` of None or "{}".
+        """
+        rows = self._iter_state_rows(
+            batch_size,
+            'student',
+            course_id=block_key.course_key,
+            module_state_key=block_key,
+        )
+        for username, _, state, _ in rows:
+            yield username, state
+
     @donottrack(StudentModule, StudentModuleHistory)
-    def iter_all_for_block(self, block_key, scope=Scope.user_state, batch_size=None):
+    def iter_all_for_block(self, block_key, scope=Scope.user_state, batch_size=None, fields=None):
         """
         You get no ordering guarantees. Fetching will happen in batch_size
         increments. If you're using this method, you should be running in an
         async task.
+
+        If ``fields`` is specified, only those fields are returned, and users who
+        have none of them are skipped.
         """
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
-        raise NotImplementedError()
+
+        rows = self._iter_state_rows(
+            batch_size,
+            'student',
+            course_id=block_key.course_key,
+            module_state_key=block_key,
+        )
+        for username, _, state, modified in rows:
+            state = self._decode_state(state, fields)
+            if state is not None:
+                yield XBlockUserState(username, block_key, state, modified, scope)
 
     @donottrack(StudentModule, StudentModuleHistory)
-    def iter_all_for_course(self, course_key, block_type=None, scope=Scope.user_state, batch_size=None):
+    def iter_all_for_course(self, course_key, block_type=None, scope=Scope.user_state, batch_size=None, fields=None):
         """
         You get no ordering guarantees. Fetching will happen in batch_size
         increments. If you're using this method, you should be running in an
         async task.
+
+        If ``fields`` is specified, only those fields are returned, and blocks
+        that have none of them are skipped.
         """
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
-        raise NotImplementedError()
+
+        filters = {'course_id': course_key}
+        if block_type is not None:
+            filters['module_type'] = block_type
+
+        for username, module_state_key, state, modified in self._iter_state_rows(batch_size, 'id', **filters):
+            state = self._decode_state(state, fields)
+            if state is not None:
+                # values_list() returns the serialized key, not a UsageKey.
+                block_key = UsageKey.from_string(module_state_key).map_into_course(course_key)
+                yield XBlockUserState(username, block_key, state, modified, scope)
@@ -52,7 +52,7 @@ from .entrance_exams import (
     user_must_complete_entrance_exam,
     user_has_passed_entrance_exam
 )
-from courseware.user_state_client import DjangoXBlockUserStateClient
+from courseware.user_state_client import get_user_state_client
 from course_modes.models import CourseMode
 
 from open_ended_grading import open_ended_notifications
@@ -1110,10 +1110,10 @@ def submission_history(request, course_id, student_username, location):
     if (student_username != request.user.username) and (not staff_access):
         raise PermissionDenied
 
-    user_state_client = DjangoXBlockUserStateClient()
+    user_state_client = get_user_state_client()
     try:
         history_entries = list(user_state_client.get_history(student_username, usage_key))
-    except DjangoXBlockUserStateClient.DoesNotExist:
+    except user_state_client.DoesNotExist:
         return HttpResponse(escape(_(u'User {username} has never accessed problem {location}').format(
             username=student_username,
             location=location
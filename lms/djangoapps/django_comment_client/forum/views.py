@@ -304,23 +304,29 @@ def single_thread(request, course_key, discussion_id, thread_id):
     course = get_course_with_access(request.user, 'load', course_key, check_if_enrolled=True)
     course_settings = make_course_settings(course, request.user)
     cc_user = cc.User.from_django_user(request.user)
-    user_info = cc_user.to_dict()
     is_moderator = has_permission(request.user, "see_all_cohorts", course_key)
 
     # Currently, the front end always loads responses via AJAX, even for this
     # page; it would be a nice optimization to avoid that extra round trip to
     # the comments service.
-    try:
-        thread = cc.Thread.find(thread_id).retrieve(
-            recursive=request.is_ajax(),
-            user_id=request.user.id,
-            response_skip=request.GET.get("resp_skip"),
-            response_limit=request.GET.get("resp_limit")
-        )
-    except cc.utils.CommentClientRequestError as e:
-        if e.status_code == 404:
-            raise Http404
-        raise
+    retrieve_kwargs = {
+        'recursive': request.is_ajax(),
+        'user_id': request.user.id,
+        'response_skip': request.GET.get("resp_skip"),
+        'response_limit': request.GET.get("resp_limit"),
+    }
+
+    def retrieve_thread():
+        """Retrieve the thread, raising Http404 if it doesn't exist."""
+        try:
+            return cc.Thread.find(thread_id).retrieve(**retrieve_kwargs)
+        except cc.utils.CommentClientRequestError as e:
+            if e.status_code == 404:
+                raise Http404
+            raise
+
+    # The user and the thread don't depend on each other, so retrieve them at the same time.
+    user_info, thread = cc.utils.run_concurrently(cc_user.to_dict, retrieve_thread)
 
     # Verify that the student has access to this thread if belongs to a course discussion module
     thread_context = getattr(thread, "context", "course")
@@ -430,10 +436,12 @@ def user_profile(request, course_key, user_id):
         else:
             profiled_user = cc.User(id=user_id, course_id=course_key)
 
-        threads, page, num_pages = profiled_user.active_threads(query_params)
+        (threads, page, num_pages), user_info = cc.utils.run_concurrently(
+            lambda: profiled_user.active_threads(query_params),
+            cc.User.from_django_user(request.user).to_dict,
+        )
         query_params['page'] = page
         query_params['num_pages'] = num_pages
-        user_info = cc.User.from_django_user(request.user).to_dict()
 
         with newrelic.agent.FunctionTrace(nr_transaction, "get_metadata_for_threads"):
             annotated_content_info = utils.get_metadata_for_threads(course_key, threads, request.user, user_info)
@@ -13,7 +13,11 @@ from django_comment_common.models import all_permissions_for_user_in_course
 from teams.models import CourseTeam
 
 
-def has_permission(user, permission, course_id=None):
+def get_user_permissions(user, course_id=None):
+    """
+    Returns the set of the names of the permissions that the user's roles
+    give them in the course, which is cached for the request.
+    """
     assert isinstance(course_id, (NoneType, CourseKey))
     request_cache_dict = RequestCache.get_request_cache().data
     cache_key = "django_comment_client.permissions.has_permission.all_permissions.{}.{}".format(
@@ -25,7 +29,11 @@ def has_permission(user, permission, course_id=None):
         all_permissions = all_permissions_for_user_in_course(user, course_id)
         request_cache_dict[cache_key] = all_permissions
 
-    return permission in all_permissions
+    return all_permissions
+
+
+def has_permission(user, permission, course_id=None):
+    return permission in get_user_permissions(user, course_id)
 
 
 CONDITIONS = ['is_open', 'is_author', 'is_question_author', 'is_team_member_if_applicable']
@@ -111,19 +119,30 @@ def _check_condition(user, condition, content):
     return handlers[condition](user, content)
 
 
-def _check_conditions_permissions(user, permissions, course_id, content):
+def _check_conditions_permissions(user, permissions, course_id, content, user_permissions=None, condition_results=None):
     """
     Accepts a list of permissions and proceed if any of the permission is valid.
     Note that ["can_view", "can_edit"] will proceed if the user has either
     "can_view" or "can_edit" permission. To use AND operator in between, wrap them in
     a list.
+
+    `user_permissions` are the permissions of the user in the course, as
+    returned by get_user_permissions, and `condition_results` is a dict in
+    which the results of the conditions for the content are kept, so that
+    checking several permissions of the same content looks them up once.
     """
+    if user_permissions is None:
+        user_permissions = get_user_permissions(user, course_id)
+    if condition_results is None:
+        condition_results = {}
 
     def test(user, per, operator="or"):
         if isinstance(per, basestring):
             if per in CONDITIONS:
-                return _check_condition(user, per, content)
-            return has_permission(user, per, course_id=course_id)
+                if per not in condition_results:
+                    condition_results[per] = _check_condition(user, per, content)
+                return condition_results[per]
+            return per in user_permissions
         elif isinstance(per, list) and operator in ["and", "or"]:
             results = [test(user, x, operator="and") for x in per]
             if operator == "or":
@@ -162,10 +181,10 @@ VIEW_PERMISSIONS = {
 }
 
 
-def check_permissions_by_view(user, course_id, content, name):
+def check_permissions_by_view(user, course_id, content, name, user_permissions=None, condition_results=None):
     assert isinstance(course_id, CourseKey)
     try:
         p = VIEW_PERMISSIONS[name]
     except KeyError:
         logging.warning("Permission for view named %s does not exist in permissions.py", name)
-    return _check_conditions_permissions(user, p, course_id, content)
+    return _check_conditions_permissions(user, p, course_id, content, user_permissions, condition_results)
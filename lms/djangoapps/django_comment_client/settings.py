@@ -3,8 +3,12 @@ from django.conf import settings
 MAX_COMMENT_DEPTH = None
 MAX_UPLOAD_FILE_SIZE = 1024 * 1024   # result in bytes
 ALLOWED_UPLOAD_FILE_TYPES = ('.jpg', '.jpeg', '.gif', '.bmp', '.png', '.tiff')
+DISCUSSION_MODULES_CACHE_TIMEOUT = 60 * 60 * 24  # 1 day
 
 if hasattr(settings, 'DISCUSSION_SETTINGS'):
     MAX_COMMENT_DEPTH = settings.DISCUSSION_SETTINGS.get('MAX_COMMENT_DEPTH')
     MAX_UPLOAD_FILE_SIZE = settings.DISCUSSION_SETTINGS.get('MAX_UPLOAD_FILE_SIZE') or MAX_UPLOAD_FILE_SIZE
     ALLOWED_UPLOAD_FILE_TYPES = settings.DISCUSSION_SETTINGS.get('ALLOWED_UPLOAD_FILE_TYPES') or ALLOWED_UPLOAD_FILE_TYPES
+    DISCUSSION_MODULES_CACHE_TIMEOUT = settings.DISCUSSION_SETTINGS.get(
+        'DISCUSSION_MODULES_CACHE_TIMEOUT', DISCUSSION_MODULES_CACHE_TIMEOUT
+    )
@@ -11,6 +11,7 @@ from django.test import TestCase, RequestFactory
 from edxmako import add_lookup
 
 from django_comment_client.tests.factories import RoleFactory
+from django_comment_common.models import all_permissions_for_user_in_course
 from django_comment_client.tests.unicode import UnicodeTestMixin
 import django_comment_client.utils as utils
 
@@ -22,7 +23,8 @@ from openedx.core.djangoapps.course_groups.tests.helpers import config_course_co
 from student.tests.factories import UserFactory, AdminFactory, CourseEnrollmentFactory
 from openedx.core.djangoapps.content.course_structures.models import CourseStructure
 from openedx.core.djangoapps.util.testing import ContentGroupTestCase
-from student.roles import CourseStaffRole
+from request_cache.middleware import RequestCache
+from student.roles import CourseBetaTesterRole, CourseStaffRole
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase, TEST_DATA_MIXED_TOY_MODULESTORE
 from xmodule.modulestore.django import modulestore
@@ -108,6 +110,75 @@ class AccessUtilsTestCase(ModuleStoreTestCase):
         self.assertFalse(ret)
 
 
+@attr('shard_1')
+class GetMetadataForThreadsTestCase(ModuleStoreTestCase):
+    """
+    Tests of the annotation of threads and their comments with the user's
+    votes, subscriptions and abilities.
+    """
+    def setUp(self):
+        super(GetMetadataForThreadsTestCase, self).setUp(create_user=False)
+        RequestCache.clear_request_cache()
+        self.course = CourseFactory.create()
+        self.student = UserFactory.create()
+        student_role = RoleFactory(name='Student', course_id=self.course.id)
+        for permission in ['create_comment', 'create_sub_comment', 'vote', 'update_thread', 'update_comment']:
+            student_role.add_permission(permission)
+        student_role.users.add(self.student)
+
+    def make_content(self, content_id, content_type, user_id, children=()):
+        """Return comments service content with `content_id`, as returned for a thread page."""
+        return {
+            'id': content_id,
+            'type': content_type,
+            'user_id': str(user_id),
+            'closed': False,
+            'commentable_id': 'test_commentable',
+            'thread_type': 'discussion',
+            'children': list(children),
+        }
+
+    def test_threads_and_comments(self):
+        comment = self.make_content('comment', 'comment', self.student.id)
+        threads = [
+            self.make_content('own_thread', 'thread', self.student.id, children=[comment]),
+            self.make_content('other_thread', 'thread', self.student.id + 1),
+        ]
+        user_info = {'upvoted_ids': ['comment'], 'downvoted_ids': [], 'subscribed_thread_ids': ['other_thread']}
+
+        with mock.patch(
+            'django_comment_client.permissions.all_permissions_for_user_in_course',
+            wraps=all_permissions_for_user_in_course,
+        ) as mock_all_permissions:
+            metadata = utils.get_metadata_for_threads(self.course.id, threads, self.student, user_info)
+        self.assertEqual(mock_all_permissions.call_count, 1)
+
+        self.assertEqual(set(metadata), {'own_thread', 'comment', 'other_thread'})
+        self.assertEqual(metadata['comment']['voted'], 'up')
+        self.assertTrue(metadata['other_thread']['subscribed'])
+        self.assertEqual(metadata['own_thread']['ability'], {
+            'editable': True,
+            'can_reply': True,
+            'can_delete': True,
+            'can_openclose': False,
+            'can_vote': True,
+        })
+        self.assertEqual(metadata['other_thread']['ability'], {
+            'editable': False,
+            'can_reply': True,
+            'can_delete': False,
+            'can_openclose': False,
+            'can_vote': True,
+        })
+        self.assertEqual(metadata['comment']['ability'], {
+            'editable': True,
+            'can_reply': True,
+            'can_delete': True,
+            'can_openclose': False,
+            'can_vote': True,
+        })
+
+
 @attr('shard_1')
 class CoursewareContextTestCase(ModuleStoreTestCase):
     """
@@ -895,6 +966,60 @@ class CategoryMapTestCase(CategoryMapTestMixin, ModuleStoreTestCase):
         )
 
 
+@attr('shard_1')
+@mock.patch('django_comment_client.utils.DISCUSSION_MODULES_CACHE_TIMEOUT', 60)
+@mock.patch.dict("django.conf.settings.FEATURES", {"DISABLE_START_DATES": False})
+class DiscussionModulesCacheTestCase(ModuleStoreTestCase):
+    """
+    Tests of the cached metadata of the discussion modules of a course.
+    """
+    def setUp(self):
+        super(DiscussionModulesCacheTestCase, self).setUp(create_user=True)
+        self.course = CourseFactory.create(start=datetime.datetime(2012, 2, 3, tzinfo=UTC))
+        self.student = UserFactory.create()
+        self.create_discussion("public", start=datetime.datetime(2012, 2, 3, tzinfo=UTC))
+        self.create_discussion("staff_only", visible_to_staff_only=True)
+        self.create_discussion("unstarted", start=datetime.datetime(2030, 1, 1, tzinfo=UTC))
+
+    def create_discussion(self, discussion_id, **kwargs):
+        """Create a discussion module with `discussion_id` in the course."""
+        ItemFactory.create(
+            parent_location=self.course.location,
+            category="discussion",
+            discussion_id=discussion_id,
+            discussion_category="Chapter",
+            discussion_target=discussion_id,
+            **kwargs
+        )
+
+    def get_discussion_ids(self, user):
+        """Return the ids of the inline discussions in the latest version of the course that `user` can access."""
+        course = modulestore().get_course(self.course.id)
+        return [
+            discussion_id for discussion_id in utils.get_discussion_categories_ids(course, user)
+            if discussion_id not in course.top_level_discussion_topic_ids
+        ]
+
+    def test_cached_for_course_version(self):
+        self.assertItemsEqual(self.get_discussion_ids(self.student), ["public"])
+
+        with mock.patch.object(modulestore(), 'get_items') as mock_get_items:
+            self.assertItemsEqual(self.get_discussion_ids(self.student), ["public"])
+            # Global staff can access all of them.
+            self.assertItemsEqual(self.get_discussion_ids(self.user), ["public", "staff_only", "unstarted"])
+        self.assertFalse(mock_get_items.called)
+
+        self.create_discussion("new")
+        self.assertItemsEqual(self.get_discussion_ids(self.student), ["public", "new"])
+
+    def test_beta_tester(self):
+        self.create_discussion("beta", start=datetime.datetime(2030, 1, 1, tzinfo=UTC), days_early_for_beta=365 * 100)
+        beta_tester = UserFactory.create()
+        CourseBetaTesterRole(self.course.id).add_users(beta_tester)
+        self.assertItemsEqual(self.get_discussion_ids(self.student), ["public"])
+        self.assertItemsEqual(self.get_discussion_ids(beta_tester), ["public", "beta"])
+
+
 @attr('shard_1')
 class ContentGroupCategoryMapTestCase(CategoryMapTestMixin, ContentGroupTestCase):
     """
@@ -5,7 +5,8 @@ import logging
 from django.conf import settings
 
 import pytz
-from django.contrib.auth.models import User
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.db import connection
 from django.http import HttpResponse
@@ -17,12 +18,13 @@ from xmodule.modulestore.django import modulestore
 from ccx.overrides import get_current_ccx
 
 from django_comment_common.models import Role, FORUM_ROLE_STUDENT
-from django_comment_client.permissions import check_permissions_by_view, has_permission, get_team
-from django_comment_client.settings import MAX_COMMENT_DEPTH
+from django_comment_client.permissions import check_permissions_by_view, get_team, get_user_permissions, has_permission
+from django_comment_client.settings import DISCUSSION_MODULES_CACHE_TIMEOUT, MAX_COMMENT_DEPTH
 from edxmako import lookup_template
 
 from courseware import courses
 from courseware.access import has_access
+from courseware.access_utils import check_start_date
 from openedx.core.djangoapps.content.course_structures.models import CourseStructure
 from openedx.core.djangoapps.course_groups.cohorts import (
     get_course_cohort_settings, get_cohort_by_id, get_cohort_id, is_course_cohorted
@@ -137,6 +139,79 @@ def get_accessible_discussion_modules(course, user, include_all=False):  # pylin
     ]
 
 
+def _get_discussion_module_infos(course):
+    """
+    Return a list of dicts with the metadata of all valid discussion modules
+    in this course which doesn't depend on the user.
+
+    The list is cached for each published version of the course, so that the
+    discussion modules aren't loaded for every user.
+    """
+    def get_module_infos():  # pylint: disable=missing-docstring
+        return [
+            {
+                "id": module.discussion_id,
+                "title": module.discussion_target,
+                "category": module.discussion_category,
+                "sort_key": module.sort_key,
+                "start": module.start,
+                "days_early_for_beta": module.days_early_for_beta,
+                "detached": "detached" in module._class_tags,  # pylint: disable=protected-access
+                # Whether access to the module depends on more than its start date.
+                "is_restricted": bool(module.visible_to_staff_only or module.merged_group_access),
+                "location": module.location,
+            }
+            for module in modulestore().get_items(course.id, qualifiers={'category': 'discussion'})
+            if has_required_keys(module)
+        ]
+
+    # Old XML courses don't have subtree_edited_on, so their version isn't known.
+    if not DISCUSSION_MODULES_CACHE_TIMEOUT or course.subtree_edited_on is None:
+        return get_module_infos()
+
+    cache_key = u"django_comment_client.discussion_modules.{}.{}".format(
+        course.id, course.subtree_edited_on.isoformat()
+    )
+    module_infos = cache.get(cache_key)
+    if module_infos is None:
+        module_infos = get_module_infos()
+        cache.set(cache_key, module_infos, DISCUSSION_MODULES_CACHE_TIMEOUT)
+    return module_infos
+
+
+def _get_accessible_discussion_module_infos(course, user, include_all=False):  # pylint: disable=invalid-name
+    """
+    Return the metadata of the discussion modules in this course that are
+    accessible to the given user, as returned by _get_discussion_module_infos.
+
+    Only the modules whose access depends on more than their start date, e.g.
+    on the user's groups, are loaded to check the user's access to them.
+    """
+    module_infos = _get_discussion_module_infos(course)
+    if include_all:
+        return module_infos
+
+    if not user:
+        user = AnonymousUser()
+    # Whether the user has staff access to the course, looked up when it's needed.
+    has_staff_access = []
+
+    def has_module_access(module_info):
+        """Returns whether the user has access to load the module of `module_info`."""
+        if module_info["is_restricted"]:
+            module = modulestore().get_item(module_info["location"])
+            return has_access(user, 'load', module, course.id)
+        if module_info["detached"] or check_start_date(
+                user, module_info["days_early_for_beta"], module_info["start"], course.id
+        ):
+            return True
+        if not has_staff_access:
+            has_staff_access.append(bool(has_access(user, 'staff', course, course.id)))
+        return has_staff_access[0]
+
+    return [module_info for module_info in module_infos if has_module_access(module_info)]
+
+
 def get_discussion_id_map_entry(module):
     """
     Returns a tuple of (discussion_id, metadata) suitable for inclusion in the results of get_discussion_id_map().
@@ -301,17 +376,17 @@ def get_discussion_category_map(course, user, cohorted_if_in_list=False, exclude
     """
     unexpanded_category_map = defaultdict(list)
 
-    modules = get_accessible_discussion_modules(course, user)
+    module_infos = _get_accessible_discussion_module_infos(course, user)
 
     course_cohort_settings = get_course_cohort_settings(course.id)
 
-    for module in modules:
-        id = module.discussion_id
-        title = module.discussion_target
-        sort_key = module.sort_key
-        category = " / ".join([x.strip() for x in module.discussion_category.split("/")])
-        # Handle case where module.start is None
-        entry_start_date = module.start if module.start else datetime.max.replace(tzinfo=pytz.UTC)
+    for module_info in module_infos:
+        id = module_info["id"]
+        title = module_info["title"]
+        sort_key = module_info["sort_key"]
+        category = " / ".join([x.strip() for x in module_info["category"].split("/")])
+        # Handle case where the module's start is None
+        entry_start_date = module_info["start"] if module_info["start"] else datetime.max.replace(tzinfo=pytz.UTC)
         unexpanded_category_map[category].append({"title": title, "id": id, "sort_key": sort_key, "start_date": entry_start_date})
 
     category_map = {"entries": defaultdict(dict), "subcategories": defaultdict(dict)}
@@ -416,7 +491,8 @@ def get_discussion_categories_ids(course, user, include_all=False):
 
     """
     accessible_discussion_ids = [
-        module.discussion_id for module in get_accessible_discussion_modules(course, user, include_all=include_all)
+        module_info["id"]
+        for module_info in _get_accessible_discussion_module_infos(course, user, include_all=include_all)
     ]
     return course.top_level_discussion_topic_ids + accessible_discussion_ids
 
@@ -500,22 +576,33 @@ class QueryCountDebugMiddleware(object):
         return response
 
 
-def get_ability(course_id, content, user):
+def get_ability(course_id, content, user, user_permissions=None):
     """
     Return a dictionary of forums-oriented actions and the user's permission to perform them
+
+    `user_permissions` are the user's permissions in the course, as returned by get_user_permissions.
     """
+    if user_permissions is None:
+        user_permissions = get_user_permissions(user, course_id)
+    # The conditions on the content are shared by the checks of the different actions.
+    condition_results = {}
+
+    def check(name):  # pylint: disable=missing-docstring
+        return check_permissions_by_view(user, course_id, content, name, user_permissions, condition_results)
+
+    is_thread = content['type'] == 'thread'
     return {
-        'editable': check_permissions_by_view(user, course_id, content, "update_thread" if content['type'] == 'thread' else "update_comment"),
-        'can_reply': check_permissions_by_view(user, course_id, content, "create_comment" if content['type'] == 'thread' else "create_sub_comment"),
-        'can_delete': check_permissions_by_view(user, course_id, content, "delete_thread" if content['type'] == 'thread' else "delete_comment"),
-        'can_openclose': check_permissions_by_view(user, course_id, content, "openclose_thread") if content['type'] == 'thread' else False,
-        'can_vote': check_permissions_by_view(user, course_id, content, "vote_for_thread" if content['type'] == 'thread' else "vote_for_comment"),
+        'editable': check("update_thread" if is_thread else "update_comment"),
+        'can_reply': check("create_comment" if is_thread else "create_sub_comment"),
+        'can_delete': check("delete_thread" if is_thread else "delete_comment"),
+        'can_openclose': check("openclose_thread") if is_thread else False,
+        'can_vote': check("vote_for_thread" if is_thread else "vote_for_comment"),
     }
 
 # TODO: RENAME
 
 
-def get_annotated_content_info(course_id, content, user, user_info):
+def get_annotated_content_info(course_id, content, user, user_info, user_permissions=None):
     """
     Get metadata for an individual content (thread or comment)
     """
@@ -527,20 +614,36 @@ def get_annotated_content_info(course_id, content, user, user_info):
     return {
         'voted': voted,
         'subscribed': content['id'] in user_info['subscribed_thread_ids'],
-        'ability': get_ability(course_id, content, user),
+        'ability': get_ability(course_id, content, user, user_permissions),
     }
 
+
+def _get_user_info_with_id_sets(user_info):
+    """
+    Returns a copy of `user_info` with sets of the ids of the content that the
+    user voted for and subscribed to, to look up many contents in them.
+    """
+    return dict(
+        user_info,
+        upvoted_ids=set(user_info.get('upvoted_ids', [])),
+        downvoted_ids=set(user_info.get('downvoted_ids', [])),
+        subscribed_thread_ids=set(user_info.get('subscribed_thread_ids', [])),
+    )
+
 # TODO: RENAME
 
 
-def get_annotated_content_infos(course_id, thread, user, user_info):
+def get_annotated_content_infos(course_id, thread, user, user_info, user_permissions=None):
     """
     Get metadata for a thread and its children
     """
+    if user_permissions is None:
+        user_permissions = get_user_permissions(user, course_id)
+        user_info = _get_user_info_with_id_sets(user_info)
     infos = {}
 
     def annotate(content):
-        infos[str(content['id'])] = get_annotated_content_info(course_id, content, user, user_info)
+        infos[str(content['id'])] = get_annotated_content_info(course_id, content, user, user_info, user_permissions)
         for child in (
                 content.get('children', []) +
                 content.get('endorsed_responses', []) +
@@ -554,12 +657,14 @@ def get_annotated_content_infos(course_id, thread, user, user_info):
 def get_metadata_for_threads(course_id, threads, user, user_info):
     """
     Returns annotated content information for the specified course, threads, and user information
-    """
-
-    def infogetter(thread):
-        return get_annotated_content_infos(course_id, thread, user, user_info)
 
-    metadata = reduce(merge_dict, map(infogetter, threads), {})
+    The user's permissions and votes are looked up once for all of the threads and their children.
+    """
+    user_permissions = get_user_permissions(user, course_id)
+    user_info = _get_user_info_with_id_sets(user_info)
+    metadata = {}
+    for thread in threads:
+        metadata.update(get_annotated_content_infos(course_id, thread, user, user_info, user_permissions))
     return metadata
 
 # put this method in utils.py to avoid circular import dependency between helpers and mustache_helpers
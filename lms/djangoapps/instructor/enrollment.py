@@ -8,11 +8,19 @@ import json
 import logging
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.core.urlresolvers import reverse
 from django.core.mail import send_mail
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Q
 from django.utils.translation import override as override_language
 
-from student.models import CourseEnrollment, CourseEnrollmentAllowed
+from django_comment_common.models import Role, FORUM_ROLE_STUDENT
+from student.models import (
+    CourseEnrollment, CourseEnrollmentAllowed, ManualEnrollmentAudit,
+    ALLOWEDTOENROLL_TO_ENROLLED, ENROLLED_TO_ENROLLED, UNENROLLED_TO_ALLOWEDTOENROLL, UNENROLLED_TO_ENROLLED,
+)
 from courseware.models import StudentModule
 from edxmako.shortcuts import render_to_string
 from lang_pref import LANGUAGE_KEY
@@ -134,6 +142,172 @@ def enroll_email(course_id, student_email, auto_enroll=False, email_students=Fal
     return previous_state, after_state, enrollment_obj
 
 
+def bulk_enroll_identifiers(
+        course_id, identifiers, auto_enroll=False, email_students=False, secure=True, enrolled_by=None, reason=None
+):
+    """
+    Enroll many students by email or username with bulk queries, rather
+    than calling `enroll_email` for each of them.
+
+    `identifiers` is a list of emails and/or usernames. Identifiers of
+        registered users are enrolled, while other emails are allowed to
+        enroll, as in `enroll_email`.
+    `auto_enroll`, `email_students` are as in `enroll_email`.
+    `secure` determines whether links in the emails use https.
+    `enrolled_by`, `reason` are recorded in the ManualEnrollmentAudit of each
+        student.
+
+    The enrollment events and the emails are sent asynchronously, in
+    batches of settings.BULK_ENROLLMENT_TASK_BATCH_SIZE students.
+
+    returns a list with, for each identifier, a dict with either the
+        `before` and `after` EmailEnrollmentState dicts of the student,
+        `invalidIdentifier` if the identifier isn't a valid email, or `error`
+        if the student couldn't be enrolled.
+    """
+    emails = set(identifier for identifier in identifiers if '@' in identifier)
+    usernames = set(identifier for identifier in identifiers if '@' not in identifier)
+    # The database matches emails and usernames case-insensitively, so the
+    # users are looked up the same way here.
+    users_by_email = {}
+    users_by_username = {}
+    for user in User.objects.filter(Q(email__in=emails) | Q(username__in=usernames)).select_related('profile'):
+        users_by_email[user.email.lower()] = user
+        users_by_username[user.username.lower()] = user
+
+    # The user and the email of each valid identifier, keyed by email so that
+    # students listed more than once, in any case, are only enrolled once.
+    students = {}
+    student_emails = {}
+    for identifier in identifiers:
+        user = (users_by_email if '@' in identifier else users_by_username).get(identifier.lower())
+        email = user.email if user is not None else identifier
+        try:
+            validate_email(email)
+        except ValidationError:
+            continue
+        email = student_emails.setdefault(email.lower(), email)
+        students[email] = user
+
+    users = [user for user in students.itervalues() if user is not None]
+    before_modes = dict(
+        CourseEnrollment.objects.filter(
+            course_id=course_id, user__in=users, is_active=True
+        ).values_list('user_id', 'mode')
+    )
+    allowed = {
+        cea.email.lower(): cea
+        for cea in CourseEnrollmentAllowed.objects.filter(course_id=course_id, email__in=students.keys())
+    }
+
+    before_states = {}
+    after_states = {}
+    for email, user in students.iteritems():
+        cea = allowed.get(email.lower())
+        before_states[email] = {
+            'user': user is not None,
+            'enrollment': user is not None and user.id in before_modes,
+            'allowed': cea is not None,
+            'auto_enroll': bool(cea is not None and cea.auto_enroll),
+        }
+        if user is not None:
+            after_states[email] = dict(before_states[email], enrollment=True)
+        else:
+            after_states[email] = dict(before_states[email], allowed=True, auto_enroll=auto_enroll)
+
+    with transaction.commit_on_success():
+        enrollments, activated = CourseEnrollment.bulk_enroll(users, course_id, u"honor")
+        failed_emails = set(
+            email for email, user in students.iteritems() if user is not None and user.id not in enrollments
+        )
+
+        if activated:
+            role, __ = Role.objects.get_or_create(course_id=course_id, name=FORUM_ROLE_STUDENT)
+            role.users.add(*[enrollment.user for enrollment in activated])
+
+        allowed_emails = [email for email, user in students.iteritems() if user is None]
+        CourseEnrollmentAllowed.objects.filter(
+            course_id=course_id, email__in=[email for email in allowed_emails if email.lower() in allowed]
+        ).exclude(auto_enroll=auto_enroll).update(auto_enroll=auto_enroll)
+        CourseEnrollmentAllowed.objects.bulk_create([
+            CourseEnrollmentAllowed(course_id=course_id, email=email, auto_enroll=auto_enroll)
+            for email in allowed_emails if email.lower() not in allowed
+        ])
+
+        audits = []
+        for email, user in students.iteritems():
+            before = before_states[email]
+            if email in failed_emails:
+                continue
+            elif user is None:
+                state_transition = UNENROLLED_TO_ALLOWEDTOENROLL
+            elif before['enrollment']:
+                state_transition = ENROLLED_TO_ENROLLED
+            elif before['allowed']:
+                state_transition = ALLOWEDTOENROLL_TO_ENROLLED
+            else:
+                state_transition = UNENROLLED_TO_ENROLLED
+            audits.append(ManualEnrollmentAudit(
+                enrolled_by=enrolled_by,
+                enrolled_email=email,
+                state_transition=state_transition,
+                reason=reason,
+                enrollment=enrollments.get(user.id) if user is not None else None,
+            ))
+        ManualEnrollmentAudit.objects.bulk_create(audits)
+
+    # Imported here to avoid a circular import between this module and the tasks.
+    from instructor.tasks import emit_enrollment_events, send_enrollment_emails
+    batch_size = settings.BULK_ENROLLMENT_TASK_BATCH_SIZE
+
+    enrollment_ids = [enrollment.id for enrollment in activated]
+    for start in xrange(0, len(enrollment_ids), batch_size):
+        emit_enrollment_events.delay(enrollment_ids[start:start + batch_size])
+
+    if email_students:
+        recipients = [
+            [email, 'enrolled_enroll', _full_name(user), user.id] if user is not None
+            else [email, 'allowed_enroll', None, None]
+            for email, user in students.iteritems() if email not in failed_emails
+        ]
+        for start in xrange(0, len(recipients), batch_size):
+            send_enrollment_emails.delay(
+                unicode(course_id), auto_enroll, secure, recipients[start:start + batch_size]
+            )
+
+    results = []
+    for identifier in identifiers:
+        user = (users_by_email if '@' in identifier else users_by_username).get(identifier.lower())
+        email = student_emails.get((user.email if user is not None else identifier).lower())
+        if email in failed_emails:
+            results.append({
+                'identifier': identifier,
+                'error': True,
+            })
+        elif email in students:
+            results.append({
+                'identifier': identifier,
+                'before': before_states[email],
+                'after': after_states[email],
+            })
+        else:
+            results.append({
+                'identifier': identifier,
+                'invalidIdentifier': True,
+            })
+    return results
+
+
+def _full_name(user):
+    """
+    Return the full name of `user`, or an empty string if they have no profile.
+    """
+    try:
+        return user.profile.name
+    except ObjectDoesNotExist:
+        return u''
+
+
 def unenroll_email(course_id, student_email, email_students=False, email_params=None, language=None):
     """
     Unenroll a student by email.
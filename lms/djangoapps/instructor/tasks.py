@@ -0,0 +1,75 @@
+"""
+Asynchronous tasks for the instructor app.
+"""
+
+import logging
+from collections import defaultdict
+
+from opaque_keys.edx.keys import CourseKey
+
+import dogstats_wrapper as dog_stats_api
+from lms import CELERY_APP
+
+from courseware.courses import get_course_by_id
+from instructor.enrollment import get_email_params, send_mail_to_student
+from lang_pref import LANGUAGE_KEY
+from openedx.core.djangoapps.user_api.models import UserPreference
+from student.models import CourseEnrollment, EVENT_NAME_ENROLLMENT_ACTIVATED
+
+log = logging.getLogger(__name__)
+
+
+@CELERY_APP.task(name='instructor.tasks.emit_enrollment_events')
+def emit_enrollment_events(enrollment_ids):
+    """
+    Emit the events and metrics of a batch of enrollments activated by
+    :func:`instructor.enrollment.bulk_enroll_identifiers`.
+    """
+    counts = defaultdict(int)
+    for enrollment in CourseEnrollment.objects.filter(id__in=enrollment_ids).select_related('user'):
+        enrollment.emit_event(EVENT_NAME_ENROLLMENT_ACTIVATED)
+        counts[(enrollment.course_id, enrollment.mode)] += 1
+
+    for (course_id, mode), count in counts.iteritems():
+        dog_stats_api.increment(
+            "common.student.enrollment",
+            count,
+            tags=[u"org:{}".format(course_id.org),
+                  u"offering:{}".format(course_id.offering),
+                  u"mode:{}".format(mode)]
+        )
+
+
+@CELERY_APP.task(name='instructor.tasks.send_enrollment_emails')
+def send_enrollment_emails(course_id, auto_enroll, secure, recipients):
+    """
+    Send the emails of a batch of students enrolled by
+    :func:`instructor.enrollment.bulk_enroll_identifiers`.
+
+    Arguments:
+        course_id (unicode): The course the students were enrolled in.
+        auto_enroll (bool): Whether students who aren't registered will be
+            enrolled when they register.
+        secure (bool): Whether links in the emails use https.
+        recipients (list): A list of ``[email, message, full_name, user_id]``
+            for each student, where ``message`` is the kind of email to send,
+            and ``full_name`` and ``user_id`` are None for students who
+            aren't registered.
+    """
+    course = get_course_by_id(CourseKey.from_string(course_id))
+    email_params = get_email_params(course, auto_enroll, secure=secure)
+
+    user_ids = [user_id for __, __, __, user_id in recipients if user_id is not None]
+    languages = dict(
+        UserPreference.objects.filter(user_id__in=user_ids, key=LANGUAGE_KEY).values_list('user_id', 'value')
+    )
+
+    for email, message, full_name, user_id in recipients:
+        params = dict(email_params, message=message, email_address=email)
+        if full_name is not None:
+            params['full_name'] = full_name
+        try:
+            send_mail_to_student(email, params, language=languages.get(user_id))
+        except Exception:  # pylint: disable=broad-except
+            # Don't let one bad address stop the emails to the rest of the batch.
+            log.exception(u"Unable to send the %s email to %s in %s", message, email, course_id)
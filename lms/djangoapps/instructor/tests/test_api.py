@@ -929,6 +929,39 @@ class TestInstructorAPIEnrollment(SharedModuleStoreTestCase, LoginEnrollmentTest
             )
         )
 
+    @override_settings(BULK_ENROLLMENT_THRESHOLD=1)
+    def test_bulk_enroll_with_email(self):
+        url = reverse('students_update_enrollment', kwargs={'course_id': self.course.id.to_deprecated_string()})
+        identifiers = [self.enrolled_student.username, self.notenrolled_student.email, self.notregistered_email]
+        params = {'identifiers': ','.join(identifiers), 'action': 'enroll', 'email_students': True}
+        response = self.client.post(url, params)
+        self.assertEqual(response.status_code, 200)
+
+        # test that the users are now enrolled, or allowed to enroll
+        self.assertTrue(CourseEnrollment.is_enrolled(self.enrolled_student, self.course.id))
+        self.assertTrue(CourseEnrollment.is_enrolled(self.notenrolled_student, self.course.id))
+        self.assertTrue(CourseEnrollmentAllowed.objects.filter(
+            course_id=self.course.id, email=self.notregistered_email
+        ).exists())
+
+        res_json = json.loads(response.content)
+        self.assertEqual([result['identifier'] for result in res_json['results']], identifiers)
+        self.assertEqual(
+            [(result['before']['enrollment'], result['after']['enrollment']) for result in res_json['results']],
+            [(True, True), (False, True), (False, False)]
+        )
+        self.assertTrue(res_json['results'][2]['after']['allowed'])
+
+        transitions = dict(ManualEnrollmentAudit.objects.values_list('enrolled_email', 'state_transition'))
+        self.assertEqual(transitions[self.notenrolled_student.email], UNENROLLED_TO_ENROLLED)
+        self.assertEqual(transitions[self.notregistered_email], UNENROLLED_TO_ALLOWEDTOENROLL)
+
+        # The emails are sent by a task, which runs eagerly in tests.
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            sorted([self.enrolled_student.email, self.notenrolled_student.email, self.notregistered_email])
+        )
+
     @ddt.data('http', 'https')
     def test_enroll_with_email_not_registered(self, protocol):
         url = reverse('students_update_enrollment', kwargs={'course_id': self.course.id.to_deprecated_string()})
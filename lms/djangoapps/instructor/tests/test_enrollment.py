@@ -9,6 +9,8 @@ from mock import patch
 from abc import ABCMeta
 from courseware.models import StudentModule
 from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError
 from django.test import TestCase
 from django.utils.translation import get_language
 from django.utils.translation import override as override_language
@@ -19,13 +21,17 @@ from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 
 from ccx.tests.factories import CcxFactory
-from student.models import CourseEnrollment, CourseEnrollmentAllowed
+from student.models import (
+    CourseEnrollment, CourseEnrollmentAllowed, ManualEnrollmentAudit,
+    ALLOWEDTOENROLL_TO_ENROLLED, UNENROLLED_TO_ALLOWEDTOENROLL, UNENROLLED_TO_ENROLLED,
+)
 from student.roles import CourseCcxCoachRole  # pylint: disable=import-error
 from student.tests.factories import (  # pylint: disable=import-error
     AdminFactory
 )
 from instructor.enrollment import (
     EmailEnrollmentState,
+    bulk_enroll_identifiers,
     enroll_email,
     get_email_params,
     reset_student_attempts,
@@ -222,6 +228,182 @@ class TestInstructorEnrollDB(TestEnrollmentChangeBase):
         return self._run_state_change_test(before_ideal, after_ideal, action)
 
 
+@attr('shard_1')
+class TestInstructorBulkEnrollDB(TestEnrollmentChangeBase):
+    """ Test instructor.enrollment.bulk_enroll_identifiers """
+    def _bulk_enroll(self, email, auto_enroll=False):
+        """
+        Bulk enroll a single email, and check that the states it returns
+        match those of EmailEnrollmentState.
+        """
+        before = EmailEnrollmentState(self.course_key, email)
+        results = bulk_enroll_identifiers(self.course_key, [email], auto_enroll=auto_enroll)
+        after = EmailEnrollmentState(self.course_key, email)
+        self.assertEqual(results, [{'identifier': email, 'before': before.to_dict(), 'after': after.to_dict()}])
+
+    def test_enroll(self):
+        before_ideal = SettableEnrollmentState(
+            user=True,
+            enrollment=False,
+            allowed=False,
+            auto_enroll=False
+        )
+
+        after_ideal = SettableEnrollmentState(
+            user=True,
+            enrollment=True,
+            allowed=False,
+            auto_enroll=False
+        )
+
+        return self._run_state_change_test(before_ideal, after_ideal, self._bulk_enroll)
+
+    def test_enroll_again(self):
+        before_ideal = SettableEnrollmentState(
+            user=True,
+            enrollment=True,
+            allowed=False,
+            auto_enroll=False,
+        )
+
+        after_ideal = SettableEnrollmentState(
+            user=True,
+            enrollment=True,
+            allowed=False,
+            auto_enroll=False,
+        )
+
+        return self._run_state_change_test(before_ideal, after_ideal, self._bulk_enroll)
+
+    def test_enroll_nouser(self):
+        before_ideal = SettableEnrollmentState(
+            user=False,
+            enrollment=False,
+            allowed=False,
+            auto_enroll=False,
+        )
+
+        after_ideal = SettableEnrollmentState(
+            user=False,
+            enrollment=False,
+            allowed=True,
+            auto_enroll=False,
+        )
+
+        return self._run_state_change_test(before_ideal, after_ideal, self._bulk_enroll)
+
+    def test_enroll_nouser_change_autoenroll(self):
+        before_ideal = SettableEnrollmentState(
+            user=False,
+            enrollment=False,
+            allowed=True,
+            auto_enroll=False,
+        )
+
+        after_ideal = SettableEnrollmentState(
+            user=False,
+            enrollment=False,
+            allowed=True,
+            auto_enroll=True,
+        )
+
+        action = lambda email: self._bulk_enroll(email, auto_enroll=True)
+
+        return self._run_state_change_test(before_ideal, after_ideal, action)
+
+    def test_enroll_many(self):
+        inactive = UserFactory.create()
+        CourseEnrollment.enroll(inactive, self.course_key, mode='verified')
+        CourseEnrollment.unenroll(inactive, self.course_key)
+        allowed = UserFactory.create()
+        CourseEnrollmentAllowed.objects.create(course_id=self.course_key, email=allowed.email)
+        new = UserFactory.create()
+        admin = AdminFactory.create()
+
+        results = bulk_enroll_identifiers(
+            self.course_key,
+            [inactive.username, allowed.email, new.email, new.username, 'robot@example.com', 'not an email'],
+            enrolled_by=admin,
+            reason='cohort',
+        )
+
+        self.assertEqual([result['identifier'] for result in results], [
+            inactive.username, allowed.email, new.email, new.username, 'robot@example.com', 'not an email',
+        ])
+        self.assertTrue(results[-1]['invalidIdentifier'])
+        for user in (inactive, allowed, new):
+            self.assertEqual(CourseEnrollment.enrollment_mode_for_user(user, self.course_key), ('honor', True))
+        self.assertTrue(CourseEnrollmentAllowed.objects.filter(
+            course_id=self.course_key, email='robot@example.com'
+        ).exists())
+        self.assertEqual(CourseEnrollment.objects.num_enrolled_in(self.course_key), 3)
+
+        audits = {
+            audit.enrolled_email: audit
+            for audit in ManualEnrollmentAudit.objects.filter(enrolled_by=admin, reason='cohort')
+        }
+        # Students listed more than once are only enrolled once.
+        self.assertEqual(len(audits), 4)
+        self.assertEqual(audits[inactive.email].state_transition, UNENROLLED_TO_ENROLLED)
+        self.assertEqual(audits[allowed.email].state_transition, ALLOWEDTOENROLL_TO_ENROLLED)
+        self.assertEqual(audits[new.email].enrollment, CourseEnrollment.get_enrollment(new, self.course_key))
+        self.assertEqual(audits['robot@example.com'].state_transition, UNENROLLED_TO_ALLOWEDTOENROLL)
+        self.assertIsNone(audits['robot@example.com'].enrollment)
+
+    def test_enroll_mixed_case(self):
+        user = UserFactory.create(username='MixedCase', email='Mixed.Case@example.com')
+        identifiers = [
+            user.email, user.email.lower(), user.username, user.username.upper(),
+            'Robot@example.com', 'robot@EXAMPLE.com',
+        ]
+
+        results = bulk_enroll_identifiers(self.course_key, identifiers)
+
+        self.assertEqual([result['identifier'] for result in results], identifiers)
+        for result in results[:4]:
+            self.assertTrue(result['after']['user'])
+            self.assertTrue(result['after']['enrollment'])
+        self.assertEqual(CourseEnrollment.objects.num_enrolled_in(self.course_key), 1)
+        self.assertEqual(CourseEnrollmentAllowed.objects.filter(course_id=self.course_key).count(), 1)
+
+    def test_enroll_conflict(self):
+        users = [UserFactory.create() for __ in range(3)]
+        enroll = CourseEnrollment.enroll
+
+        def enroll_unless_concurrent(user, course_key, mode):
+            """
+            Enroll `user`, unless they're the one whose enrollment conflicts again.
+            """
+            if user == users[1]:
+                raise IntegrityError
+            return enroll(user, course_key, mode)
+
+        with patch.object(CourseEnrollment.objects, 'bulk_create', side_effect=IntegrityError):
+            with patch.object(CourseEnrollment, 'enroll', side_effect=enroll_unless_concurrent) as mock_enroll:
+                results = bulk_enroll_identifiers(self.course_key, [user.email for user in users])
+
+        # The users are enrolled one at a time instead, and those who still
+        # can't be enrolled are reported.
+        self.assertEqual(mock_enroll.call_count, 3)
+        self.assertEqual([result.get('error', False) for result in results], [False, True, False])
+        self.assertTrue(CourseEnrollment.is_enrolled(users[0], self.course_key))
+        self.assertFalse(CourseEnrollment.is_enrolled(users[1], self.course_key))
+        self.assertEqual(
+            ManualEnrollmentAudit.objects.filter(enrolled_email__in=[user.email for user in users]).count(), 2
+        )
+
+    def test_reactivate_invalidates_cached_mode(self):
+        inactive = UserFactory.create()
+        CourseEnrollment.enroll(inactive, self.course_key, mode='verified')
+        CourseEnrollment.unenroll(inactive, self.course_key)
+        cache_key = CourseEnrollment.cache_key_name(inactive.id, unicode(self.course_key))
+        cache.set(cache_key, 'verified')
+
+        bulk_enroll_identifiers(self.course_key, [inactive.email])
+        self.assertIsNone(cache.get(cache_key))
+        self.assertEqual(CourseEnrollment.enrollment_mode_for_user(inactive, self.course_key), ('honor', True))
+
+
 @attr('shard_1')
 class TestInstructorUnenrollDB(TestEnrollmentChangeBase):
     """ Test instructor.enrollment.unenroll_email """
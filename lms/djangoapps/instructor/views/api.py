@@ -72,6 +72,7 @@ from instructor_task.api_helper import AlreadyRunningError
 from instructor_task.models import ReportStore
 import instructor.enrollment as enrollment
 from instructor.enrollment import (
+    bulk_enroll_identifiers,
     get_user_email_language,
     enroll_email,
     send_mail_to_student,
@@ -532,6 +533,9 @@ def students_update_enrollment(request, course_id):
         If email_students is true, students will be sent email notification
         If email_students is false, students will not be sent email notification
 
+    Enrolling more than settings.BULK_ENROLLMENT_THRESHOLD students is done with
+    bulk queries, and their enrollment events and emails are sent asynchronously.
+
     Returns an analog to this JSON structure: {
         "action": "enroll",
         "auto_enroll": false,
@@ -570,6 +574,17 @@ def students_update_enrollment(request, course_id):
                     'results': [{'error': True}],
                     'auto_enroll': auto_enroll,
                 }, status=400)
+    if action == 'enroll' and len(identifiers) > settings.BULK_ENROLLMENT_THRESHOLD:
+        results = bulk_enroll_identifiers(
+            course_id, identifiers, auto_enroll, email_students,
+            secure=request.is_secure(), enrolled_by=request.user, reason=reason,
+        )
+        return JsonResponse({
+            'action': action,
+            'results': results,
+            'auto_enroll': auto_enroll,
+        })
+
     enrollment_obj = None
     state_transition = DEFAULT_TRANSITION_STATE
 
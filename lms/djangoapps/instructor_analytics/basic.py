@@ -19,7 +19,7 @@ import xmodule.graders as xmgraders
 from microsite_configuration import microsite
 from student.models import CourseEnrollmentAllowed
 from edx_proctoring.api import get_all_exam_attempts
-from courseware.models import StudentModule
+from courseware.user_state_client import DjangoXBlockUserStateClient
 from certificates.models import GeneratedCertificate
 from django.db.models import Count
 from certificates.models import CertificateStatuses
@@ -364,11 +364,11 @@ def coupon_codes_features(features, coupons_list, course_id):
 
 def list_problem_responses(course_key, problem_location):
     """
-    Return responses to a given problem as a dict.
+    Return responses to a given problem as dicts.
 
     list_problem_responses(course_key, problem_location)
 
-    would return [
+    would yield [
         {'username': u'user1', 'state': u'...'},
         {'username': u'user2', 'state': u'...'},
         {'username': u'user3', 'state': u'...'},
@@ -376,6 +376,9 @@ def list_problem_responses(course_key, problem_location):
 
     where `state` represents a student's response to the problem
     identified by `problem_location`.
+
+    The responses are streamed from the database in batches, so this
+    returns an iterator rather than a list.
     """
     problem_key = UsageKey.from_string(problem_location)
     # Are we dealing with an "old-style" problem location?
@@ -383,18 +386,12 @@ def list_problem_responses(course_key, problem_location):
     if not run:
         problem_key = course_key.make_usage_key_from_deprecated_string(problem_location)
     if problem_key.course_key != course_key:
-        return []
+        return iter([])
 
-    smdat = StudentModule.objects.filter(
-        course_id=course_key,
-        module_state_key=problem_key
+    return (
+        {'username': username, 'state': state}
+        for username, state in DjangoXBlockUserStateClient().iter_raw_state_for_block(problem_key)
     )
-    smdat = smdat.order_by('student')
-
-    return [
-        {'username': response.student.username, 'state': response.state}
-        for response in smdat
-    ]
 
 
 def course_registration_features(features, registration_codes, csv_type):
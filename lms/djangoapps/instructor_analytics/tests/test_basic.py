@@ -5,18 +5,18 @@ Tests for instructor.basic
 import datetime
 import json
 import pytz
-from mock import MagicMock, Mock, patch
+from mock import patch
 from django.core.urlresolvers import reverse
 from django.db.models import Q
 
 from course_modes.models import CourseMode
+from courseware.models import StudentModule
 from courseware.tests.factories import InstructorFactory
 from instructor_analytics.basic import (
-    StudentModule, sale_record_features, sale_order_record_features, enrolled_students_features,
+    sale_record_features, sale_order_record_features, enrolled_students_features,
     course_registration_features, coupon_codes_features, get_proctored_exam_results, list_may_enroll,
     list_problem_responses, AVAILABLE_FEATURES, STUDENT_FEATURES, PROFILE_FEATURES
 )
-from opaque_keys.edx.locator import UsageKey
 from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
 from student.models import CourseEnrollment, CourseEnrollmentAllowed
 from student.roles import CourseSalesAdminRole
@@ -54,46 +54,43 @@ class TestAnalyticsBasic(ModuleStoreTestCase):
             )
 
     def test_list_problem_responses(self):
-        def result_factory(result_id):
-            """
-            Return a dummy StudentModule object that can be queried for
-            relevant info (student.username and state).
-            """
-            result = Mock(spec=['student', 'state'])
-            result.student.username.return_value = u'user{}'.format(result_id)
-            result.state.return_value = u'state{}'.format(result_id)
-            return result
-
-        # Ensure that UsageKey.from_string returns a problem key that list_problem_responses can work with
-        # (even when called with a dummy location):
-        mock_problem_key = Mock(return_value=u'')
-        mock_problem_key.course_key = self.course_key
-        with patch.object(UsageKey, 'from_string') as patched_from_string:
-            patched_from_string.return_value = mock_problem_key
-
-            # Ensure that StudentModule.objects.filter returns a result set that list_problem_responses can work with
-            # (this keeps us from having to create fixtures for this test):
-            mock_results = MagicMock(return_value=[result_factory(n) for n in range(5)])
-            with patch.object(StudentModule, 'objects') as patched_manager:
-                patched_manager.filter.return_value = mock_results
-
-                mock_problem_location = ''
-                problem_responses = list_problem_responses(self.course_key, problem_location=mock_problem_location)
-
-                # Check if list_problem_responses called UsageKey.from_string to look up problem key:
-                patched_from_string.assert_called_once_with(mock_problem_location)
-                # Check if list_problem_responses called StudentModule.objects.filter to obtain relevant records:
-                patched_manager.filter.assert_called_once_with(
-                    course_id=self.course_key, module_state_key=mock_problem_key
-                )
-
-                # Check if list_problem_responses returned expected results:
-                self.assertEqual(len(problem_responses), len(mock_results))
-                for mock_result in mock_results:
-                    self.assertTrue(
-                        {'username': mock_result.student.username, 'state': mock_result.state} in
-                        problem_responses
-                    )
+        problem_key = self.course_key.make_usage_key('problem', 'problem')
+        other_problem_key = self.course_key.make_usage_key('problem', 'other_problem')
+        for index, user in enumerate(self.users[:5]):
+            StudentModule.objects.create(
+                student=user,
+                course_id=self.course_key,
+                module_state_key=problem_key,
+                state=json.dumps({'index': index}),
+            )
+        StudentModule.objects.create(
+            student=self.users[5],
+            course_id=self.course_key,
+            module_state_key=other_problem_key,
+            state=json.dumps({'index': 5}),
+        )
+        # Users who have only viewed the problem are reported with no state.
+        StudentModule.objects.create(
+            student=self.users[6],
+            course_id=self.course_key,
+            module_state_key=problem_key,
+            state=None,
+        )
+
+        problem_responses = list(list_problem_responses(self.course_key, unicode(problem_key)))
+
+        self.assertEqual(
+            problem_responses,
+            [
+                {'username': user.username, 'state': json.dumps({'index': index})}
+                for index, user in enumerate(self.users[:5])
+            ] + [{'username': self.users[6].username, 'state': None}]
+        )
+
+    def test_list_problem_responses_other_course(self):
+        other_course_key = self.store.make_course_key('robot', 'other_course', 'id')
+        problem_key = other_course_key.make_usage_key('problem', 'problem')
+        self.assertEqual(list(list_problem_responses(self.course_key, unicode(problem_key))), [])
 
     def test_enrolled_students_features_username(self):
         self.assertIn('username', AVAILABLE_FEATURES)
@@ -15,6 +15,7 @@ from django.db import transaction, DatabaseError
 from django.core.cache import cache
 
 from instructor_task.models import InstructorTask, PROGRESS, QUEUING
+from util.query import iterate_values_by_pk
 
 TASK_LOG = logging.getLogger('edx.celery.task')
 
@@ -23,6 +24,8 @@ SUBTASK_LOCK_EXPIRE = 60 * 10  # Lock expires in 10 minutes
 # Number of times to retry if a subtask update encounters a lock on the InstructorTask.
 # (These are recursive retries, so don't make this number too large.)
 MAX_DATABASE_LOCK_RETRIES = 5
+# Number of items fetched by each query when generating the items for subtasks.
+ITEMS_PER_QUERY = 1000
 
 
 class DuplicateTaskException(Exception):
@@ -76,6 +79,7 @@ def _generate_items_for_subtask(
     items_per_task,
     total_num_subtasks,
     course_id,
+    items_per_query=ITEMS_PER_QUERY,
 ):
     """
     Generates a chunk of "items" that should be passed into a subtask.
@@ -85,9 +89,11 @@ def _generate_items_for_subtask(
         `item_fields` : the fields that should be included in the dict that is returned.
             These are in addition to the 'pk' field.
         `total_num_items` : the result of summing the count of each queryset in `item_querysets`.
-        `items_per_query` : size of chunks to break the query operation into.
         `items_per_task` : maximum size of chunks to break each query chunk into for use by a subtask.
+        `total_num_subtasks` : the result of _get_number_of_subtasks().
         `course_id` : course_id of the course. Only needed for the track_memory_usage context manager.
+        `items_per_query` : size of chunks to break the query operation into.  Items are fetched
+            in order of primary key, each query continuing after the last item of the previous one.
 
     Returns:  yields a list of dicts, where each dict contains the fields in `item_fields`, plus the 'pk' field.
 
@@ -102,7 +108,7 @@ def _generate_items_for_subtask(
 
     with track_memory_usage('course_email.subtask_generation.memory', course_id):
         for queryset in item_querysets:
-            for item in queryset.values(*all_item_fields).iterator():
+            for item in iterate_values_by_pk(queryset, all_item_fields, items_per_query):
                 if len(items_for_task) == items_per_task and num_subtasks < total_num_subtasks - 1:
                     yield items_for_task
                     num_items_queued += items_per_task
@@ -44,6 +44,7 @@ from instructor_task.tasks_helper import (
     upload_exec_summary_report,
     upload_course_survey_report,
     generate_students_certificates,
+    generate_students_certificates_batch,
     upload_proctored_exam_results_report
 )
 
@@ -280,6 +281,15 @@ def generate_certificates(entry_id, xmodule_instance_args):
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+def generate_certificates_batch(entry_id, course_id, student_ids, subtask_status_dict):
+    """
+    Grade a batch of students and generate their certificates, as a subtask
+    of `generate_certificates`.
+    """
+    return generate_students_certificates_batch(entry_id, course_id, student_ids, subtask_status_dict)
+
+
 @task(base=BaseInstructorTask)  # pylint: disable=E1102
 def cohort_students(entry_id, xmodule_instance_args):
     """
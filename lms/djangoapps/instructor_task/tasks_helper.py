@@ -11,6 +11,7 @@ from django.conf import settings
 from eventtracking import tracker
 from itertools import chain
 from time import time
+from uuid import uuid4
 import unicodecsv
 import logging
 
@@ -42,7 +43,7 @@ from certificates.models import (
     certificate_info_for_user,
     CertificateStatuses
 )
-from certificates.api import generate_user_certificates
+from certificates.api import generate_certificates_for_students, generate_user_certificates
 from courseware.courses import get_course_by_id, get_problems_in_section
 from courseware.grades import iterate_grades_for
 from courseware.models import StudentModule
@@ -56,11 +57,17 @@ from instructor_analytics.basic import (
 )
 from instructor_analytics.csvs import format_dictlist
 from instructor_task.models import ReportStore, InstructorTask, PROGRESS
+from instructor_task.subtasks import (
+    SubtaskStatus,
+    check_subtask_is_valid,
+    initialize_subtask_info,
+    update_subtask_status,
+)
 from lms.djangoapps.lms_xblock.runtime import LmsPartitionService
 from openedx.core.djangoapps.course_groups.cohorts import get_cohort
 from openedx.core.djangoapps.course_groups.models import CourseUserGroup
 from openedx.core.djangoapps.content.course_structures.models import CourseStructure
-from opaque_keys.edx.keys import UsageKey
+from opaque_keys.edx.keys import CourseKey, UsageKey
 from openedx.core.djangoapps.course_groups.cohorts import add_user_to_cohort, is_course_cohorted
 from student.models import CourseEnrollment, CourseAccessRole
 from teams.models import CourseTeamMembership
@@ -881,16 +888,20 @@ def upload_problem_responses_csv(_xmodule_instance_args, _entry_id, course_id, t
     current_step = {'step': 'Calculating students answers to problem'}
     task_progress.update_task_state(extra_meta=current_step)
 
-    # Compute result table and format it
+    # Compute result table and format it. The responses are streamed from the
+    # database straight into the report, rather than being loaded into memory.
     problem_location = task_input.get('problem_location')
     student_data = list_problem_responses(course_id, problem_location)
     features = ['username', 'state']
-    header, rows = format_dictlist(student_data, features)
-
-    task_progress.attempted = task_progress.succeeded = len(rows)
-    task_progress.skipped = task_progress.total - task_progress.attempted
 
-    rows.insert(0, header)
+    def rows():
+        """
+        Yield the CSV header and then a row for each response, counting them.
+        """
+        yield features
+        for response in student_data:
+            task_progress.attempted += 1
+            yield [response[feature] for feature in features]
 
     current_step = {'step': 'Uploading CSV'}
     task_progress.update_task_state(extra_meta=current_step)
@@ -898,7 +909,10 @@ def upload_problem_responses_csv(_xmodule_instance_args, _entry_id, course_id, t
     # Perform the upload
     problem_location = re.sub(r'[:/]', '_', problem_location)
     csv_name = 'student_state_from_{}'.format(problem_location)
-    upload_csv_to_report_store(rows, csv_name, course_id, start_date)
+    upload_csv_to_report_store(rows(), csv_name, course_id, start_date)
+
+    task_progress.succeeded = task_progress.attempted
+    task_progress.skipped = task_progress.total - task_progress.attempted
 
     return task_progress.update_task_state(extra_meta=current_step)
 
@@ -1396,10 +1410,14 @@ def upload_proctored_exam_results_report(_xmodule_instance_args, _entry_id, cour
 
 
 def generate_students_certificates(
-        _xmodule_instance_args, _entry_id, course_id, task_input, action_name):  # pylint: disable=unused-argument
+        _xmodule_instance_args, entry_id, course_id, task_input, action_name):  # pylint: disable=unused-argument
     """
     For a given `course_id`, generate certificates for all students
     that are enrolled.
+
+    When more than settings.CERTIFICATE_GENERATION_STUDENTS_PER_TASK students
+    need certificates, they are generated by subtasks that each handle that
+    many students; see generate_students_certificates_batch.
     """
     start_time = time()
     enrolled_students = CourseEnrollment.objects.users_enrolled_in(course_id)
@@ -1410,6 +1428,9 @@ def generate_students_certificates(
 
     students_require_certs = students_require_certificate(course_id, enrolled_students)
 
+    if len(students_require_certs) > settings.CERTIFICATE_GENERATION_STUDENTS_PER_TASK:
+        return _queue_certificate_generation_subtasks(entry_id, course_id, students_require_certs, action_name)
+
     task_progress.skipped = task_progress.total - len(students_require_certs)
 
     current_step = {'step': 'Generating Certificates'}
@@ -1433,6 +1454,93 @@ def generate_students_certificates(
     return task_progress.update_task_state(extra_meta=current_step)
 
 
+def _queue_certificate_generation_subtasks(entry_id, course_id, students, action_name):
+    """
+    Queue subtasks that generate the certificates of `students`, in batches of
+    settings.CERTIFICATE_GENERATION_STUDENTS_PER_TASK.
+
+    Returns the task progress as stored in the InstructorTask, which the
+    subtasks update as they complete.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+
+    # If the task is run again after its subtasks were queued (as can happen when
+    # the connection to the broker is lost), don't queue them a second time.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning(u"Task %s has already queued its certificate generation subtasks", entry.task_id)
+        return json.loads(entry.task_output)
+
+    # Imported here because instructor_task.tasks imports this module.
+    from instructor_task.tasks import generate_certificates_batch
+
+    student_ids = sorted(student.id for student in students)
+    students_per_task = settings.CERTIFICATE_GENERATION_STUDENTS_PER_TASK
+    batches = [student_ids[i:i + students_per_task] for i in xrange(0, len(student_ids), students_per_task)]
+    subtask_id_list = [str(uuid4()) for __ in batches]
+
+    TASK_LOG.info(
+        u"Task %s: creating %s subtasks to generate certificates for %s students.",
+        entry.task_id,
+        len(subtask_id_list),
+        len(student_ids),
+    )
+    progress = initialize_subtask_info(entry, action_name, len(student_ids), subtask_id_list)
+
+    for subtask_id, batch in zip(subtask_id_list, batches):
+        generate_certificates_batch.apply_async(
+            (entry_id, unicode(course_id), batch, SubtaskStatus.create(subtask_id).to_dict()),
+            task_id=subtask_id,
+            routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+        )
+
+    return progress
+
+
+def generate_students_certificates_batch(entry_id, course_id, student_ids, subtask_status_dict):
+    """
+    Generate the certificates of one batch of students, as a subtask of
+    generate_students_certificates, and record the outcome in the
+    InstructorTask `entry_id`.
+
+    The course is loaded once for the whole batch, and the students' scores
+    and profiles are loaded in bulk.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    course_key = CourseKey.from_string(course_id)
+
+    # Raises DuplicateTaskException if this subtask was already run.
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    try:
+        course = modulestore().get_course(course_key, depth=None)
+        students = list(User.objects.filter(id__in=student_ids))
+        with dog_stats_api.timer('instructor_tasks.certificates.batch.time'):
+            statuses = generate_certificates_for_students(students, course_key, course=course)
+    except Exception:
+        TASK_LOG.exception(
+            u"Certificate generation subtask %s for instructor task %s: failed unexpectedly!",
+            current_task_id,
+            entry_id,
+        )
+        subtask_status.increment(failed=len(student_ids), state=FAILURE)
+        update_subtask_status(entry_id, current_task_id, subtask_status)
+        raise
+
+    succeeded = sum(
+        1 for cert_status in statuses.itervalues()
+        if cert_status in [CertificateStatuses.generating, CertificateStatuses.downloadable]
+    )
+    subtask_status.increment(
+        succeeded=succeeded,
+        failed=len(statuses) - succeeded,
+        skipped=len(student_ids) - len(statuses),
+        state=SUCCESS,
+    )
+    update_subtask_status(entry_id, current_task_id, subtask_status)
+    return subtask_status.to_dict()
+
+
 def cohort_students_and_upload(_xmodule_instance_args, _entry_id, course_id, task_input, action_name):
     """
     Within a given course, cohort students in bulk, then upload the results
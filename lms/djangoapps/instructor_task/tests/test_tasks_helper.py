@@ -7,15 +7,19 @@ Tests that CSV grade report generation works with unicode emails.
 
 """
 import ddt
+import json
 from mock import Mock, patch
 import tempfile
+from uuid import uuid4
+
+from celery.states import SUCCESS
 from openedx.core.djangoapps.course_groups import cohorts
 import unicodecsv
 from django.core.urlresolvers import reverse
 from django.test.utils import override_settings
 
 from capa.tests.response_xml_factory import MultipleChoiceResponseXMLFactory
-from certificates.models import CertificateStatuses
+from certificates.models import CertificateStatuses, GeneratedCertificate
 from certificates.tests.factories import GeneratedCertificateFactory, CertificateWhitelistFactory
 from course_modes.models import CourseMode
 from courseware.tests.factories import InstructorFactory
@@ -31,7 +35,8 @@ from student.models import CourseEnrollment, CourseEnrollmentAllowed, ManualEnro
 from verify_student.tests.factories import SoftwareSecurePhotoVerificationFactory
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.partitions.partitions import Group, UserPartition
-from instructor_task.models import ReportStore
+from instructor_task.models import InstructorTask, ReportStore
+from instructor_task.tests.factories import InstructorTaskFactory
 from survey.models import SurveyForm, SurveyAnswer
 from instructor_task.tasks_helper import (
     cohort_students_and_upload,
@@ -1622,3 +1627,58 @@ class TestCertificateGeneration(InstructorTaskModuleTestCase):
             },
             result
         )
+
+    @override_settings(CERTIFICATE_GENERATION_STUDENTS_PER_TASK=3)
+    def test_certificate_generation_in_subtasks(self):
+        """
+        Verify that certificates are generated by subtasks when more students
+        need them than a subtask handles.
+        """
+        students = [self.create_student(username='student_{}'.format(i), email='student_{}@example.com'.format(i))
+                    for i in xrange(1, 11)]
+        for student in students[:2]:
+            GeneratedCertificateFactory.create(
+                user=student,
+                course_id=self.course.id,
+                status=CertificateStatuses.downloadable,
+                mode='honor'
+            )
+        for student in students[2:7]:
+            CertificateWhitelistFactory.create(user=student, course_id=self.course.id, whitelist=True)
+
+        entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_id=str(uuid4()),
+            task_key='dummy_task_key',
+            task_type='generate_certificates',
+        )
+        with patch('instructor_task.tasks_helper._get_current_task') as mock_current_task:
+            mock_current_task.return_value = Mock()
+            with patch('capa.xqueue_interface.XQueueInterface.send_to_queue') as mock_queue:
+                mock_queue.return_value = (0, "Successfully queued")
+                generate_students_certificates(None, entry.id, self.course.id, None, 'certificates generated')
+
+        # The 5 whitelisted students had their certificate requests sent to the queue
+        self.assertEqual(mock_queue.call_count, 5)
+        entry = InstructorTask.objects.get(id=entry.id)
+        self.assertEqual(entry.task_state, SUCCESS)
+        subtasks = json.loads(entry.subtasks)
+        self.assertEqual(subtasks['total'], 3)
+        self.assertEqual(subtasks['succeeded'], 3)
+        self.assertDictContainsSubset(
+            {
+                'action_name': 'certificates generated',
+                'total': 8,
+                'attempted': 8,
+                'succeeded': 5,
+                'failed': 3,
+                'skipped': 0
+            },
+            json.loads(entry.task_output)
+        )
+        self.assertEqual(
+            GeneratedCertificate.objects.filter(
+                course_id=self.course.id, status=CertificateStatuses.generating
+            ).count(),
+            5
+        )
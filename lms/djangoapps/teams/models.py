@@ -5,9 +5,13 @@ from uuid import uuid4
 import pytz
 from model_utils import FieldTracker
 
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy
 from django_countries.fields import CountryField
@@ -24,12 +28,16 @@ from django_comment_common.signals import (
     comment_endorsed
 )
 from xmodule_django.models import CourseKeyField
+from util.db import run_after_commit
 from util.model_utils import slugify
 from student.models import LanguageField, CourseEnrollment
 from .errors import AlreadyOnTeamInCourse, NotEnrolledInCourseForTeam, ImmutableMembershipFieldException
 from teams.utils import emit_team_event
 from teams import TEAM_DISCUSSION_CONTEXT
 
+# See settings.TEAMS_TOPIC_TEAM_COUNTS_CACHE_TIMEOUT.
+TOPIC_TEAM_COUNTS_CACHE_TIMEOUT = getattr(settings, 'TEAMS_TOPIC_TEAM_COUNTS_CACHE_TIMEOUT', 60 * 60)
+
 
 @receiver(thread_voted)
 @receiver(thread_created)
@@ -149,6 +157,56 @@ class CourseTeam(models.Model):
         self.team_size = CourseTeamMembership.objects.filter(team=self).count()
         self.save()
 
+    @classmethod
+    def get_topic_team_counts(cls, course_id):
+        """
+        Returns a dict mapping the ids of the topics of the course which have
+        teams to their number of teams, counted in a single query.
+
+        The counts are cached until a team of the course is created, deleted
+        or moved to another topic.
+        """
+        cache_key = _topic_team_counts_cache_key(course_id)
+        if TOPIC_TEAM_COUNTS_CACHE_TIMEOUT:
+            topic_team_counts = cache.get(cache_key)
+            if topic_team_counts is not None:
+                return topic_team_counts
+
+        teams_per_topic = cls.objects.filter(course_id=course_id).values('topic_id').annotate(team_count=Count('id'))
+        topic_team_counts = {d['topic_id']: d['team_count'] for d in teams_per_topic}
+        if TOPIC_TEAM_COUNTS_CACHE_TIMEOUT:
+            cache.set(cache_key, topic_team_counts, TOPIC_TEAM_COUNTS_CACHE_TIMEOUT)
+        return topic_team_counts
+
+
+def _topic_team_counts_cache_key(course_id):
+    """Returns the cache key of the number of teams of each topic of the course."""
+    return u'teams.topic_team_counts.{}'.format(course_id)
+
+
+def _invalidate_topic_team_counts(course_id):
+    """
+    Invalidates the cached team counts of the course, both now and once the
+    current transaction is committed, since concurrent requests may cache the
+    old counts again until then.
+    """
+    cache_key = _topic_team_counts_cache_key(course_id)
+    cache.delete(cache_key)
+    run_after_commit(cache.delete, cache_key)
+
+
+@receiver(post_save, sender=CourseTeam)
+def team_counts_post_save_callback(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """Invalidates the cached team counts of the team's course when it's created or moved to another topic."""
+    if created or 'topic_id' in instance.field_tracker.changed():
+        _invalidate_topic_team_counts(instance.course_id)
+
+
+@receiver(post_delete, sender=CourseTeam)
+def team_counts_post_delete_callback(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidates the cached team counts of the team's course when it's deleted."""
+    _invalidate_topic_team_counts(instance.course_id)
+
 
 class CourseTeamMembership(models.Model):
     """This model represents the membership of a single user in a single team."""
@@ -208,7 +266,7 @@ class CourseTeamMembership(models.Model):
             course_ids (list of unicode, optional) Course IDs to filter on.
             team_id (unicode, optional): The team_id to filter on.
         """
-        queryset = cls.objects.all()
+        queryset = cls.objects.select_related('user', 'team')
         if username is not None:
             queryset = queryset.filter(user__username=username)
         if course_ids is not None:
@@ -1,7 +1,6 @@
 """Defines serializers used by the Team API."""
 from copy import deepcopy
 from django.contrib.auth.models import User
-from django.db.models import Count
 from django.conf import settings
 
 from django_countries import countries
@@ -185,7 +184,7 @@ class TopicSerializer(BaseTopicSerializer):
         if 'team_count' in topic:
             return topic['team_count']
         else:
-            return CourseTeam.objects.filter(course_id=self.context['course_id'], topic_id=topic['id']).count()
+            return CourseTeam.get_topic_team_counts(self.context['course_id']).get(topic['id'], 0)
 
 
 class BulkTeamCountTopicListSerializer(serializers.ListSerializer):  # pylint: disable=abstract-method
@@ -212,14 +211,11 @@ class BulkTeamCountTopicSerializer(BaseTopicSerializer):  # pylint: disable=abst
 def add_team_count(topics, course_id):
     """
     Helper method to add team_count for a list of topics.
-    This allows for a more efficient single query.
+    This allows for a more efficient single query, or none when the
+    counts of the course are cached.
     """
-    topic_ids = [topic['id'] for topic in topics]
-    teams_per_topic = CourseTeam.objects.filter(
-        course_id=course_id,
-        topic_id__in=topic_ids
-    ).values('topic_id').annotate(team_count=Count('topic_id'))
-
-    topics_to_team_count = {d['topic_id']: d['team_count'] for d in teams_per_topic}
+    if not topics:
+        return
+    topics_to_team_count = CourseTeam.get_topic_team_counts(course_id)
     for topic in topics:
         topic['team_count'] = topics_to_team_count.get(topic['id'], 0)
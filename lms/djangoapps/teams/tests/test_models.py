@@ -5,9 +5,10 @@ from contextlib import contextmanager
 from datetime import datetime
 import ddt
 import itertools
-from mock import Mock
+from mock import Mock, patch
 import pytz
 
+from django.core.cache import cache
 from django_comment_common.signals import (
     thread_created,
     thread_edited,
@@ -207,3 +208,47 @@ class TeamSignalsTest(EventTestMixin, SharedModuleStoreTestCase):
         """
         with self.assert_last_activity_updated(False):
             signal.send(sender=None, user=self.user, post=self.mock_comment(context='course'))
+
+
+@patch('teams.models.TOPIC_TEAM_COUNTS_CACHE_TIMEOUT', 60)
+class TopicTeamCountsTest(SharedModuleStoreTestCase):
+    """Tests for the cached number of teams of each topic of a course."""
+
+    def setUp(self):
+        super(TopicTeamCountsTest, self).setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.team = CourseTeamFactory(course_id=COURSE_KEY1, topic_id='topic1')
+        CourseTeamFactory(course_id=COURSE_KEY1, topic_id='topic1')
+        CourseTeamFactory(course_id=COURSE_KEY1, topic_id='topic2')
+        CourseTeamFactory(course_id=COURSE_KEY2, topic_id='topic1')
+
+    def assert_team_counts(self, expected_counts, num_queries):
+        """Verify the team counts of the first course, and the number of queries made to get them."""
+        with self.assertNumQueries(num_queries):
+            self.assertEqual(CourseTeam.get_topic_team_counts(COURSE_KEY1), expected_counts)
+
+    def test_cached(self):
+        self.assert_team_counts({'topic1': 2, 'topic2': 1}, 1)
+        self.assert_team_counts({'topic1': 2, 'topic2': 1}, 0)
+
+        # Activity in a team doesn't change the counts.
+        self.team.last_activity_at = datetime.utcnow().replace(tzinfo=pytz.utc)
+        self.team.save()
+        self.assert_team_counts({'topic1': 2, 'topic2': 1}, 0)
+
+    def test_invalidated_by_created_team(self):
+        self.assert_team_counts({'topic1': 2, 'topic2': 1}, 1)
+        CourseTeamFactory(course_id=COURSE_KEY1, topic_id='topic3')
+        self.assert_team_counts({'topic1': 2, 'topic2': 1, 'topic3': 1}, 1)
+
+    def test_invalidated_by_moved_team(self):
+        self.assert_team_counts({'topic1': 2, 'topic2': 1}, 1)
+        self.team.topic_id = 'topic2'
+        self.team.save()
+        self.assert_team_counts({'topic1': 1, 'topic2': 2}, 1)
+
+    def test_invalidated_by_deleted_team(self):
+        self.assert_team_counts({'topic1': 2, 'topic2': 1}, 1)
+        self.team.delete()
+        self.assert_team_counts({'topic1': 1, 'topic2': 1}, 1)
@@ -155,7 +155,7 @@ class TeamsDashboardView(GenericAPIView):
 
         user = request.user
 
-        user_teams = CourseTeam.objects.filter(membership__user=user)
+        user_teams = CourseTeam.objects.filter(membership__user=user).prefetch_related('membership__user')
         user_teams_data = self._serialize_and_paginate(
             MyTeamsPagination,
             user_teams,
@@ -464,7 +464,8 @@ class TeamsListView(ExpandableFieldViewMixin, GenericAPIView):
             serializer = self.get_serializer(page, many=True)
             order_by_input = None
         else:
-            queryset = CourseTeam.objects.filter(**result_filter)
+            # Fetch the memberships of all teams of the page at once for their serialization.
+            queryset = CourseTeam.objects.filter(**result_filter).prefetch_related('membership__user')
             order_by_input = request.query_params.get('order_by', 'name')
             if order_by_input == 'name':
                 # MySQL does case-insensitive order_by.
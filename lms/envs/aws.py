@@ -219,7 +219,14 @@ BULK_EMAIL_DEFAULT_RETRY_DELAY = ENV_TOKENS.get('BULK_EMAIL_DEFAULT_RETRY_DELAY'
 BULK_EMAIL_MAX_RETRIES = ENV_TOKENS.get('BULK_EMAIL_MAX_RETRIES', BULK_EMAIL_MAX_RETRIES)
 BULK_EMAIL_INFINITE_RETRY_CAP = ENV_TOKENS.get('BULK_EMAIL_INFINITE_RETRY_CAP', BULK_EMAIL_INFINITE_RETRY_CAP)
 BULK_EMAIL_LOG_SENT_EMAILS = ENV_TOKENS.get('BULK_EMAIL_LOG_SENT_EMAILS', BULK_EMAIL_LOG_SENT_EMAILS)
-BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS = ENV_TOKENS.get('BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS', BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS)
+BULK_EMAIL_MAX_IN_FLIGHT = ENV_TOKENS.get('BULK_EMAIL_MAX_IN_FLIGHT', BULK_EMAIL_MAX_IN_FLIGHT)
+BULK_EMAIL_CONNECTION_MAX_IDLE_TIME = ENV_TOKENS.get(
+    'BULK_EMAIL_CONNECTION_MAX_IDLE_TIME', BULK_EMAIL_CONNECTION_MAX_IDLE_TIME
+)
+BULK_EMAIL_MAX_THROTTLE_RETRIES = ENV_TOKENS.get('BULK_EMAIL_MAX_THROTTLE_RETRIES', BULK_EMAIL_MAX_THROTTLE_RETRIES)
+BULK_EMAIL_MIN_SEND_RATE = ENV_TOKENS.get('BULK_EMAIL_MIN_SEND_RATE', BULK_EMAIL_MIN_SEND_RATE)
+BULK_EMAIL_MAX_SEND_RATE = ENV_TOKENS.get('BULK_EMAIL_MAX_SEND_RATE', BULK_EMAIL_MAX_SEND_RATE)
+BULK_EMAIL_SEND_RATE_INCREASE = ENV_TOKENS.get('BULK_EMAIL_SEND_RATE_INCREASE', BULK_EMAIL_SEND_RATE_INCREASE)
 # We want Bulk Email running on the high-priority queue, so we define the
 # routing key that points to it. At the moment, the name is the same.
 # We have to reset the value here, since we have changed the value of the queue name.
@@ -272,7 +279,18 @@ VIRTUAL_UNIVERSITIES = ENV_TOKENS.get('VIRTUAL_UNIVERSITIES', [])
 META_UNIVERSITIES = ENV_TOKENS.get('META_UNIVERSITIES', {})
 COMMENTS_SERVICE_URL = ENV_TOKENS.get("COMMENTS_SERVICE_URL", '')
 COMMENTS_SERVICE_KEY = ENV_TOKENS.get("COMMENTS_SERVICE_KEY", '')
+COMMENTS_SERVICE_POOL_SIZE = ENV_TOKENS.get("COMMENTS_SERVICE_POOL_SIZE", COMMENTS_SERVICE_POOL_SIZE)
+COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS = ENV_TOKENS.get(
+    "COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS", COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS
+)
+COMMENTS_SERVICE_CACHE_TIMEOUT = ENV_TOKENS.get("COMMENTS_SERVICE_CACHE_TIMEOUT", COMMENTS_SERVICE_CACHE_TIMEOUT)
 CERT_QUEUE = ENV_TOKENS.get("CERT_QUEUE", 'test-pull')
+CERTIFICATE_GENERATION_STUDENTS_PER_TASK = ENV_TOKENS.get(
+    'CERTIFICATE_GENERATION_STUDENTS_PER_TASK', CERTIFICATE_GENERATION_STUDENTS_PER_TASK
+)
+CERTIFICATE_GENERATION_XQUEUE_CONCURRENCY = ENV_TOKENS.get(
+    'CERTIFICATE_GENERATION_XQUEUE_CONCURRENCY', CERTIFICATE_GENERATION_XQUEUE_CONCURRENCY
+)
 ZENDESK_URL = ENV_TOKENS.get("ZENDESK_URL")
 FEEDBACK_SUBMISSION_EMAIL = ENV_TOKENS.get("FEEDBACK_SUBMISSION_EMAIL")
 MKTG_URLS = ENV_TOKENS.get('MKTG_URLS', MKTG_URLS)
@@ -507,6 +525,7 @@ TRACKING_SEGMENTIO_DISALLOWED_SUBSTRING_NAMES = ENV_TOKENS.get(
     TRACKING_SEGMENTIO_DISALLOWED_SUBSTRING_NAMES
 )
 TRACKING_SEGMENTIO_SOURCE_MAP = ENV_TOKENS.get("TRACKING_SEGMENTIO_SOURCE_MAP", TRACKING_SEGMENTIO_SOURCE_MAP)
+TRACKING_EVENT_POLICIES = ENV_TOKENS.get("TRACKING_EVENT_POLICIES", TRACKING_EVENT_POLICIES)
 
 # Student identity verification settings
 VERIFY_STUDENT = AUTH_TOKENS.get("VERIFY_STUDENT", VERIFY_STUDENT)
@@ -715,6 +734,47 @@ LTI_AGGREGATE_SCORE_PASSBACK_DELAY = ENV_TOKENS.get(
 ##################### Credit Provider help link ####################
 CREDIT_HELP_LINK_URL = ENV_TOKENS.get('CREDIT_HELP_LINK_URL', CREDIT_HELP_LINK_URL)
 
+##################### User state ####################
+USER_STATE_CLIENT_CLASS = ENV_TOKENS.get('USER_STATE_CLIENT_CLASS', USER_STATE_CLIENT_CLASS)
+USER_STATE_BLOB_MAX_BLOCK_BYTES = ENV_TOKENS.get('USER_STATE_BLOB_MAX_BLOCK_BYTES', USER_STATE_BLOB_MAX_BLOCK_BYTES)
+USER_STATE_BLOB_ROW_BLOCK_TYPES = ENV_TOKENS.get('USER_STATE_BLOB_ROW_BLOCK_TYPES', USER_STATE_BLOB_ROW_BLOCK_TYPES)
+USER_STATE_WRITE_BEHIND_BLOCK_TYPES = ENV_TOKENS.get(
+    'USER_STATE_WRITE_BEHIND_BLOCK_TYPES', USER_STATE_WRITE_BEHIND_BLOCK_TYPES
+)
+
+##################### Class dashboard metrics ####################
+CLASS_DASHBOARD_METRICS_MAX_AGE = ENV_TOKENS.get('CLASS_DASHBOARD_METRICS_MAX_AGE', CLASS_DASHBOARD_METRICS_MAX_AGE)
+CLASS_DASHBOARD_METRICS_ACTIVE_DAYS = ENV_TOKENS.get(
+    'CLASS_DASHBOARD_METRICS_ACTIVE_DAYS', CLASS_DASHBOARD_METRICS_ACTIVE_DAYS
+)
+if FEATURES.get('CLASS_DASHBOARD_PRECOMPUTED_METRICS'):
+    CELERYBEAT_SCHEDULE['refresh-class-dashboard-metrics'] = {
+        'task': 'class_dashboard.tasks.refresh_stale_course_metrics',
+        'schedule': datetime.timedelta(seconds=CLASS_DASHBOARD_METRICS_MAX_AGE),
+    }
+
+##################### Student dashboard ####################
+DASHBOARD_PAYLOAD_CACHE_TIMEOUT = ENV_TOKENS.get('DASHBOARD_PAYLOAD_CACHE_TIMEOUT', DASHBOARD_PAYLOAD_CACHE_TIMEOUT)
+
+##################### Bulk enrollment ####################
+BULK_ENROLLMENT_THRESHOLD = ENV_TOKENS.get('BULK_ENROLLMENT_THRESHOLD', BULK_ENROLLMENT_THRESHOLD)
+BULK_ENROLLMENT_TASK_BATCH_SIZE = ENV_TOKENS.get('BULK_ENROLLMENT_TASK_BATCH_SIZE', BULK_ENROLLMENT_TASK_BATCH_SIZE)
+
+##################### Enrollment counts ####################
+ENROLLMENT_COUNTS_RECONCILE_PERIOD_HOURS = ENV_TOKENS.get(
+    'ENROLLMENT_COUNTS_RECONCILE_PERIOD_HOURS', ENROLLMENT_COUNTS_RECONCILE_PERIOD_HOURS
+)
+if ENROLLMENT_COUNTS_RECONCILE_PERIOD_HOURS is not None:
+    CELERYBEAT_SCHEDULE['reconcile-enrollment-counts'] = {
+        'task': 'student.tasks.reconcile_enrollment_counts',
+        'schedule': datetime.timedelta(hours=ENROLLMENT_COUNTS_RECONCILE_PERIOD_HOURS),
+    }
+
+##################### Teams ####################
+TEAMS_TOPIC_TEAM_COUNTS_CACHE_TIMEOUT = ENV_TOKENS.get(
+    'TEAMS_TOPIC_TEAM_COUNTS_CACHE_TIMEOUT', TEAMS_TOPIC_TEAM_COUNTS_CACHE_TIMEOUT
+)
+
 #### JWT configuration ####
 JWT_ISSUER = ENV_TOKENS.get('JWT_ISSUER', JWT_ISSUER)
 JWT_EXPIRATION = ENV_TOKENS.get('JWT_EXPIRATION', JWT_EXPIRATION)
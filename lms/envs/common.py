@@ -61,6 +61,14 @@ DISCUSSION_SETTINGS = {
     'MAX_COMMENT_DEPTH': 2,
 }
 
+# Maximum number of connections to the comments service that each process keeps
+# open, and the maximum number of requests that a view makes to it at the same time.
+COMMENTS_SERVICE_POOL_SIZE = 10
+COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS = 4
+# Number of seconds for which thread lists, threads and users read from the comments
+# service are cached, unless content of their course is written before.  0 disables it.
+COMMENTS_SERVICE_CACHE_TIMEOUT = 15
+
 
 # Features
 FEATURES = {
@@ -408,6 +416,25 @@ FEATURES = {
 
     # Enable LTI Provider feature.
     'ENABLE_LTI_PROVIDER': False,
+
+    # Write StudentModuleHistory entries from a celery task rather than
+    # inside the request that changed the student's state.
+    'ENABLE_ASYNC_STUDENT_MODULE_HISTORY': False,
+
+    # Serve answer distributions from counts that are updated as students
+    # submit problems, rather than scanning all student state on each request.
+    # Run the rebuild_answer_counts management command before enabling this.
+    'ENABLE_ANSWER_DISTRIBUTION_COUNTS': False,
+
+    # Serve the Metrics tab of the Instructor Dashboard from summaries that
+    # are refreshed by celery tasks, rather than aggregating StudentModule on
+    # each request.
+    'CLASS_DASHBOARD_PRECOMPUTED_METRICS': False,
+
+    # Render the student dashboard from a cached payload of each user's
+    # enrollments, certificate statuses and email opt-outs, which is
+    # invalidated when any of them change.
+    'ENABLE_DASHBOARD_PAYLOAD_CACHE': False,
 }
 
 # Ignore static asset files on import which match this pattern
@@ -653,7 +680,13 @@ EVENT_TRACKING_BACKENDS = {
         }
     }
 }
-EVENT_TRACKING_PROCESSORS = []
+EVENT_TRACKING_PROCESSORS = [
+    {'ENGINE': 'track.policy.EventPolicyProcessor'},
+]
+
+# Sampling rates, per-user rate limits and aggregation of repeated events,
+# by event type. See track.policy for the options.
+TRACKING_EVENT_POLICIES = {}
 
 # Backwards compatibility with ENABLE_SQL_TRACKING_LOGS feature flag.
 # In the future, adding the backend to TRACKING_BACKENDS should be enough.
@@ -1162,7 +1195,15 @@ MIDDLEWARE_CLASSES = (
     # 'django.middleware.locale.LocaleMiddleware',
     'django_locale.middleware.LocaleMiddleware',
 
+    # Must be before TransactionMiddleware, so that cached data is invalidated
+    # again once the request's transaction is committed.
+    'util.middleware.AfterCommitMiddleware',
     'django.middleware.transaction.TransactionMiddleware',
+
+    # Must be after TransactionMiddleware, so that deferred user state is
+    # written inside the request's transaction.
+    'courseware.middleware.UserStateWriteBehindMiddleware',
+
     # 'debug_toolbar.middleware.DebugToolbarMiddleware',
 
     'django_comment_client.utils.ViewNameMiddleware',
@@ -1747,11 +1788,27 @@ BULK_EMAIL_JOB_SIZE_THRESHOLD = 100
 # a bulk email message.
 BULK_EMAIL_LOG_SENT_EMAILS = False
 
-# Delay in seconds to sleep between individual mail messages being sent,
-# when a bulk email task is retried for rate-related reasons.  Choose this
-# value depending on the number of workers that might be sending email in
+# Maximum number of messages that each bulk email subtask has in flight at
+# the same time.  Each message in flight is sent over its own connection.
+BULK_EMAIL_MAX_IN_FLIGHT = 4
+
+# Time in seconds that a worker keeps an idle email connection open, so that
+# the next subtask can use it instead of connecting and authenticating again.
+BULK_EMAIL_CONNECTION_MAX_IDLE_TIME = 60
+
+# Number of times a message that is throttled by the email service is sent
+# again, at a lower rate, before its subtask is retried for rate-related reasons.
+BULK_EMAIL_MAX_THROTTLE_RETRIES = 5
+
+# Once a worker has been throttled, the rate (in messages per second) at which
+# it sends email is halved each time it is throttled again, down to
+# BULK_EMAIL_MIN_SEND_RATE, and is raised by BULK_EMAIL_SEND_RATE_INCREASE for
+# each message sent, until it reaches BULK_EMAIL_MAX_SEND_RATE.  Choose these
+# values depending on the number of workers that might be sending email in
 # parallel, and what the SES rate is.
-BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS = 0.02
+BULK_EMAIL_MIN_SEND_RATE = 1
+BULK_EMAIL_MAX_SEND_RATE = 50
+BULK_EMAIL_SEND_RATE_INCREASE = 0.1
 
 ############################# Email Opt In ####################################
 
@@ -1829,6 +1886,7 @@ INSTALLED_APPS = (
     'certificates',
     'dashboard',
     'instructor',
+    'class_dashboard',
     'instructor_task',
     'open_ended_grading',
     'psychometrics',
@@ -2123,8 +2181,6 @@ VERIFY_STUDENT = {
 
 ### This enables the Metrics tab for the Instructor dashboard ###########
 FEATURES['CLASS_DASHBOARD'] = False
-if FEATURES.get('CLASS_DASHBOARD'):
-    INSTALLED_APPS += ('class_dashboard',)
 
 ################ Enable credit eligibility feature ####################
 ENABLE_CREDIT_ELIGIBILITY = True
@@ -2176,6 +2232,13 @@ REGISTRATION_EXTRA_FIELDS = {
 CERT_NAME_SHORT = "Certificate"
 CERT_NAME_LONG = "Certificate of Achievement"
 
+########################## CERTIFICATE GENERATION ########################
+# When more students than this need certificates, the certificate generation
+# task hands them to subtasks that each handle this many students.
+CERTIFICATE_GENERATION_STUDENTS_PER_TASK = 100
+# The number of certificate requests each subtask sends to the XQueue at once.
+CERTIFICATE_GENERATION_XQUEUE_CONCURRENCY = 4
+
 #################### Badgr OpenBadges generation #######################
 # Be sure to set up images for course modes using the BadgeImageConfiguration model in the certificates app.
 BADGR_API_TOKEN = None
@@ -2670,6 +2733,68 @@ LTI_USER_EMAIL_DOMAIN = 'lti.example.com'
 # The time value is in seconds.
 LTI_AGGREGATE_SCORE_PASSBACK_DELAY = 15 * 60
 
+############################ USER STATE ##############################
+
+# The XBlockUserStateClient that stores XBlock Scope.user_state data. Use
+# 'courseware.user_state_blob_client.BlobXBlockUserStateClient' to keep each
+# learner's state for a course in one compressed row.
+USER_STATE_CLIENT_CLASS = 'courseware.user_state_client.DjangoXBlockUserStateClient'
+
+# XBlock user state writes for these block types are coalesced and written in
+# a batch at the end of each request, rather than immediately. Types that are
+# written often but aren't graded, like ('sequential', 'video'), benefit most.
+USER_STATE_WRITE_BEHIND_BLOCK_TYPES = ()
+
+# BlobXBlockUserStateClient stores the state of blocks larger than this many
+# bytes (serialized) as StudentModule rows rather than in the per-course blob.
+USER_STATE_BLOB_MAX_BLOCK_BYTES = 64 * 1024
+
+# BlobXBlockUserStateClient always stores the state of these block types as
+# StudentModule rows, which keep their history and are read by grading and
+# reporting code.
+USER_STATE_BLOB_ROW_BLOCK_TYPES = ('problem',)
+
+# Retry policy for the task that writes StudentModuleHistory when
+# FEATURES['ENABLE_ASYNC_STUDENT_MODULE_HISTORY'] is set.
+STUDENT_MODULE_HISTORY_TASK_RETRY_DELAY = 30
+STUDENT_MODULE_HISTORY_TASK_MAX_RETRIES = 5
+
+# Number of seconds after which the precomputed class dashboard metrics for a
+# course are recomputed, when FEATURES['CLASS_DASHBOARD_PRECOMPUTED_METRICS'] is set.
+CLASS_DASHBOARD_METRICS_MAX_AGE = 60 * 60
+
+# The periodic refresh only recomputes the metrics of courses whose metrics
+# have been viewed in this many days.
+CLASS_DASHBOARD_METRICS_ACTIVE_DAYS = 7
+
+# Number of seconds the dashboard payload of a user is cached for, when
+# FEATURES['ENABLE_DASHBOARD_PAYLOAD_CACHE'] is set. The payload is also
+# invalidated whenever the data in it changes.
+DASHBOARD_PAYLOAD_CACHE_TIMEOUT = 15 * 60
+
+############################ BULK ENROLLMENT ##############################
+
+# Instructor dashboard requests that enroll more than this many students are
+# processed with bulk queries, and send their enrollment events and emails
+# asynchronously.
+BULK_ENROLLMENT_THRESHOLD = 100
+
+# Number of students whose enrollment events or emails are sent by each of
+# the tasks of a bulk enrollment.
+BULK_ENROLLMENT_TASK_BATCH_SIZE = 500
+
+# Number of hours between the periodic recomputations of the enrollment counts
+# of courses from the enrollment table, which correct any drift in the counts
+# maintained as enrollments change. None disables them.
+ENROLLMENT_COUNTS_RECONCILE_PERIOD_HOURS = 24
+
+################################## TEAMS ##################################
+
+# Number of seconds for which the number of teams of each topic of a course is
+# cached, unless a team of the course is created, deleted or moved before.
+# 0 disables the cache.
+TEAMS_TOPIC_TEAM_COUNTS_CACHE_TIMEOUT = 60 * 60
+
 # Number of seconds before JWT tokens expire
 JWT_EXPIRATION = 30
 JWT_ISSUER = None
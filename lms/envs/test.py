@@ -52,6 +52,12 @@ FEATURES['DISABLE_START_DATES'] = True
 # to reload. For consistency in user-experience, keep the value of this setting in sync with
 # the one in cms/envs/test.py
 FEATURES['ENABLE_DISCUSSION_SERVICE'] = False
+# Make requests to the comments service one at a time, so that tests can check their order.
+COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS = 1
+# Don't cache responses of the comments service, so that tests can mock each request.
+COMMENTS_SERVICE_CACHE_TIMEOUT = 0
+# Don't cache the discussion modules of courses, which tests change without publishing new versions of them.
+DISCUSSION_SETTINGS['DISCUSSION_MODULES_CACHE_TIMEOUT'] = 0
 
 FEATURES['ENABLE_SERVICE_STATUS'] = True
 
@@ -129,6 +135,13 @@ XQUEUE_WAITTIME_BETWEEN_REQUESTS = 5  # seconds
 MOCK_STAFF_GRADING = True
 MOCK_PEER_GRADING = True
 
+# Send bulk email from the task's own thread, over connections that aren't kept
+# between tasks, so that tests can mock the connections of each task.
+BULK_EMAIL_MAX_IN_FLIGHT = 1
+BULK_EMAIL_CONNECTION_MAX_IDLE_TIME = 0
+# Retry the subtask as soon as a message is throttled.
+BULK_EMAIL_MAX_THROTTLE_RETRIES = 0
+
 ############################ STATIC FILES #############################
 
 # TODO (cpennington): We need to figure out how envs/test.py can inject things
@@ -490,6 +503,8 @@ FEATURES['ENABLE_EDXNOTES'] = True
 
 # Enable teams feature for tests.
 FEATURES['ENABLE_TEAMS'] = True
+# Don't cache team counts, which are kept from one test to the next for teams of the same course.
+TEAMS_TOPIC_TEAM_COUNTS_CACHE_TIMEOUT = 0
 
 # Add milestones to Installed apps for testing
 INSTALLED_APPS += ('milestones', 'openedx.core.djangoapps.call_stack_manager')
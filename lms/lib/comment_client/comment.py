@@ -62,7 +62,8 @@ class Comment(models.Model):
             url,
             params,
             metric_tags=self._metric_tags,
-            metric_action='comment.abuse.flagged'
+            metric_action='comment.abuse.flagged',
+            course_id=voteable.get('course_id'),
         )
         voteable._update_from_response(response)
 
@@ -83,7 +84,8 @@ class Comment(models.Model):
             url,
             params,
             metric_tags=self._metric_tags,
-            metric_action='comment.abuse.unflagged'
+            metric_action='comment.abuse.unflagged',
+            course_id=voteable.get('course_id'),
         )
         voteable._update_from_response(response)
 
@@ -73,7 +73,9 @@ class Model(object):
             url,
             self.default_retrieve_params,
             metric_tags=self._metric_tags,
-            metric_action='model.retrieve'
+            metric_action='model.retrieve',
+            cached=True,
+            course_id=self.get('course_id'),
         )
         self._update_from_response(response)
 
@@ -133,7 +135,8 @@ class Model(object):
                 url,
                 self.updatable_attributes(),
                 metric_tags=self._metric_tags,
-                metric_action='model.update'
+                metric_action='model.update',
+                course_id=self.get('course_id'),
             )
         else:   # otherwise, treat this as an insert
             url = self.url(action='post', params=self.attributes)
@@ -142,7 +145,8 @@ class Model(object):
                 url,
                 self.initializable_attributes(),
                 metric_tags=self._metric_tags,
-                metric_action='model.insert'
+                metric_action='model.insert',
+                course_id=self.get('course_id'),
             )
         self.retrieved = True
         self._update_from_response(response)
@@ -150,7 +154,13 @@ class Model(object):
 
     def delete(self):
         url = self.url(action='delete', params=self.attributes)
-        response = perform_request('delete', url, metric_tags=self._metric_tags, metric_action='model.delete')
+        response = perform_request(
+            'delete',
+            url,
+            metric_tags=self._metric_tags,
+            metric_action='model.delete',
+            course_id=self.get('course_id'),
+        )
         self.retrieved = True
         self._update_from_response(response)
 
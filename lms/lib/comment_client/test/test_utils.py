@@ -0,0 +1,161 @@
+"""
+Tests of the comments service client utilities
+"""
+import threading
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils.translation import get_language, override
+from mock import Mock, patch
+
+from lms.lib.comment_client import utils
+from lms.lib.comment_client.utils import (
+    CommentClientRequestError, invalidate_cached_responses, perform_request, run_concurrently
+)
+
+
+def _response(text='{}', status_code=200):
+    """Return a mock comments service response."""
+    return Mock(status_code=status_code, text=text, json=Mock(return_value={}))
+
+
+@patch('lms.lib.comment_client.utils.requests.Session.request')
+class PerformRequestTest(TestCase):
+    """Tests of perform_request"""
+
+    def test_shared_session(self, mock_request):
+        mock_request.return_value = _response()
+        perform_request('get', 'http://localhost:4567/api/v1/threads', {'course_id': 'a/b/c'})
+        perform_request('post', 'http://localhost:4567/api/v1/threads', {'body': 'text'})
+        self.assertEqual(mock_request.call_count, 2)
+        self.assertIn('http://', utils.SESSION.adapters)
+
+    def test_coalesce_identical_gets(self, mock_request):
+        # The first request is answered once the second one is waiting for it.
+        coalesced = threading.Event()
+        mock_request.side_effect = lambda *args, **kwargs: coalesced.wait(5) and _response()
+
+        def increment(metric, *args, **kwargs):  # pylint: disable=unused-argument
+            """Notice when a request waits for the first one."""
+            if metric == 'comment_client.request.coalesced':
+                coalesced.set()
+
+        results = []
+        url = 'http://localhost:4567/api/v1/threads/1'
+        with patch('lms.lib.comment_client.utils.dog_stats_api.increment', side_effect=increment):
+            threads = [
+                threading.Thread(target=lambda: results.append(perform_request('get', url, {'user_id': '1'})))
+                for __ in range(2)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(results, [{}, {}])
+        self.assertEqual(mock_request.call_count, 1)
+        self.assertEqual(utils._in_flight_requests, {})  # pylint: disable=protected-access
+
+
+@patch('lms.lib.comment_client.utils.CACHE_TIMEOUT', 15)
+@patch('lms.lib.comment_client.utils.requests.Session.request')
+class CachedRequestTest(TestCase):
+    """Tests of perform_request with cached responses"""
+
+    url = 'http://localhost:4567/api/v1/threads'
+
+    def setUp(self):
+        super(CachedRequestTest, self).setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def get(self, params, course_id='a/b/c'):
+        """Make a cached GET request."""
+        return perform_request('get', self.url, params, cached=True, course_id=course_id)
+
+    def test_cached(self, mock_request):
+        mock_request.return_value = _response()
+        self.assertEqual(self.get({'course_id': 'a/b/c', 'group_id': 1}), {})
+        self.assertEqual(self.get({'group_id': 1, 'course_id': 'a/b/c'}), {})
+        self.assertEqual(mock_request.call_count, 1)
+
+        # Other groups get their own responses.
+        self.get({'course_id': 'a/b/c', 'group_id': 2})
+        self.assertEqual(mock_request.call_count, 2)
+
+    def test_not_cached(self, mock_request):
+        mock_request.return_value = _response()
+        for __ in range(2):
+            perform_request('get', self.url, {'course_id': 'a/b/c'})
+        self.assertEqual(mock_request.call_count, 2)
+
+    def test_errors_not_cached(self, mock_request):
+        mock_request.return_value = _response(status_code=404)
+        for __ in range(2):
+            with self.assertRaises(CommentClientRequestError):
+                self.get({'course_id': 'a/b/c'})
+        self.assertEqual(mock_request.call_count, 2)
+
+    def test_invalidated_by_write(self, mock_request):
+        mock_request.return_value = _response()
+        self.get({'course_id': 'a/b/c'})
+        self.get({'course_id': 'x/y/z'}, course_id='x/y/z')
+        self.get({'user_id': '1'}, course_id=None)
+        perform_request('post', self.url, {'body': 'text'}, course_id='a/b/c')
+        mock_request.reset_mock()
+
+        self.get({'course_id': 'a/b/c'})
+        self.get({'course_id': 'x/y/z'}, course_id='x/y/z')
+        self.get({'user_id': '1'}, course_id=None)
+        requested = [kwargs['params'].get('course_id') for __, kwargs in mock_request.call_args_list]
+        self.assertEqual(requested, ['a/b/c', None])
+
+    def test_invalidated_after_write(self, mock_request):
+        def post(*args, **kwargs):  # pylint: disable=unused-argument
+            """Cache a response while the write is in flight."""
+            mock_request.side_effect = None
+            self.get({'course_id': 'a/b/c'})
+            return _response()
+
+        mock_request.return_value = _response()
+        mock_request.side_effect = post
+        perform_request('post', self.url, {'body': 'text'}, course_id='a/b/c')
+        self.get({'course_id': 'a/b/c'})
+        self.assertEqual(mock_request.call_count, 3)
+
+    def test_invalidate_all(self, mock_request):
+        mock_request.return_value = _response()
+        self.get({'course_id': 'a/b/c'})
+        invalidate_cached_responses()
+        self.get({'course_id': 'a/b/c'})
+        self.assertEqual(mock_request.call_count, 2)
+
+
+@patch('lms.lib.comment_client.utils.MAX_CONCURRENT_REQUESTS', 3)
+class RunConcurrentlyTest(TestCase):
+    """Tests of run_concurrently"""
+
+    def test_results_in_order(self):
+        def call(result):
+            """Return `result`, the active language and the current thread."""
+            return result, get_language(), threading.current_thread()
+
+        with override('fr'):
+            results = run_concurrently(*[lambda result=result: call(result) for result in range(3)])
+        self.assertEqual([result[:2] for result in results], [(0, 'fr'), (1, 'fr'), (2, 'fr')])
+        self.assertNotIn(threading.current_thread(), [result[2] for result in results])
+
+    def test_raises_first_error(self):
+        def fail():
+            """Fail with a comments service error."""
+            raise CommentClientRequestError('not found', 404)
+
+        with self.assertRaises(CommentClientRequestError):
+            run_concurrently(lambda: 1, fail, lambda: 2)
+
+    def test_sequential(self):
+        calls = []
+        with patch('lms.lib.comment_client.utils.MAX_CONCURRENT_REQUESTS', 1):
+            results = run_concurrently(lambda: calls.append(threading.current_thread()) or 1)
+        self.assertEqual(results, [1])
+        self.assertEqual(calls, [threading.current_thread()])
@@ -63,7 +63,9 @@ class Thread(models.Model):
             params,
             metric_tags=[u'course_id:{}'.format(query_params['course_id'])],
             metric_action='thread.search',
-            paged_results=True
+            paged_results=True,
+            cached=True,
+            course_id=query_params['course_id'],
         )
         if query_params.get('text'):
             search_query = query_params['text']
@@ -136,7 +138,10 @@ class Thread(models.Model):
             url,
             request_params,
             metric_action='model.retrieve',
-            metric_tags=self._metric_tags
+            metric_tags=self._metric_tags,
+            # Marking the thread as read is a side effect of the request.
+            cached=not request_params['mark_as_read'],
+            course_id=self.get('course_id'),
         )
         self._update_from_response(response)
 
@@ -153,7 +158,8 @@ class Thread(models.Model):
             url,
             params,
             metric_action='thread.abuse.flagged',
-            metric_tags=self._metric_tags
+            metric_tags=self._metric_tags,
+            course_id=voteable.get('course_id'),
         )
         voteable._update_from_response(response)
 
@@ -174,7 +180,8 @@ class Thread(models.Model):
             url,
             params,
             metric_tags=self._metric_tags,
-            metric_action='thread.abuse.unflagged'
+            metric_action='thread.abuse.unflagged',
+            course_id=voteable.get('course_id'),
         )
         voteable._update_from_response(response)
 
@@ -186,7 +193,8 @@ class Thread(models.Model):
             url,
             params,
             metric_tags=self._metric_tags,
-            metric_action='thread.pin'
+            metric_action='thread.pin',
+            course_id=self.get('course_id'),
         )
         self._update_from_response(response)
 
@@ -198,7 +206,8 @@ class Thread(models.Model):
             url,
             params,
             metric_tags=self._metric_tags,
-            metric_action='thread.unpin'
+            metric_action='thread.unpin',
+            course_id=self.get('course_id'),
         )
         self._update_from_response(response)
 
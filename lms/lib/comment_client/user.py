@@ -37,6 +37,7 @@ class User(models.Model):
             params,
             metric_action='user.follow',
             metric_tags=self._metric_tags + ['target.type:{}'.format(source.type)],
+            course_id=source.get('course_id'),
         )
 
     def unfollow(self, source):
@@ -47,6 +48,7 @@ class User(models.Model):
             params,
             metric_action='user.unfollow',
             metric_tags=self._metric_tags + ['target.type:{}'.format(source.type)],
+            course_id=source.get('course_id'),
         )
 
     def vote(self, voteable, value):
@@ -63,6 +65,7 @@ class User(models.Model):
             params,
             metric_action='user.vote',
             metric_tags=self._metric_tags + ['target.type:{}'.format(voteable.type)],
+            course_id=voteable.get('course_id'),
         )
         voteable._update_from_response(response)
 
@@ -80,6 +83,7 @@ class User(models.Model):
             params,
             metric_action='user.unvote',
             metric_tags=self._metric_tags + ['target.type:{}'.format(voteable.type)],
+            course_id=voteable.get('course_id'),
         )
         voteable._update_from_response(response)
 
@@ -130,6 +134,8 @@ class User(models.Model):
                 retrieve_params,
                 metric_action='model.retrieve',
                 metric_tags=self._metric_tags,
+                cached=True,
+                course_id=retrieve_params.get('course_id'),
             )
         except CommentClientRequestError as e:
             if e.status_code == 404:
@@ -1,14 +1,53 @@
 from contextlib import contextmanager
 import dogstats_wrapper as dog_stats_api
+import hashlib
 import logging
+import os
+import threading
+from multiprocessing.pool import ThreadPool
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.core.cache import cache
 from time import time
 from uuid import uuid4
+from django.utils import translation
 from django.utils.translation import get_language
 
 log = logging.getLogger(__name__)
 
+# Maximum number of connections to the comments service that each process keeps
+# open, and uses at the same time.
+POOL_SIZE = getattr(settings, "COMMENTS_SERVICE_POOL_SIZE", 10)
+
+# Maximum number of requests that a view can make to the comments service at the
+# same time with run_concurrently.  With 1, the requests are made one at a time.
+MAX_CONCURRENT_REQUESTS = getattr(settings, "COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS", 4)
+
+# The session is shared by all requests to the comments service, so that they
+# reuse connections instead of connecting for each request.
+SESSION = requests.Session()
+SESSION.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, pool_block=True))
+SESSION.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, pool_block=True))
+_connection_slots = threading.BoundedSemaphore(POOL_SIZE)
+
+# GET requests that are in flight, by the key of their url, parameters and headers.
+_in_flight_requests = {}
+_in_flight_requests_lock = threading.Lock()
+
+# Number of seconds for which the responses of read-only requests made with
+# cached=True are cached.  With 0, the responses are not cached.
+CACHE_TIMEOUT = getattr(settings, "COMMENTS_SERVICE_CACHE_TIMEOUT", 15)
+
+# Cached responses are keyed by the versions of their course, or of the
+# responses without a course, and of all responses, which writes increment.
+GLOBAL_CACHE_VERSION_KEY = 'comment_client.cache_version'
+UNSCOPED_CACHE_VERSION_KEY = 'comment_client.cache_version.unscoped'
+
+_thread_pool = None
+_thread_pool_pid = None
+_thread_pool_lock = threading.Lock()
+
 
 def strip_none(dic):
     return dict([(k, v) for k, v in dic.iteritems() if v is not None])
@@ -31,27 +70,179 @@ def merge_dict(dic1, dic2):
     return dict(dic1.items() + dic2.items())
 
 
+def _course_cache_version_key(course_id):
+    """Returns the cache key of the version of the cached responses of `course_id`."""
+    if hasattr(course_id, 'to_deprecated_string'):
+        course_id = course_id.to_deprecated_string()
+    return u'comment_client.cache_version.course.{}'.format(course_id).encode('utf-8')
+
+
+def _response_cache_key(url, params, course_id):
+    """
+    Returns the cache key of the response to a GET request of `url` with
+    `params`, which include the ids of the requesting user and their group
+    where the response depends on them.
+    """
+    scope_key = UNSCOPED_CACHE_VERSION_KEY if course_id is None else _course_cache_version_key(course_id)
+    versions = cache.get_many([GLOBAL_CACHE_VERSION_KEY, scope_key])
+    key = repr((
+        versions.get(GLOBAL_CACHE_VERSION_KEY, 0),
+        versions.get(scope_key, 0),
+        url,
+        sorted(params.items()),
+        get_language(),
+    ))
+    return 'comment_client.response.{}'.format(hashlib.md5(key.encode('utf-8')).hexdigest())
+
+
+def _increment_cache_version(key):
+    """Increments the cache version stored at `key`."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The version hasn't been stored yet, or was evicted.
+        cache.set(key, int(time() * 1000))
+
+
+def invalidate_cached_responses(course_id=None):
+    """
+    Invalidates the cached responses of `course_id`, and those without a
+    course, which may include content of the course.  Without `course_id`,
+    invalidates all cached responses.
+    """
+    if not CACHE_TIMEOUT:
+        return
+    if course_id is None:
+        _increment_cache_version(GLOBAL_CACHE_VERSION_KEY)
+    else:
+        _increment_cache_version(_course_cache_version_key(course_id))
+        _increment_cache_version(UNSCOPED_CACHE_VERSION_KEY)
+
+
 @contextmanager
 def request_timer(request_id, method, url, tags=None):
+    """
+    Times a request, including the time spent waiting for one of the POOL_SIZE
+    connections to the comments service, which is reported separately.
+    """
     start = time()
     with dog_stats_api.timer('comment_client.request.time', tags=tags):
-        yield
+        _connection_slots.acquire()
+        pool_wait = time() - start
+        try:
+            yield
+        finally:
+            _connection_slots.release()
     end = time()
     duration = end - start
 
+    dog_stats_api.histogram('comment_client.request.pool_wait', value=pool_wait, tags=tags)
     log.info(
         u"comment_client_request_log: request_id={request_id}, method={method}, "
-        u"url={url}, duration={duration}".format(
+        u"url={url}, duration={duration}, pool_wait={pool_wait}".format(
             request_id=request_id,
             method=method,
             url=url,
-            duration=duration
+            duration=duration,
+            pool_wait=pool_wait
         )
     )
 
 
+class _InFlightRequest(object):
+    """A GET request to the comments service that other callers can wait for."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.exception = None
+
+
+def _coalesce(key, send_request, metric_tags):
+    """
+    Returns the response of `send_request`, unless an identical request with
+    `key` is already in flight, in which case returns its response instead.
+    """
+    with _in_flight_requests_lock:
+        in_flight = _in_flight_requests.get(key)
+        is_first = in_flight is None
+        if is_first:
+            in_flight = _in_flight_requests[key] = _InFlightRequest()
+
+    if not is_first:
+        dog_stats_api.increment('comment_client.request.coalesced', tags=metric_tags)
+        in_flight.done.wait()
+        if in_flight.exception is not None:
+            raise in_flight.exception  # pylint: disable=raising-bad-type
+        return in_flight.response
+
+    try:
+        in_flight.response = send_request()
+    except Exception as exception:
+        in_flight.exception = exception
+        raise
+    finally:
+        with _in_flight_requests_lock:
+            del _in_flight_requests[key]
+        in_flight.done.set()
+    return in_flight.response
+
+
+def _get_thread_pool():
+    """Returns the thread pool of the current process for run_concurrently."""
+    global _thread_pool, _thread_pool_pid  # pylint: disable=global-statement
+    with _thread_pool_lock:
+        # A pool that was started before the process forked has no threads in this process.
+        if _thread_pool is None or _thread_pool_pid != os.getpid():
+            _thread_pool = ThreadPool(MAX_CONCURRENT_REQUESTS)
+            _thread_pool_pid = os.getpid()
+        return _thread_pool
+
+
+def run_concurrently(*calls):
+    """
+    Calls each of `calls`, functions without arguments that make requests to
+    the comments service, with up to MAX_CONCURRENT_REQUESTS of them running
+    at the same time, and returns a list of their results.
+
+    If any of them raised an exception, the exception of the first one is
+    raised.  The functions are run in other threads, with the current
+    language active, so they must not use the database or other state of the
+    current thread.
+    """
+    if MAX_CONCURRENT_REQUESTS <= 1 or len(calls) <= 1:
+        return [call() for call in calls]
+
+    language = get_language()
+
+    def run(call):
+        """Calls `call`, and returns whether it succeeded and its result or exception."""
+        translation.activate(language)
+        try:
+            return True, call()
+        except Exception as exception:  # pylint: disable=broad-except
+            return False, exception
+        finally:
+            translation.deactivate()
+
+    results = []
+    for succeeded, result in _get_thread_pool().map(run, calls):
+        if not succeeded:
+            raise result  # pylint: disable=raising-bad-type
+        results.append(result)
+    return results
+
+
 def perform_request(method, url, data_or_params=None, raw=False,
-                    metric_action=None, metric_tags=None, paged_results=False):
+                    metric_action=None, metric_tags=None, paged_results=False,
+                    cached=False, course_id=None):
+    """
+    Makes a request to the comments service, and returns its response.
+
+    The responses of GET requests with `cached` are cached for CACHE_TIMEOUT
+    seconds, until a request of another method invalidates them.  `course_id`
+    is the course of the content of the request if it's known, to which the
+    invalidation is limited.  Only requests without side effects may be cached.
+    """
 
     if metric_tags is None:
         metric_tags = []
@@ -62,6 +253,14 @@ def perform_request(method, url, data_or_params=None, raw=False,
 
     if data_or_params is None:
         data_or_params = {}
+
+    cache_key = None
+    if cached and method == 'get' and not raw and CACHE_TIMEOUT:
+        cache_key = _response_cache_key(url, data_or_params, course_id)
+        data = cache.get(cache_key)
+        if data is not None:
+            dog_stats_api.increment('comment_client.request.cached', tags=metric_tags)
+            return data
     headers = {
         'X-Edx-Api-Key': getattr(settings, "COMMENTS_SERVICE_KEY", None),
         'Accept-Language': get_language(),
@@ -75,15 +274,32 @@ def perform_request(method, url, data_or_params=None, raw=False,
     else:
         data = None
         params = merge_dict(data_or_params, request_id_dict)
-    with request_timer(request_id, method, url, metric_tags):
-        response = requests.request(
-            method,
-            url,
-            data=data,
-            params=params,
-            headers=headers,
-            timeout=5
-        )
+
+    def send_request():
+        """Sends the request over a pooled connection."""
+        with request_timer(request_id, method, url, metric_tags):
+            return SESSION.request(
+                method,
+                url,
+                data=data,
+                params=params,
+                headers=headers,
+                timeout=5
+            )
+
+    if method == 'get':
+        # The request id differs for each request, so it's not part of the key.
+        key = (url, repr(sorted(data_or_params.items())), repr(sorted(headers.items())))
+        response = _coalesce(key, send_request, metric_tags)
+    else:
+        # Responses cached by concurrent reads while the write is in flight may
+        # predate it, so they're invalidated once it's done too, even if it
+        # failed, since it may have been applied.
+        invalidate_cached_responses(course_id)
+        try:
+            response = send_request()
+        finally:
+            invalidate_cached_responses(course_id)
 
     metric_tags.append(u'status_code:{}'.format(response.status_code))
     if response.status_code > 200:
@@ -129,6 +345,8 @@ def perform_request(method, url, data_or_params=None, raw=False,
                     value=data.get('num_pages', 1),
                     tags=metric_tags
                 )
+            if cache_key is not None:
+                cache.set(cache_key, data, CACHE_TIMEOUT)
             return data
 
 
@@ -2,9 +2,11 @@
 Command to load course overviews.
 """
 import logging
+from multiprocessing.pool import ThreadPool
 from optparse import make_option
 
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import CourseKey
 from xmodule.modulestore.django import modulestore
@@ -19,6 +21,7 @@ class Command(BaseCommand):
     """
     Example usage:
         $ ./manage.py lms generate_course_overview --all --settings=devstack
+        $ ./manage.py lms generate_course_overview --all --workers=8 --settings=devstack
         $ ./manage.py lms generate_course_overview 'edX/DemoX/Demo_Course' --settings=devstack
     """
     args = '<course_id course_id ...>'
@@ -29,6 +32,15 @@ class Command(BaseCommand):
                     action='store_true',
                     default=False,
                     help='Generate course overview for all courses.'),
+        make_option('--workers',
+                    type='int',
+                    default=1,
+                    help='Number of threads that load courses from the modulestore at the same time.'),
+        make_option('--chunk-size',
+                    type='int',
+                    default=20,
+                    dest='chunk_size',
+                    help='Number of courses whose overviews each thread generates at once.'),
     )
 
     def handle(self, *args, **options):
@@ -50,11 +62,46 @@ class Command(BaseCommand):
         log.info('Generating course overview for %d courses.', len(course_keys))
         log.debug('Generating course overview(s) for the following courses: %s', course_keys)
 
-        for course_key in course_keys:
+        chunk_size = options.get('chunk_size', 20)
+        chunks = [course_keys[start:start + chunk_size] for start in xrange(0, len(course_keys), chunk_size)]
+        workers = options.get('workers', 1)
+        if workers > 1:
+            pool = ThreadPool(workers)
+            try:
+                pool.map(_generate_course_overviews_in_thread, chunks)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for chunk in chunks:
+                _generate_course_overviews(chunk)
+
+        log.info('Finished generating course overviews.')
+
+
+def _generate_course_overviews(course_keys):
+    """
+    Generate the overviews of `course_keys` that don't exist yet.
+    """
+    course_overviews = CourseOverview.get_from_ids(course_keys)
+    for course_key in course_keys:
+        if course_overviews.get(course_key) is None:
+            # Load the course again to log why it couldn't be loaded.
             try:
                 CourseOverview.get_from_id(course_key)
             except Exception as ex:  # pylint: disable=broad-except
                 log.exception('An error occurred while generating course overview for %s: %s', unicode(
                     course_key), ex.message)
 
-        log.info('Finished generating course overviews.')
+
+def _generate_course_overviews_in_thread(course_keys):
+    """
+    Generate the overviews of `course_keys` in a thread of the pool, closing
+    the thread's database connection when done.
+    """
+    try:
+        _generate_course_overviews(course_keys)
+    except Exception:  # pylint: disable=broad-except
+        log.exception('An error occurred while generating course overviews.')
+    finally:
+        connection.close()
@@ -47,6 +47,16 @@ class TestGenerateCourseOverview(ModuleStoreTestCase):
         # CourseOverview will be populated with all courses in the modulestore
         self._assert_courses_in_overview(self.course_key_1, self.course_key_2)
 
+    def test_generate_all_in_chunks(self):
+        """
+        Test that courses are loaded into course overviews in chunks.
+        """
+        self._assert_courses_not_in_overview(self.course_key_1, self.course_key_2)
+        with patch.object(CourseOverview, 'get_from_ids', wraps=CourseOverview.get_from_ids) as mock_get_from_ids:
+            self.command.handle(all=True, chunk_size=1)
+        self.assertEqual(mock_get_from_ids.call_count, 2)
+        self._assert_courses_in_overview(self.course_key_1, self.course_key_2)
+
     def test_generate_one(self):
         """
         Test that a specified course is loaded into course overviews.
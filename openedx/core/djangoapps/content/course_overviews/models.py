@@ -2,6 +2,8 @@
 Declaration of CourseOverview model
 """
 import json
+import logging
+
 from django.db import models
 
 from django.db.models.fields import BooleanField, DateTimeField, DecimalField, TextField, FloatField, IntegerField
@@ -22,6 +24,9 @@ from xmodule_django.models import CourseKeyField, UsageKeyField
 from ccx_keys.locator import CCXLocator
 
 
+log = logging.getLogger(__name__)
+
+
 class CourseOverview(TimeStampedModel):
     """
     Model for storing and caching basic information about a course.
@@ -171,28 +176,44 @@ class CourseOverview(TimeStampedModel):
             - IOError if some other error occurs while trying to load the
                 course from the module store.
         """
+        course_overview, tabs = cls._load_course(course_id)
+        try:
+            course_overview.save()
+            CourseOverviewTab.objects.bulk_create(tabs)
+        except IntegrityError:
+            # There is a rare race condition that will occur if
+            # CourseOverview.get_from_id is called while a
+            # another identical overview is already in the process
+            # of being created.
+            # One of the overviews will be saved normally, while the
+            # other one will cause an IntegrityError because it tries
+            # to save a duplicate.
+            # (see: https://openedx.atlassian.net/browse/TNL-2854).
+            pass
+        return course_overview
+
+    @classmethod
+    def _load_course(cls, course_id):
+        """
+        Load a CourseDescriptor and create a new CourseOverview and
+        CourseOverviewTabs from it, without saving them.
+
+        Returns:
+            tuple: the CourseOverview and a list of its CourseOverviewTabs.
+
+        Raises:
+            the same exceptions as load_from_module_store.
+        """
         store = modulestore()
         with store.bulk_operations(course_id):
             course = store.get_course(course_id)
             if isinstance(course, CourseDescriptor):
                 course_overview = cls._create_from_course(course)
-                try:
-                    course_overview.save()
-                    CourseOverviewTab.objects.bulk_create([
-                        CourseOverviewTab(tab_id=tab.tab_id, course_overview=course_overview)
-                        for tab in course.tabs
-                    ])
-                except IntegrityError:
-                    # There is a rare race condition that will occur if
-                    # CourseOverview.get_from_id is called while a
-                    # another identical overview is already in the process
-                    # of being created.
-                    # One of the overviews will be saved normally, while the
-                    # other one will cause an IntegrityError because it tries
-                    # to save a duplicate.
-                    # (see: https://openedx.atlassian.net/browse/TNL-2854).
-                    pass
-                return course_overview
+                tabs = [
+                    CourseOverviewTab(tab_id=tab.tab_id, course_overview=course_overview)
+                    for tab in course.tabs
+                ]
+                return course_overview, tabs
             elif course is not None:
                 raise IOError(
                     "Error while loading course {} from the module store: {}",
@@ -234,6 +255,74 @@ class CourseOverview(TimeStampedModel):
             course_overview = None
         return course_overview or cls.load_from_module_store(course_id)
 
+    @classmethod
+    def get_from_ids(cls, course_ids):
+        """
+        Load the CourseOverview objects of many courses at once.
+
+        The overviews that are cached in the database are loaded, along with
+        their tabs, with a single query. The courses whose overviews are
+        missing or out of date are then loaded from the modulestore, and
+        their new overviews are cached in the database with bulk inserts.
+
+        Arguments:
+            course_ids (iterable[CourseKey]): the IDs of the course overviews
+                to be loaded.
+
+        Returns:
+            dict[CourseKey: CourseOverview]: overview of each requested
+                course, or None if the course was not found or could not be
+                loaded from the module store.
+        """
+        course_ids = set(course_ids)
+        if not course_ids:
+            return {}
+
+        course_overviews = {}
+        outdated = []
+        for course_overview in cls.objects.filter(id__in=course_ids).prefetch_related('tabs'):
+            if course_overview.version < cls.VERSION:
+                outdated.append(course_overview.id)
+            else:
+                course_overviews[course_overview.id] = course_overview
+        if outdated:
+            # Throw away old versions of CourseOverview, as they might contain stale data.
+            cls.objects.filter(id__in=outdated).delete()
+
+        loaded = []
+        tabs = []
+        for course_id in course_ids - set(course_overviews):
+            try:
+                course_overview, course_tabs = cls._load_course(course_id)
+            except cls.DoesNotExist:
+                course_overview = None
+            except IOError:
+                log.exception(u"Error while loading the course overview of %s", course_id)
+                course_overview = None
+            else:
+                loaded.append(course_overview)
+                tabs.extend(course_tabs)
+            course_overviews[course_id] = course_overview
+
+        if loaded:
+            try:
+                cls.objects.bulk_create(loaded)
+            except IntegrityError:
+                # Some of the overviews were created at the same time by
+                # another process (see load_from_module_store), so save them
+                # one at a time, skipping the duplicates.
+                saved = []
+                for course_overview in loaded:
+                    try:
+                        course_overview.save(force_insert=True)
+                        saved.append(course_overview)
+                    except IntegrityError:
+                        pass
+                tabs = [tab for tab in tabs if tab.course_overview in saved]
+            CourseOverviewTab.objects.bulk_create(tabs)
+
+        return course_overviews
+
     def clean_id(self, padding_char='='):
         """
         Returns a unique deterministic base32-encoded ID for the course.
@@ -407,3 +407,44 @@ class CourseOverviewTestCase(ModuleStoreTestCase):
             # knows how to write, it's not going to overwrite what's there.
             unmodified_overview = CourseOverview.get_from_id(course.id)
             self.assertEqual(unmodified_overview.version, 11)
+
+    def test_get_from_ids(self):
+        """
+        Test that get_from_ids loads cached overviews with their tabs in one
+        query, and creates the missing ones from the module store.
+        """
+        cached_course = CourseFactory.create()
+        new_course = CourseFactory.create()
+        non_existent_key = self.store.make_course_key('Non', 'Existent', 'Course')
+        CourseOverview.get_from_id(cached_course.id)
+
+        course_overviews = CourseOverview.get_from_ids([cached_course.id, new_course.id, non_existent_key])
+        self.assertEqual(course_overviews[cached_course.id].id, cached_course.id)
+        self.assertEqual(course_overviews[new_course.id].id, new_course.id)
+        self.assertIsNone(course_overviews[non_existent_key])
+        self.assertItemsEqual(
+            CourseOverview.get_all_course_keys(), [cached_course.id, new_course.id]
+        )
+
+        # Both overviews are now cached, along with their tabs.
+        with self.assertNumQueries(2):
+            course_overviews = CourseOverview.get_from_ids([cached_course.id, new_course.id])
+        with self.assertNumQueries(0):
+            for course_overview in course_overviews.itervalues():
+                self.assertEqual(
+                    [tab.tab_id for tab in course_overview.tabs.all()],
+                    [tab.tab_id for tab in new_course.tabs]
+                )
+
+    def test_get_from_ids_version_update(self):
+        """
+        Test that get_from_ids replaces overviews of an older version.
+        """
+        course = CourseFactory.create()
+        with mock.patch('openedx.core.djangoapps.content.course_overviews.models.CourseOverview.VERSION', new=10):
+            overview = CourseOverview.get_from_id(course.id)
+            overview.version = 9
+            overview.save()
+
+            self.assertEqual(CourseOverview.get_from_ids([course.id])[course.id].version, 10)
+            self.assertEqual(CourseOverview.objects.get(id=course.id).version, 10)